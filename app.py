@@ -1,5 +1,11 @@
 import streamlit as st
 from data.session_state import initialize_session_state
+from data.event_log import maybe_checkpoint
+from data.shared_ledger import shared_read
+from data.session_spill import active_session, spill_idle_sessions
+from data.diagnostics import sample_memory
+from data.metrics import timer, export_metrics
+from data.profiler import profile_rerun
 from components.styles import get_common_styles
 from components.dashboard import show_dashboard
 from components.inventory import show_inventory
@@ -8,6 +14,8 @@ from components.expenses import show_expenses
 from components.partnership import show_partnership
 from components.reports import show_reports
 from components.user_management import show_user_management
+from components.data_export import show_data_export
+from components.diagnostics import show_diagnostics
 from components.auth import (
     authenticate, create_session, validate_session, logout,
     has_permission
@@ -37,6 +45,14 @@ def show_login():
                 st.error(f"Login error: {str(e)}")
 
 def main():
+    # Bring back state spilled while this tab sat idle; it is only spilled between runs
+    with active_session():
+        run_app()
+    spill_idle_sessions()
+    sample_memory()
+    export_metrics()
+
+def run_app():
     initialize_session_state()
     st.markdown(get_common_styles(), unsafe_allow_html=True)
     
@@ -93,11 +109,24 @@ def main():
             menu_options.append("Partnership")
         if has_permission(user['role'], 'reports'):
             menu_options.append("Reports")
+        if has_permission(user['role'], 'data_export'):
+            menu_options.append("Data Export")
         if has_permission(user['role'], 'user_management'):
             menu_options.append("User Management")
+            menu_options.append("Diagnostics")
 
         menu = st.selectbox("Menu", menu_options, key="main_menu")
 
+    # Pages read the process-wide ledger; business operations upgrade to the write lock
+    with shared_read():
+        show_page(menu)
+        maybe_checkpoint()
+
+def show_page(menu):
+    with timer('page_render', menu), profile_rerun(menu):
+        _dispatch(menu)
+
+def _dispatch(menu):
     try:
         if menu == "Dashboard":
             show_dashboard()
@@ -111,8 +140,12 @@ def main():
             show_partnership()
         elif menu == "Reports":
             show_reports()
+        elif menu == "Data Export":
+            show_data_export()
         elif menu == "User Management":
             show_user_management()
+        elif menu == "Diagnostics":
+            show_diagnostics()
     except Exception as e:
         st.error(f"Error loading {menu}: {str(e)}")
 
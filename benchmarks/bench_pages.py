@@ -0,0 +1,197 @@
+"""End-to-end page render benchmarks through the real app.main.
+
+A synthetic admin logs in through the login form, then every menu page is
+rendered against synthetic ledgers at each scale. Each scale runs in its
+own process and throwaway working directory:
+
+    python -m benchmarks.bench_pages --scale 10k --scale 100k
+    python -m benchmarks.bench_pages --scale 100k --enforce-budgets
+
+Render time covers the whole rerun (Styler formatting, Plotly figures,
+widget serialization); payload is the serialized size of every element
+the page produced, read from AppTest's element tree (app.main and
+app.sidebar). That tree is not a stable Streamlit API; the Streamlit
+version measured is recorded in each result's environment. Results go to benchmarks/results/pages_<scale>.json
+and are compared with benchmarks/baseline/ like the utils benchmarks.
+With --enforce-budgets, pages over their budget in page_budgets.json
+fail the run.
+"""
+import os
+import sys
+import argparse
+import statistics
+from time import perf_counter
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import SCALES, SYNTHETIC_END
+from benchmarks.harness import (
+    ROOT, RESULTS_DIR, BASELINE_DIR, isolated_workdir, new_app, check_run, run_child, environment_info,
+    load_json, write_json, compare_to_baseline, report
+)
+
+BUDGETS_FILE = os.path.join(ROOT, 'benchmarks', 'page_budgets.json')
+BENCH_USER = 'bench_admin'
+BENCH_PASSWORD = 'bench-password'
+COLUMNS = ['first_ms', 'median_ms', 'payload_kb']
+# Arguments passed on to the process that runs each scale
+CHILD_OPTIONS = ['units', 'partners', 'years', 'seed', 'repeat', 'timeout']
+
+def load_once():
+    """Create the synthetic user and ledgers on the session's first run"""
+    import streamlit as st
+    from datetime import date
+    if 'bench_loaded' in st.session_state:
+        return
+    from benchmarks.synthetic import generate_ledgers, load_into_session
+    from components.auth import create_user
+    config = st.session_state['bench_config']
+    create_user(BENCH_USER, BENCH_PASSWORD, 'Benchmark Admin', 'admin', 'All')
+    load_into_session(generate_ledgers(
+        rows=config['rows'], units=config['units'], partners=config['partners'],
+        years=config['years'], seed=config['seed'], end=date.fromisoformat(config['end'])
+    ))
+    st.session_state['bench_loaded'] = True
+
+def _script():
+    import sys
+    import streamlit as st
+    sys.path.insert(0, st.session_state['bench_config']['root'])
+    from benchmarks.bench_pages import load_once
+    load_once()
+    import app
+    app.main()
+
+def payload_bytes(node):
+    """Serialized size of an element tree: the protobuf messages sent to the browser"""
+    size = 0
+    proto = getattr(node, 'proto', None)
+    if proto is not None:
+        size += proto.ByteSize()
+    children = getattr(node, 'children', None) or {}
+    for child in children.values():
+        size += payload_bytes(child)
+    return size
+
+def _widget(widgets, label):
+    for widget in widgets:
+        if widget.label == label:
+            return widget
+    raise RuntimeError(f"No '{label}' field on the login page")
+
+def log_in(app):
+    """Submit the real login form, then rerun as the browser refresh would"""
+    check_run(app.run())
+    _widget(app.text_input, 'Username').input(BENCH_USER)
+    _widget(app.text_input, 'Password').input(BENCH_PASSWORD)
+    check_run(_widget(app.button, 'Login').click().run())
+    check_run(app.run())
+    if 'user' not in app.session_state:
+        raise RuntimeError("Synthetic user could not log in")
+
+def render_pages(app, repeat):
+    """Time each menu page: its first render, then repeated reruns"""
+    results = {}
+    pages = list(app.selectbox(key='main_menu').options)
+    for page in pages:
+        start = perf_counter()
+        check_run(app.selectbox(key='main_menu').select(page).run())
+        first = (perf_counter() - start) * 1000
+        errors = [element.value for element in app.error]
+        timings = []
+        for _ in range(repeat):
+            start = perf_counter()
+            check_run(app.run())
+            timings.append((perf_counter() - start) * 1000)
+        results[page] = {
+            'first_ms': first,
+            'median_ms': statistics.median(timings),
+            'min_ms': min(timings),
+            'payload_kb': sum(payload_bytes(block) for block in (app.main, app.sidebar)) / 1024,
+            'elements': sum(1 for block in (app.main, app.sidebar) for _ in _elements(block)),
+            'errors': errors,
+            'runs': len(timings)
+        }
+    return results
+
+def _elements(node):
+    children = getattr(node, 'children', None) or {}
+    if not children:
+        yield node
+    for child in children.values():
+        yield from _elements(child)
+
+def over_budget(results, budgets):
+    """(page, measure, budget, value) for every page exceeding its budget"""
+    failures = []
+    for page, values in results.items():
+        budget = budgets.get(page, budgets.get('default', {}))
+        if 'render_ms' in budget and values['median_ms'] > budget['render_ms']:
+            failures.append((page, 'render_ms', budget['render_ms'], values['median_ms']))
+        if 'payload_kb' in budget and values['payload_kb'] > budget['payload_kb']:
+            failures.append((page, 'payload_kb', budget['payload_kb'], values['payload_kb']))
+    return failures
+
+def _config(args, scale):
+    return {
+        'rows': SCALES[scale], 'units': args.units, 'partners': args.partners,
+        'years': args.years, 'seed': args.seed, 'end': SYNTHETIC_END.isoformat(),
+        'repeat': args.repeat
+    }
+
+def run_scale(args, scale):
+    """Child process body: log in and render every page at one scale, in its own working directory"""
+    with isolated_workdir():
+        app = new_app(_script, _config(args, scale), args.timeout)
+        log_in(app)
+        return render_pages(app, args.repeat)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark page renders through app.main")
+    parser.add_argument('--scale', action='append', choices=list(SCALES),
+                        help="Posting count to generate; repeat for several (default 10k)")
+    parser.add_argument('--units', type=int, default=2)
+    parser.add_argument('--partners', type=int, default=2)
+    parser.add_argument('--years', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--timeout', type=float, default=600, help="Seconds per rerun")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed slowdown against the baseline, as a fraction")
+    parser.add_argument('--enforce-budgets', action='store_true',
+                        help="Fail when a page exceeds its budget in page_budgets.json")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="Store these results as the new baseline")
+    parser.add_argument('--child', metavar='RESULTS', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        write_json(args.child, run_scale(args, args.scale[0]))
+        return 0
+
+    failed = False
+    budgets = load_json(BUDGETS_FILE) or {}
+    info = environment_info()
+    for scale in args.scale or ['10k']:
+        config = _config(args, scale)
+        results = run_child('benchmarks.bench_pages', scale, {name: getattr(args, name) for name in CHILD_OPTIONS})
+        name = f"pages_{scale}.json"
+        payload = {'config': config, 'environment': info, 'results': results}
+        write_json(os.path.join(RESULTS_DIR, name), payload)
+        baseline = load_json(os.path.join(BASELINE_DIR, name))
+        regressions = compare_to_baseline(results, baseline and baseline['results'], args.tolerance)
+        report(f"Page renders at {scale} postings (ms, KB)", results, regressions, COLUMNS)
+        for page, values in results.items():
+            for error in values['errors']:
+                print(f"ERROR {page}: {error}")
+        failures = over_budget(results, budgets.get(scale, {})) if args.enforce_budgets else []
+        for page, measure, budget, value in failures:
+            print(f"OVER BUDGET {page} {measure}: {value:,.1f} > {budget:,.1f}")
+        failed = failed or bool(regressions or failures) or any(v['errors'] for v in results.values())
+        if args.save_baseline:
+            write_json(os.path.join(BASELINE_DIR, name), payload)
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""Micro-benchmarks for the public functions in utils.py.
+
+Each scale runs in its own process, in a fresh Streamlit session (AppTest)
+loaded with synthetic ledgers, inside its own throwaway working directory:
+
+    python -m benchmarks.bench_utils --scale 10k --scale 100k
+    python -m benchmarks.bench_utils --scale 10k --save-baseline
+
+Results go to benchmarks/results/utils_<scale>.json. When a baseline
+exists in benchmarks/baseline/, slower medians beyond --tolerance are
+reported and the exit status is 1.
+"""
+import os
+import sys
+import argparse
+import statistics
+from time import perf_counter
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import SCALES, SYNTHETIC_END
+from benchmarks.harness import (
+    RESULTS_DIR, BASELINE_DIR, isolated_workdir, run_app_function, run_child, environment_info,
+    load_json, write_json, compare_to_baseline, report
+)
+
+COLUMNS = ['first_ms', 'median_ms', 'min_ms']
+# Arguments passed on to the process that runs each scale
+CHILD_OPTIONS = ['units', 'partners', 'years', 'seed', 'repeat', 'timeout']
+
+def _cases(units):
+    """(name, call) pairs; call(i) runs the i-th repetition"""
+    import streamlit as st
+    import utils
+    from benchmarks.synthetic import SYNTHETIC_END
+    from data.event_log import business_operation
+    unit = units[0]
+
+    def partner_name():
+        return st.session_state.partners[unit]['Partner'].iloc[0]
+
+    # The ledger and partner helpers run inside an operation, as their callers do
+    def append_expense(i):
+        with business_operation('Benchmark'):
+            utils.append_ledger_rows('expenses', [{
+                'Date': SYNTHETIC_END, 'Category': 'Other', 'Amount': 1.0 + i * 0.01,
+                'Description': 'bench', 'Business Unit': unit, 'Partner': None, 'Payment Method': 'Cash'
+            }])
+
+    def adjust_withdrawn(i):
+        with business_operation('Benchmark'):
+            utils.adjust_partner_balance(unit, partner_name(), 'Withdrawn', 0.01)
+
+    reads = [
+        ('calculate_inventory_value', lambda i: utils.calculate_inventory_value(unit)),
+        ('calculate_operating_expenses', lambda i: utils.calculate_operating_expenses(unit)),
+        ('calculate_profit_loss', lambda i: utils.calculate_profit_loss(unit)),
+        ('calculate_investment_total', lambda i: utils.calculate_investment_total(unit)),
+        ('calculate_provisional_profit', lambda i: utils.calculate_provisional_profit(unit)),
+        ('calculate_partner_profits', lambda i: utils.calculate_partner_profits(unit)),
+        ('calculate_combined_partner_profits', lambda i: utils.calculate_combined_partner_profits()),
+        ('get_business_unit_summary', lambda i: utils.get_business_unit_summary(unit)),
+        ('get_system_summary', lambda i: utils.get_system_summary()),
+    ]
+    writes = [
+        ('update_cash_balance', lambda i: utils.update_cash_balance(1.0, unit, 'add')),
+        ('record_transaction', lambda i: utils.record_transaction('Expense', 1.0, unit, 'Other', 'bench')),
+        ('update_market_price', lambda i: utils.update_market_price(50.0 + i * 0.01)),
+        ('update_sku_prices', lambda i: utils.update_sku_prices({'Standard': 50.0 + i * 0.01})),
+        # Distinct amounts so the duplicate-investment check never trips
+        ('distribute_investment', lambda i: utils.distribute_investment(unit, 1_000.0 + i * 0.01, 'Bench Investor')),
+        ('record_partner_withdrawal', lambda i: utils.record_partner_withdrawal(unit, partner_name(), 0.01, 'bench')),
+        ('redistribute_shares', lambda i: utils.redistribute_shares(st.session_state.partners[unit], 1.0)),
+        ('append_ledger_rows', append_expense),
+        ('adjust_partner_balance', adjust_withdrawn),
+        ('set_partner_table', lambda i: utils.set_partner_table(unit, st.session_state.partners[unit].copy())),
+    ]
+    return reads + writes
+
+def run_suite():
+    """Body of the AppTest script: generate, load, time every case"""
+    import gc
+    import streamlit as st
+    from datetime import date
+    from benchmarks.synthetic import generate_ledgers, load_into_session, unit_names
+    config = st.session_state['bench_config']
+    state = generate_ledgers(
+        rows=config['rows'], units=config['units'], partners=config['partners'],
+        years=config['years'], seed=config['seed'], end=date.fromisoformat(config['end'])
+    )
+    st.session_state['user'] = {'username': 'benchmark', 'role': 'admin', 'business_unit': 'All'}
+    load_into_session(state)
+    results = {}
+    for name, call in _cases(unit_names(config['units'])):
+        gc.collect()
+        # The first call pays for lazily built indexes, cubes and engines
+        start = perf_counter()
+        call(0)
+        first = (perf_counter() - start) * 1000
+        timings = []
+        for i in range(1, config['repeat'] + 1):
+            start = perf_counter()
+            call(i)
+            timings.append((perf_counter() - start) * 1000)
+        results[name] = {
+            'first_ms': first,
+            'median_ms': statistics.median(timings),
+            'min_ms': min(timings),
+            'runs': len(timings)
+        }
+    st.session_state['bench_results'] = results
+
+def _script():
+    import sys
+    import streamlit as st
+    sys.path.insert(0, st.session_state['bench_config']['root'])
+    from benchmarks.bench_utils import run_suite
+    run_suite()
+
+def _config(args, scale):
+    return {
+        'rows': SCALES[scale], 'units': args.units, 'partners': args.partners,
+        'years': args.years, 'seed': args.seed, 'end': SYNTHETIC_END.isoformat(),
+        'repeat': args.repeat
+    }
+
+def run_scale(args, scale):
+    """Child process body: one scale, in its own working directory"""
+    with isolated_workdir():
+        app = run_app_function(_script, _config(args, scale), args.timeout)
+        return app.session_state['bench_results']
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark utils.py on synthetic ledgers")
+    parser.add_argument('--scale', action='append', choices=list(SCALES),
+                        help="Posting count to generate; repeat for several (default 10k)")
+    parser.add_argument('--units', type=int, default=2)
+    parser.add_argument('--partners', type=int, default=2)
+    parser.add_argument('--years', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=1800, help="Seconds per scale")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed slowdown against the baseline, as a fraction")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="Store these results as the new baseline")
+    parser.add_argument('--child', metavar='RESULTS', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        write_json(args.child, run_scale(args, args.scale[0]))
+        return 0
+
+    regressed = False
+    info = environment_info()
+    for scale in args.scale or ['10k']:
+        config = _config(args, scale)
+        results = run_child('benchmarks.bench_utils', scale, {name: getattr(args, name) for name in CHILD_OPTIONS})
+        name = f"utils_{scale}.json"
+        write_json(os.path.join(RESULTS_DIR, name), {'config': config, 'environment': info, 'results': results})
+        baseline = load_json(os.path.join(BASELINE_DIR, name))
+        regressions = compare_to_baseline(results, baseline and baseline['results'], args.tolerance)
+        report(f"utils.py at {scale} postings (ms)", results, regressions, COLUMNS)
+        regressed = regressed or bool(regressions)
+        if args.save_baseline:
+            write_json(os.path.join(BASELINE_DIR, name), {'config': config, 'environment': info, 'results': results})
+    return 1 if regressed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""Shared plumbing for the benchmark scripts: isolation, AppTest runs and baselines."""
+import os
+import sys
+import json
+import platform
+import tempfile
+import subprocess
+from contextlib import contextmanager
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+BASELINE_DIR = os.path.join(ROOT, 'benchmarks', 'baseline')
+# Differences below this are timer noise, whatever the ratio
+NOISE_FLOOR_MS = 1.0
+
+@contextmanager
+def isolated_workdir():
+    """Run in a throwaway directory so the user, event and snapshot databases start empty"""
+    previous = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='bizmaster-bench-') as workdir:
+        os.chdir(workdir)
+        if ROOT not in sys.path:
+            sys.path.insert(0, ROOT)
+        try:
+            yield workdir
+        finally:
+            os.chdir(previous)
+
+def run_child(module, scale, options):
+    """Run one scale of a benchmark module in a fresh interpreter; return what it wrote.
+
+    The child runs the module with --child and a results path, and does
+    its work inside isolated_workdir(). A process per scale also keeps
+    module-level state, such as the event log writer thread, from carrying
+    over between scales. options maps argument names to values to pass on.
+    """
+    with tempfile.TemporaryDirectory(prefix='bizmaster-bench-') as tmp:
+        output = os.path.join(tmp, 'results.json')
+        command = [sys.executable, '-m', module, '--scale', scale, '--child', output]
+        for name, value in options.items():
+            command += [f"--{name.replace('_', '-')}", str(value)]
+        subprocess.run(command, cwd=ROOT, check=True)
+        return load_json(output)
+
+def new_app(script, config, timeout):
+    """A fresh Streamlit session for script with config in its session state, not yet run.
+
+    Process-wide caches (the shared ledger) are cleared first so each
+    session sees only the data it generates.
+    """
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    app = AppTest.from_function(script, default_timeout=timeout)
+    app.session_state['bench_config'] = {**config, 'root': ROOT}
+    return app
+
+def check_run(app):
+    if app.exception:
+        raise RuntimeError(f"Benchmark script failed: {app.exception[0].message}")
+    return app
+
+def run_app_function(script, config, timeout):
+    """Run script once in a fresh session and return the finished AppTest"""
+    return check_run(new_app(script, config, timeout).run())
+
+def environment_info():
+    import numpy as np
+    import pandas as pd
+    import streamlit as st
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'streamlit': st.__version__,
+        'timestamp': datetime.now().isoformat(timespec='seconds')
+    }
+
+def load_json(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def write_json(path, payload):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+def compare_to_baseline(results, baseline, tolerance, metric='median_ms'):
+    """Cases slower than baseline by more than tolerance (a fraction), as (name, baseline, now)"""
+    regressions = []
+    for name, current in results.items():
+        previous = (baseline or {}).get(name)
+        if previous is None:
+            continue
+        before, now = previous[metric], current[metric]
+        if now > before * (1 + tolerance) and now - before > NOISE_FLOOR_MS:
+            regressions.append((name, before, now))
+    return regressions
+
+def report(title, results, regressions, columns):
+    """Print a fixed-width table of results followed by any regressions"""
+    print(f"\n{title}")
+    width = max([len(name) for name in results] + [4])
+    print(f"{'case':<{width}}  " + '  '.join(f"{c:>12}" for c in columns))
+    for name, values in results.items():
+        print(f"{name:<{width}}  " + '  '.join(f"{values[c]:>12,.2f}" for c in columns))
+    for name, before, now in regressions:
+        print(f"REGRESSION {name}: {before:,.2f} -> {now:,.2f} ({now / before - 1:+.0%})")
@@ -0,0 +1,143 @@
+"""Deterministic synthetic ledgers for benchmarks.
+
+The same seed and scale always produce the same ledgers, shaped like the
+ones the app writes (dates as date objects, one transaction per posting).
+"""
+from datetime import date, time, timedelta
+import numpy as np
+import pandas as pd
+
+# Postings across the inventory, expense and investment ledgers
+SCALES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+# Last day of generated history, fixed so results do not drift from day to day
+SYNTHETIC_END = date(2024, 12, 31)
+EXPENSE_CATEGORIES = ['Operational', 'Personnel', 'Logistics', 'Marketing', 'Utilities', 'Rent', 'Other']
+PAYMENT_METHODS = ['Cash', 'Bank Transfer', 'Credit Card', 'Cheque']
+PARTNER_NAMES = ['Ahmed', 'Fatima', 'Ali', 'Mariam', 'Omar', 'Layla', 'Yusuf', 'Noor']
+
+def unit_names(units):
+    return [f"Unit {chr(ord('A') + i)}" for i in range(units)]
+
+def _dates(rng, n, start, days):
+    offsets = np.sort(rng.integers(0, days, n))
+    return (pd.Timestamp(start) + pd.to_timedelta(offsets, unit='D')).date
+
+def generate_ledgers(rows=10_000, units=2, partners=2, years=1, skus=3, seed=0, end=SYNTHETIC_END):
+    """Session state for a business with rows postings over years of history.
+
+    Returns a dict of session keys; postings are split 60/35/5 between
+    inventory, expenses and investments, each mirrored in transactions.
+    """
+    rng = np.random.default_rng(seed)
+    days = 365 * years
+    start = end - timedelta(days=days - 1)
+    names = unit_names(units)
+    sku_names = ['Standard'] + [f"Grade {i}" for i in range(1, skus)]
+    base_prices = np.round(rng.uniform(20.0, 80.0, len(sku_names)), 2)
+
+    n_inventory = int(rows * 0.60)
+    n_investments = max(int(rows * 0.05), 1)
+    n_expenses = rows - n_inventory - n_investments
+
+    sku_codes = rng.integers(0, len(sku_names), n_inventory)
+    kinds = np.where(rng.random(n_inventory) < 0.55, 'Purchase', 'Sale')
+    quantity = np.round(rng.gamma(2.0, 50.0, n_inventory), 3) + 0.001
+    markup = np.where(kinds == 'Sale', 1.15, 1.0)
+    unit_price = np.round(base_prices[sku_codes] * markup * rng.uniform(0.9, 1.1, n_inventory), 2)
+    inventory = pd.DataFrame({
+        'Date': _dates(rng, n_inventory, start, days),
+        'Transaction Type': kinds,
+        'SKU': np.asarray(sku_names, dtype=object)[sku_codes],
+        'Quantity_kg': quantity,
+        'Unit Price': unit_price,
+        'Total Amount': np.round(quantity * unit_price, 2),
+        'Remarks': np.where(kinds == 'Purchase', 'Supplier', 'Customer'),
+        'Business Unit': np.asarray(names, dtype=object)[rng.integers(0, units, n_inventory)]
+    })
+
+    expenses = pd.DataFrame({
+        'Date': _dates(rng, n_expenses, start, days),
+        'Category': np.asarray(EXPENSE_CATEGORIES, dtype=object)[rng.integers(0, len(EXPENSE_CATEGORIES), n_expenses)],
+        'Amount': np.round(rng.gamma(2.0, 150.0, n_expenses), 2) + 0.01,
+        'Description': 'Synthetic expense',
+        'Business Unit': np.asarray(names, dtype=object)[rng.integers(0, units, n_expenses)],
+        'Partner': None,
+        'Payment Method': np.asarray(PAYMENT_METHODS, dtype=object)[rng.integers(0, len(PAYMENT_METHODS), n_expenses)]
+    })
+
+    investments = pd.DataFrame({
+        'Date': _dates(rng, n_investments, start, days),
+        'Business Unit': np.asarray(names, dtype=object)[rng.integers(0, units, n_investments)],
+        'Amount': np.round(rng.uniform(1_000.0, 50_000.0, n_investments), 2),
+        'Investor': 'Synthetic Investor',
+        'Description': 'Synthetic investment'
+    })
+
+    purchase = inventory['Transaction Type'] == 'Purchase'
+    transactions = pd.concat([
+        pd.DataFrame({
+            'Date': inventory['Date'],
+            'Type': inventory['Transaction Type'],
+            'Amount': inventory['Total Amount'],
+            'From': np.where(purchase, inventory['Business Unit'], inventory['Remarks']),
+            'To': np.where(purchase, inventory['Remarks'], inventory['Business Unit']),
+            'Description': 'Synthetic ' + inventory['Transaction Type'].str.lower()
+        }),
+        pd.DataFrame({
+            'Date': expenses['Date'], 'Type': 'Expense', 'Amount': expenses['Amount'],
+            'From': expenses['Business Unit'], 'To': expenses['Category'],
+            'Description': expenses['Description']
+        }),
+        pd.DataFrame({
+            'Date': investments['Date'], 'Type': 'Investment', 'Amount': investments['Amount'],
+            'From': investments['Investor'], 'To': investments['Business Unit'],
+            'Description': investments['Description']
+        })
+    ], ignore_index=True)
+
+    # Daily closing price per SKU as a bounded random walk
+    history_days = pd.date_range(start, end, freq='D')
+    walk = np.exp(np.cumsum(rng.normal(0.0, 0.01, (len(history_days), len(sku_names))), axis=0))
+    prices = np.round(base_prices * walk, 2)
+    price_history = pd.DataFrame({
+        'Date': np.repeat(history_days.date, len(sku_names)),
+        'Time': time(17, 0),
+        'SKU': np.tile(sku_names, len(history_days)),
+        'Price': prices.ravel()
+    })
+
+    shares = np.full(partners, round(100.0 / partners, 4))
+    shares[0] += 100.0 - shares.sum()
+    partner_tables = {
+        unit: pd.DataFrame({
+            'Partner': [f"{PARTNER_NAMES[p % len(PARTNER_NAMES)]} {p + 1}" for p in range(partners)],
+            'Share': shares,
+            'Withdrawn': 0.0,
+            'Invested': 0.0
+        })
+        for unit in names
+    }
+
+    # Enough cash that benchmarked withdrawals and purchases never overdraw
+    cash = {unit: 1_000_000_000.0 for unit in names}
+    return {
+        'inventory': inventory,
+        'expenses': expenses,
+        'investments': investments,
+        'transactions': transactions,
+        'price_history': price_history,
+        'cash_balance': cash,
+        'opening_cash': dict(cash),
+        'partners': partner_tables,
+        'current_price': float(prices[-1, 0]),
+        'sku_prices': dict(zip(sku_names, map(float, prices[-1])))
+    }
+
+def load_into_session(state):
+    """Install generated ledgers as the process-wide shared ledgers"""
+    import streamlit as st
+    from data.shared_ledger import shared_store, shared_write
+    with shared_write():
+        for key, value in state.items():
+            st.session_state[key] = value
+    shared_store()['loaded'] = True
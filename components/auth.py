@@ -2,6 +2,7 @@ import streamlit as st
 import hashlib
 import sqlite3
 from datetime import datetime, timedelta
+from data.metrics import timed
 
 # Database setup
 def init_db():
@@ -56,6 +57,7 @@ ROLES = {
             'reports': True,
             'user_management': True,
             'data_export': True,
+            'period_close': True,
             'data_reset': True
         }
     },
@@ -70,6 +72,7 @@ ROLES = {
             'reports': True,
             'user_management': False,
             'data_export': True,
+            'period_close': False,
             'data_reset': False
         }
     },
@@ -84,6 +87,7 @@ ROLES = {
             'reports': True,
             'user_management': False,
             'data_export': True,
+            'period_close': True,
             'data_reset': False
         }
     }
@@ -98,6 +102,7 @@ DEFAULT_ADMIN = {
     'business_unit': 'All'
 }
 
+@timed('auth_db')
 def create_default_admin():
     conn = sqlite3.connect('bizmaster_users.db')
     c = conn.cursor()
@@ -124,6 +129,7 @@ def create_default_admin():
 create_default_admin()
 
 # Authentication functions
+@timed('auth_db')
 def authenticate(username, password):
     conn = sqlite3.connect('bizmaster_users.db')
     c = conn.cursor()
@@ -147,6 +153,7 @@ def authenticate(username, password):
         }
     return None
 
+@timed('auth_db')
 def create_session(user_id):
     import secrets
     session_id = secrets.token_hex(16)
@@ -172,6 +179,7 @@ def create_session(user_id):
     
     return session_id
 
+@timed('auth_db')
 def validate_session(session_id):
     conn = sqlite3.connect('bizmaster_users.db')
     c = conn.cursor()
@@ -196,6 +204,7 @@ def validate_session(session_id):
         }
     return None
 
+@timed('auth_db')
 def logout(session_id):
     conn = sqlite3.connect('bizmaster_users.db')
     c = conn.cursor()
@@ -205,6 +214,7 @@ def logout(session_id):
     conn.close()
 
 # User management functions
+@timed('auth_db')
 def create_user(username, password, full_name, role, business_unit):
     conn = sqlite3.connect('bizmaster_users.db')
     c = conn.cursor()
@@ -227,6 +237,7 @@ def create_user(username, password, full_name, role, business_unit):
     finally:
         conn.close()
 
+@timed('auth_db')
 def get_users():
     conn = sqlite3.connect('bizmaster_users.db')
     c = conn.cursor()
@@ -250,6 +261,7 @@ def get_users():
         'last_login': user[6]
     } for user in users]
 
+@timed('auth_db')
 def delete_user(user_id):
     conn = sqlite3.connect('bizmaster_users.db')
     c = conn.cursor()
@@ -260,6 +272,7 @@ def delete_user(user_id):
     conn.commit()
     conn.close()
 
+@timed('auth_db')
 def update_user(user_id, full_name=None, role=None, business_unit=None, password=None):
     conn = sqlite3.connect('bizmaster_users.db')
     c = conn.cursor()
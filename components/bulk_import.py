@@ -0,0 +1,69 @@
+import streamlit as st
+from data.importer import validate_import, commit_import, IMPORT_SPECS
+from .tables import show_paginated_table
+
+def show_bulk_import(ledger, user):
+    """CSV/Excel bulk import for one ledger with a per-row error report"""
+    spec = IMPORT_SPECS[ledger]
+    allowed_units = None if user['business_unit'] == 'All' else [user['business_unit']]
+    result_key = f"bulk_import_result_{ledger}"
+
+    with st.expander(f"Bulk Import {ledger.capitalize()}"):
+        st.caption(
+            "Required columns: " + ", ".join(spec['required']) +
+            ". Optional: " + ", ".join(spec['text'].keys())
+        )
+        uploaded = st.file_uploader(
+            "CSV or Excel file",
+            type=["csv", "xlsx"],
+            key=f"bulk_import_file_{ledger}"
+        )
+        skip_invalid = st.checkbox(
+            "Import valid rows and skip rows with errors",
+            key=f"bulk_import_skip_{ledger}"
+        )
+
+        if uploaded is not None and st.button("Validate and Import", key=f"bulk_import_btn_{ledger}"):
+            try:
+                with st.spinner("Validating..."):
+                    result = validate_import(ledger, uploaded, uploaded.name, allowed_units)
+                # Skipping rows would change later running balances, so overdrafts and oversells always block
+                if result['error_count'] and (not skip_invalid or result['overdrafts'] or result['oversells']):
+                    outcome = ('error', "Nothing was imported. Fix the rows in the error report and upload again.")
+                elif result['rows'].empty:
+                    outcome = ('warning', "No valid rows to import")
+                else:
+                    with st.spinner("Posting..."):
+                        posted = commit_import(ledger, result['rows'])
+                    outcome = ('success', f"Imported {posted:,} {ledger} rows")
+
+                # Keep only the report so paging through it survives reruns
+                st.session_state[result_key] = {
+                    'summary': f"Rows read: {result['rows_read']:,} — valid: {len(result['rows']):,} — "
+                               f"errors: {result['error_count']:,}",
+                    'outcome': outcome,
+                    'errors': result['errors']
+                }
+            except Exception as e:
+                st.session_state.pop(result_key, None)
+                st.error(f"Import failed: {str(e)}")
+
+        report = st.session_state.get(result_key)
+        if report:
+            st.write(report['summary'])
+            level, message = report['outcome']
+            getattr(st, level)(message)
+            if not report['errors'].empty:
+                st.subheader("Error Report")
+                show_paginated_table(
+                    report['errors'],
+                    key=f"bulk_import_errors_{ledger}",
+                    positions=list(range(len(report['errors'])))
+                )
+                st.download_button(
+                    "📥 Download Error Report",
+                    data=report['errors'].to_csv(index=False),
+                    file_name=f"{ledger}_import_errors.csv",
+                    mime="text/csv",
+                    key=f"bulk_import_errors_dl_{ledger}"
+                )
@@ -11,10 +11,13 @@ from utils import (
     calculate_combined_partner_profits,
     initialize_default_data,
     update_market_price,
+    update_sku_prices,
     get_system_summary,
     get_business_unit_summary
 )
+from data.sku import sku_prices, sku_column, sku_positions
 from .auth import has_permission
+from .tables import show_paginated_table, money_column, quantity_column
 
 def show_dashboard():
     try:
@@ -31,15 +34,17 @@ def show_dashboard():
         
         # Price Management Section
         with st.expander("Daily Price Management", expanded=True):
+            prices = sku_prices()
             col1, col2 = st.columns([3, 1])
             
             with col1:
+                sku = st.selectbox("SKU", sorted(prices), key="price_sku")
                 new_price = st.number_input(
                     "Update Current Market Price (AED per kg)",
                     min_value=0.0,
                     step=0.01,
-                    value=float(st.session_state.current_price),
-                    key="current_price_input"
+                    value=float(prices[sku]),
+                    key=f"current_price_input_{sku}"
                 )
             
             with col2:
@@ -47,16 +52,19 @@ def show_dashboard():
                 st.write("")
                 if st.button("Save Price Update"):
                     try:
-                        update_market_price(new_price)
-                        st.success(f"Price updated to AED {new_price:,.2f} per kg")
+                        update_market_price(new_price, sku)
+                        st.success(f"{sku} price updated to AED {new_price:,.2f} per kg")
                     except Exception as e:
                         st.error(f"Error updating market price: {str(e)}")
             
+            show_sku_price_table(prices)
+            
             # Display Price History
-            if not st.session_state.price_history.empty:
-                st.subheader("Price History (Last 30 Days)")
-                history = st.session_state.price_history.copy()
-                history['Date'] = pd.to_datetime(history['Date'])
+            history = st.session_state.price_history
+            history = history[sku_column(history) == sku]
+            if not history.empty:
+                st.subheader(f"{sku} Price History (Last 30 Days)")
+                history = history.assign(Date=pd.to_datetime(history['Date']))
                 history = history.set_index('Date').last('30D').reset_index()
                 
                 fig = px.line(
@@ -117,6 +125,44 @@ def show_dashboard():
         st.error(f"Error loading dashboard: {str(e)}")
 
 
+def show_sku_price_table(prices):
+    """Edit prices for many SKUs at once and add new SKUs"""
+    # A toggle rather than an expander: this sits inside the price expander
+    if st.checkbox("Edit SKU price table", key="sku_price_table"):
+        table = pd.DataFrame({'SKU': list(prices.keys()), 'Price': list(prices.values())})
+        edited = st.data_editor(
+            table,
+            num_rows="dynamic",
+            column_config={'Price': money_column("Price per kg")},
+            hide_index=True,
+            key="sku_price_editor"
+        )
+        if st.button("Save SKU Prices", key="sku_price_save"):
+            edited = edited.dropna(subset=['SKU', 'Price'])
+            changed = edited[edited['SKU'].map(prices) != edited['Price']]
+            try:
+                update_sku_prices(dict(zip(changed['SKU'], changed['Price'])))
+                st.success(f"Updated {len(changed):,} SKU prices")
+            except Exception as e:
+                st.error(str(e))
+
+def show_sku_positions(unit):
+    """Per-SKU stock and valuation for a unit"""
+    positions = sku_positions(unit)
+    positions = positions[positions['Quantity'] != 0].sort_values('Value', ascending=False)
+    if len(positions) > 1:
+        st.subheader(f"{unit} Stock by SKU")
+        show_paginated_table(
+            positions,
+            key=f"sku_positions_{unit}",
+            positions=list(range(len(positions))),
+            column_config={
+                'Quantity': quantity_column("Quantity"),
+                'Price': money_column("Price"),
+                'Value': money_column("Value")
+            }
+        )
+
 def show_unit_dashboard(unit):
     try:
         # Get unit summary data
@@ -147,6 +193,8 @@ def show_unit_dashboard(unit):
         with col8:
             st.metric("Operating Expenses", f"AED {unit_summary['Operating Expenses']:,.2f}")
         
+        show_sku_positions(unit)
+        
         # Partner Profit Distribution
         if not st.session_state.partners[unit].empty:
             st.subheader(f"{unit} Partner Profit Distribution")
@@ -0,0 +1,61 @@
+import os
+import streamlit as st
+from data.exporter import export_ledgers, export_formats, load_cursors, EXPORT_LEDGERS
+from utils import initialize_default_data
+from .auth import has_permission
+
+def show_data_export():
+    """Full-system export of every ledger"""
+    user = st.session_state.get('user')
+    if not user or not has_permission(user['role'], 'data_export'):
+        st.error("Permission denied")
+        return
+
+    initialize_default_data()
+
+    st.header("📤 Data Export")
+
+    cols = st.columns(2)
+    with cols[0]:
+        export_format = st.selectbox("Format", export_formats(), key="export_format")
+        ledgers = st.multiselect(
+            "Ledgers",
+            list(EXPORT_LEDGERS),
+            default=list(EXPORT_LEDGERS),
+            format_func=lambda x: x.replace('_', ' ').capitalize(),
+            key="export_ledgers"
+        )
+    with cols[1]:
+        incremental = st.checkbox(
+            "Only rows added since the last incremental export",
+            key="export_incremental"
+        )
+        cursors = load_cursors()
+        if cursors:
+            st.caption("Last incremental export: " + ", ".join(
+                f"{ledger} through event {seq:,}" for ledger, seq in cursors.items()
+            ))
+
+    if st.button("Create Export", key="export_create"):
+        if not ledgers:
+            st.error("Select at least one ledger")
+        else:
+            try:
+                with st.spinner("Writing export..."):
+                    path, counts = export_ledgers(export_format, ledgers, incremental)
+                st.session_state['last_export'] = {'path': path, 'counts': counts}
+            except Exception as e:
+                st.error(str(e))
+
+    last_export = st.session_state.get('last_export')
+    if last_export and os.path.exists(last_export['path']):
+        st.success("Export ready: " + ", ".join(
+            f"{ledger} {rows:,} rows" for ledger, rows in last_export['counts'].items()
+        ))
+        with open(last_export['path'], 'rb') as f:
+            st.download_button(
+                "📥 Download Export",
+                data=f,
+                file_name=os.path.basename(last_export['path']),
+                key="export_download"
+            )
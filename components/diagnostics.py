@@ -0,0 +1,87 @@
+import streamlit as st
+import plotly.express as px
+from data.diagnostics import (
+    shared_usage, session_usage, dtype_breakdown, sample_memory, memory_growth
+)
+from data.shared_ledger import shared_store
+from data.metrics import METRICS_ENABLED, prometheus_text
+from data.profiler import start_profiling, profiling_remaining, hot_functions, SORT_COLUMNS
+from .auth import has_permission
+
+def _mb(size):
+    return f"{size / 2**20:,.2f} MB"
+
+def show_diagnostics():
+    user = st.session_state.get('user')
+    if not user or not has_permission(user['role'], 'user_management'):
+        st.error("You don't have permission to access this page")
+        return
+
+    st.header("Memory Diagnostics")
+    if st.button("Take Sample Now"):
+        sample_memory(force=True)
+
+    shared = shared_usage()
+    sessions = session_usage()
+    cols = st.columns(3)
+    cols[0].metric("Shared Ledgers", _mb(shared['Bytes'].sum()))
+    cols[1].metric("Session Private State", _mb(sessions['Private Bytes'].sum()))
+    cols[2].metric("Sessions", len(sessions))
+
+    st.subheader("Per Ledger Key")
+    st.dataframe(shared.assign(MB=shared['Bytes'] / 2**20), hide_index=True, use_container_width=True)
+
+    st.subheader("Per Session")
+    st.dataframe(sessions.assign(MB=sessions['Private Bytes'] / 2**20), hide_index=True, use_container_width=True)
+
+    st.subheader("Dtype Breakdown")
+    state = shared_store()['state']
+    frames = [key for key in shared['Key'] if hasattr(state.get(key), 'dtypes')]
+    if frames:
+        key = st.selectbox("Ledger", frames, key="diagnostics_ledger")
+        st.dataframe(dtype_breakdown(state[key]), hide_index=True, use_container_width=True)
+
+    if METRICS_ENABLED:
+        st.download_button(
+            "Download Timing Metrics (Prometheus)",
+            prometheus_text(),
+            file_name="bizmaster_metrics.prom",
+            mime="text/plain"
+        )
+
+    show_profiler()
+
+    st.subheader("Growth Over Time")
+    growth = memory_growth()
+    if growth.empty:
+        st.info("No samples yet; one is taken every minute while the app is in use")
+        return
+    metric = st.radio("Measure", ["Bytes", "Rows"], horizontal=True, key="diagnostics_measure")
+    fig = px.line(growth, x='Time', y=metric, color='Key', title=f"{metric} by Key")
+    st.plotly_chart(fig, use_container_width=True)
+
+def show_profiler():
+    """Profile this session's next reruns, e.g. while opening a slow page"""
+    st.subheader("Profiler")
+    remaining = profiling_remaining()
+    if remaining:
+        st.info(f"Profiling the next {remaining} page render(s); open the slow page, then come back here")
+    cols = st.columns([1, 2])
+    reruns = cols[0].number_input("Reruns to profile", min_value=1, max_value=20, value=3, key="profile_reruns")
+    if cols[1].button("Start Profiling"):
+        # Takes effect from the next rerun, so this page is not itself captured
+        start_profiling(reruns)
+        st.info(f"Profiling the next {reruns} page render(s)")
+
+    result = st.session_state.get('profile_result')
+    if not result:
+        return
+    st.caption(f"{result['reruns']} render(s) captured: {', '.join(result['pages'])}")
+    sort = st.radio("Sort by", list(SORT_COLUMNS), horizontal=True, key="profile_sort")
+    st.dataframe(hot_functions(result['pstats'], sort), hide_index=True, use_container_width=True)
+    st.download_button(
+        "Download Profile (pstats)",
+        result['pstats'],
+        file_name=result['name'],
+        mime="application/octet-stream"
+    )
@@ -6,9 +6,13 @@ from utils import (
     calculate_partner_profits,
     record_partner_withdrawal,
     initialize_default_data,
-    record_transaction
+    record_transaction,
+    append_ledger_rows
 )
+from data.ledger_index import iter_latest_positions
+from data.event_log import business_operation
 from .auth import has_permission
+from .bulk_import import show_bulk_import
 
 def show_expenses():
     """Display and manage business expenses and partner withdrawals"""
@@ -81,19 +85,17 @@ def show_expenses():
                                 'Payment Method': payment_method
                             }])
                             
-                            st.session_state.expenses = pd.concat(
-                                [st.session_state.expenses, new_expense],
-                                ignore_index=True
-                            )
-                            
-                            update_cash_balance(amount, unit, 'subtract')
-                            record_transaction(
-                                type='Expense',
-                                amount=amount,
-                                from_entity=unit,
-                                to_entity=category,
-                                description=description
-                            )
+                            with business_operation('Expense'):
+                                append_ledger_rows('expenses', new_expense)
+                                
+                                update_cash_balance(amount, unit, 'subtract')
+                                record_transaction(
+                                    type='Expense',
+                                    amount=amount,
+                                    from_entity=unit,
+                                    to_entity=category,
+                                    description=description
+                                )
                             
                             st.success("Expense recorded successfully!")
                             st.rerun()
@@ -102,15 +104,19 @@ def show_expenses():
                             st.error(f"Error recording expense: {str(e)}")
                 
                 if not st.session_state.expenses.empty:
-                    unit_expenses = st.session_state.expenses[
-                        (st.session_state.expenses['Business Unit'] == unit) &
-                        (st.session_state.expenses['Partner'].isna())
-                    ]
+                    # Walk the unit's date index newest-first until 10 business expenses are found
+                    partner_col = st.session_state.expenses['Partner']
+                    recent = []
+                    for pos in iter_latest_positions('expenses', unit):
+                        if pd.isna(partner_col.iat[pos]):
+                            recent.append(pos)
+                            if len(recent) == 10:
+                                break
                     
-                    if not unit_expenses.empty:
+                    if recent:
                         st.subheader("Recent Expenses")
                         st.dataframe(
-                            unit_expenses.sort_values('Date', ascending=False).head(10),
+                            st.session_state.expenses.iloc[recent],
                             hide_index=True,
                             use_container_width=True
                         )
@@ -198,6 +204,8 @@ def show_expenses():
                     )
                 else:
                     st.info("No partners available for this business unit")
+    
+    show_bulk_import('expenses', user)
 
 if __name__ == "__main__":
     show_expenses()
\ No newline at end of file
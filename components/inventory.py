@@ -1,39 +1,40 @@
 import streamlit as st
 import pandas as pd
 from datetime import date
-from utils import update_cash_balance  # Ensure this function supports 'simulate' mode
+import utils
+from utils import append_ledger_rows
+from data.event_log import business_operation
+from data.period_close import ensure_period_open
+from data.sku import sku_prices
+from data.aging import inventory_aging, AGING_BUCKETS
+from data.stock import check_stock
+from data.accounts import InsufficientFunds
 from .auth import has_permission
+from .bulk_import import show_bulk_import
+from .tables import show_paginated_table, money_column, quantity_column
 
 # Utility function to update cash balance
-def update_cash_balance(amount, business_unit, action, simulate=False):
+def update_cash_balance(amount, business_unit, action):
     """
-    Updates or simulates the cash balance for a business unit.
+    Updates the cash balance for a business unit.
+    
+    The funds check and the update run under the shared ledger's write
+    lock, so two purchases cannot both spend the same cash.
     
     Parameters:
         amount (float): The amount to add/subtract.
         business_unit (str): The business unit ('Unit A', 'Unit B', etc.).
         action (str): 'add' or 'subtract'.
-        simulate (bool): If True, only checks if the action is possible without modifying the balance.
     
     Returns:
-        bool: True if the action is possible, False otherwise.
+        bool: True if the balance was updated, False if it was insufficient.
     """
-    # Initialize cash balance if not present
-    if 'cash_balance' not in st.session_state:
-        st.session_state.cash_balance = {'Unit A': 10000.0, 'Unit B': 10000.0}  # Example initial balances
-    
-    current_balance = st.session_state.cash_balance.get(business_unit, 0.0)
-    
-    if action == 'subtract':
-        if current_balance < amount:
-            return False  # Insufficient balance
-        if not simulate:
-            st.session_state.cash_balance[business_unit] -= amount
-    elif action == 'add':
-        if not simulate:
-            st.session_state.cash_balance[business_unit] += amount
-    
-    return True  # Action is possible
+    try:
+        # Updates go through utils so they are written to the event log
+        utils.update_cash_balance(amount, business_unit, action)
+    except InsufficientFunds:
+        return False
+    return True
 
 # Inventory Management Page
 def show_inventory():
@@ -61,6 +62,36 @@ def show_inventory():
                 record_transaction("Purchase", unit)
             with tab2:
                 record_transaction("Sale", unit)
+            
+            show_inventory_aging(unit)
+    
+    show_bulk_import('inventory', user)
+
+def show_inventory_aging(unit):
+    """Remaining stock by age band and how long sold stock was held"""
+    aging, days_held = inventory_aging(unit)
+    st.subheader(f"Inventory Aging - {unit}")
+    if aging.empty:
+        st.info("No stock on hand")
+        return
+    
+    buckets = aging.groupby('Bucket')[['Quantity', 'Value']].sum().reindex(AGING_BUCKETS, fill_value=0.0)
+    cols = st.columns(len(AGING_BUCKETS) + 1)
+    for col, (bucket, row) in zip(cols, buckets.iterrows()):
+        col.metric(bucket, f"{row['Quantity']:,.2f} kg", f"AED {row['Value']:,.2f}", delta_color="off")
+    if not days_held.empty:
+        cols[-1].metric("Avg Days Held (sold)", f"{days_held['Avg Days Held'].iloc[0]:,.1f}")
+    
+    if aging['SKU'].nunique() > 1:
+        show_paginated_table(
+            aging,
+            key=f"inventory_aging_{unit}",
+            positions=list(range(len(aging))),
+            column_config={
+                'Quantity': quantity_column("Quantity"),
+                'Value': money_column("Value")
+            }
+        )
 
 # Record Transaction Function
 def record_transaction(transaction_type, business_unit):
@@ -69,6 +100,7 @@ def record_transaction(transaction_type, business_unit):
         cols = st.columns(2)
         with cols[0]:
             date_transaction = st.date_input("Date", value=date.today())
+            sku = st.selectbox("SKU", sorted(sku_prices()))
             quantity_kg = st.number_input("Quantity (kg)", min_value=0.0, step=0.001, format="%.3f")
         with cols[1]:
             unit_price = st.number_input("Price per kg (AED)", min_value=0.0, step=0.01)
@@ -82,33 +114,47 @@ def record_transaction(transaction_type, business_unit):
             if quantity_kg <= 0 or unit_price <= 0:
                 st.error("Quantity and price must be greater than zero.")
                 return
+            try:
+                ensure_period_open(date_transaction)
+            except ValueError as e:
+                st.error(str(e))
+                return
             
-            # Handle purchase transactions
-            if transaction_type == "Purchase":
-                # Check if cash balance is sufficient
-                cash_sufficient = update_cash_balance(total_amount, business_unit, 'subtract', simulate=True)
-                if not cash_sufficient:
-                    st.error("Insufficient cash balance to complete the purchase.")
-                    return  # Exit without recording the transaction
-                
-                # Update cash balance
-                update_cash_balance(total_amount, business_unit, 'subtract')
-            
-            # Handle sale transactions
-            elif transaction_type == "Sale":
-                # Update cash balance
-                update_cash_balance(total_amount, business_unit, 'add')
+            try:
+                with business_operation(transaction_type):
+                    # Handle purchase transactions
+                    if transaction_type == "Purchase":
+                        # Debit the cash; raises InsufficientFunds, discarding the whole purchase
+                        update_cash_balance(total_amount, business_unit, 'subtract')
             
-            # Record the transaction in inventory
-            new_entry = pd.DataFrame([{
-                'Date': date_transaction,
-                'Transaction Type': transaction_type,
-                'Quantity_kg': quantity_kg,
-                'Unit Price': unit_price,
-                'Total Amount': total_amount,
-                'Remarks': remarks,
-                'Business Unit': business_unit
-            }])
-            st.session_state.inventory = pd.concat([st.session_state.inventory, new_entry], ignore_index=True)
+                    # Handle sale transactions
+                    elif transaction_type == "Sale":
+                        # Checked on the write path, so concurrent sales cannot oversell
+                        check_stock(business_unit, sku, quantity_kg)
+                        # Update cash balance
+                        update_cash_balance(total_amount, business_unit, 'add')
             
+                    # Record the transaction in inventory
+                    new_entry = pd.DataFrame([{
+                        'Date': date_transaction,
+                        'Transaction Type': transaction_type,
+                        'SKU': sku,
+                        'Quantity_kg': quantity_kg,
+                        'Unit Price': unit_price,
+                        'Total Amount': total_amount,
+                        'Remarks': remarks,
+                        'Business Unit': business_unit
+                    }])
+                    append_ledger_rows('inventory', new_entry)
+                    utils.record_transaction(
+                        type=transaction_type,
+                        amount=total_amount,
+                        from_entity=business_unit if transaction_type == "Purchase" else (remarks or "Customer"),
+                        to_entity=(remarks or "Supplier") if transaction_type == "Purchase" else business_unit,
+                        description=f"{transaction_type} of {quantity_kg:,.3f} kg {sku}"
+                    )
+            except ValueError as e:
+                st.error(str(e))
+                return
+
             st.success(f"{transaction_type} recorded!")
\ No newline at end of file
@@ -5,7 +5,10 @@ from utils import (
     distribute_investment,
     initialize_default_data
 )
+from data.ledger_index import latest_positions
 from .auth import has_permission
+from .bulk_import import show_bulk_import
+from .tables import show_paginated_table, money_column, date_column
 
 def show_investments():
     """Complete investment management interface"""
@@ -49,17 +52,20 @@ def show_investments():
                     if not investor:
                         st.error("Investor name required")
                     else:
-                        success = distribute_investment(
-                            unit=unit,
-                            amount=amount,
-                            investor=investor,
-                            description=desc or f"Investment from {investor}"
-                        )
-                        if success:
-                            st.success(f"✅ AED {amount:,.2f} invested in {unit}")
-                            st.rerun()
-                        else:
-                            st.error("Failed to record investment")
+                        try:
+                            success = distribute_investment(
+                                unit=unit,
+                                amount=amount,
+                                investor=investor,
+                                description=desc or f"Investment from {investor}"
+                            )
+                            if success:
+                                st.success(f"✅ AED {amount:,.2f} invested in {unit}")
+                                st.rerun()
+                            else:
+                                st.error("Failed to record investment")
+                        except ValueError as e:
+                            st.error(str(e))
             
             st.subheader(f"📋 {unit} Investment History")
             if 'investments' in st.session_state:
@@ -70,13 +76,15 @@ def show_investments():
                 if not unit_inv.empty:
                     col1, col2 = st.columns([3, 1])
                     with col1:
-                        st.dataframe(
-                            unit_inv.sort_values('Date', ascending=False).style.format({
-                                'Amount': 'AED {:,.2f}',
-                                'Date': lambda x: x.strftime('%Y-%m-%d')
-                            }),
-                            height=300,
-                            use_container_width=True
+                        show_paginated_table(
+                            st.session_state.investments,
+                            key=f"investment_history_{unit}",
+                            positions=latest_positions('investments', unit),
+                            column_config={
+                                'Date': date_column(),
+                                'Amount': money_column("Amount")
+                            },
+                            height=300
                         )
                     with col2:
                         total = unit_inv['Amount'].sum()
@@ -97,6 +105,8 @@ def show_investments():
                     st.info("No investments recorded")
             else:
                 st.info("No investments recorded")
+    
+    show_bulk_import('investments', user)
 
 if __name__ == "__main__":
     show_investments()
\ No newline at end of file
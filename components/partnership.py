@@ -1,6 +1,6 @@
 import streamlit as st
 import pandas as pd
-from utils import redistribute_shares
+from utils import redistribute_shares, set_partner_table
 from .auth import has_permission
 
 def initialize_partnership_data():
@@ -59,7 +59,7 @@ def show_existing_partners(unit):
             )
             if st.button(f"Confirm Removal of {partner_to_remove}", key=f"confirm_remove_{unit}"):
                 removed_share = partners_df.loc[partners_df['Partner'] == partner_to_remove, 'Share'].values[0]
-                st.session_state.partners[unit] = partners_df[partners_df['Partner'] != partner_to_remove]
+                set_partner_table(unit, partners_df[partners_df['Partner'] != partner_to_remove])
                 st.session_state[f'removed_share_{unit}'] = removed_share
                 st.session_state[f'partner_removed_{unit}'] = True
                 st.success(f"{partner_to_remove} removed. Freed share: {removed_share:.1f}%")
@@ -81,10 +81,10 @@ def handle_freed_share(unit):
     if action == "Redistribute Among Existing Partners":
         if st.button(f"Redistribute {removed_share:.1f}%", key=f"redist_{unit}"):
             if not st.session_state.partners[unit].empty:
-                st.session_state.partners[unit] = redistribute_shares(
+                set_partner_table(unit, redistribute_shares(
                     st.session_state.partners[unit],
                     removed_share
-                )
+                ))
                 st.success(f"Redistributed {removed_share:.1f}% among existing partners")
                 del st.session_state[f'removed_share_{unit}']
                 del st.session_state[f'partner_removed_{unit}']
@@ -108,16 +108,16 @@ def handle_freed_share(unit):
                 elif new_partner_name in st.session_state.partners[unit]['Partner'].values:
                     st.error("Partner with this name already exists")
                 else:
-                    st.session_state.partners[unit] = pd.concat([
+                    set_partner_table(unit, pd.concat([
                         st.session_state.partners[unit],
                         pd.DataFrame([{'Partner': new_partner_name, 'Share': new_partner_share, 'Withdrawn': 0}])
-                    ], ignore_index=True)
+                    ], ignore_index=True))
                     remaining_share = removed_share - new_partner_share
                     if remaining_share > 0 and not st.session_state.partners[unit].empty:
-                        st.session_state.partners[unit] = redistribute_shares(
+                        set_partner_table(unit, redistribute_shares(
                             st.session_state.partners[unit],
                             remaining_share
-                        )
+                        ))
                     st.success(f"Added {new_partner_name} with {new_partner_share:.1f}% share")
                     del st.session_state[f'removed_share_{unit}']
                     del st.session_state[f'partner_removed_{unit}']
@@ -167,8 +167,8 @@ def show_add_partner_form(unit):
                 if (current_total + share) > 100:
                     st.error(f"Adding {share:.1f}% would exceed 100% (current total: {current_total:.1f}%)")
                 else:
-                    st.session_state.partners[unit] = pd.concat([
+                    set_partner_table(unit, pd.concat([
                         partners_df,
                         pd.DataFrame([{'Partner': partner_name, 'Share': share, 'Withdrawn': 0}])
-                    ], ignore_index=True)
+                    ], ignore_index=True))
                     st.success(f"Added {partner_name} with {share:.1f}% share to {unit}")
\ No newline at end of file
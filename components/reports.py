@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+from datetime import date
 from utils import (
     calculate_inventory_value,
     calculate_profit_loss,
@@ -8,7 +9,15 @@ from utils import (
     calculate_combined_partner_profits,
     initialize_default_data
 )
+from data.ledger_index import range_positions
+from data.archive import query_ledger
+from data.cogs import book_summary, COGS_METHOD
+from data.cube import monthly_pnl, expenses_by_category, cube_drilldown
+from data.reconcile import reconcile_cash_balances
+from data.period_close import close_period, closed_through, latest_closing_balances
+from data.analytics import analytics_available, report_query_result, REPORT_QUERIES
 from .auth import has_permission
+from .tables import show_paginated_table, money_column, quantity_column, date_column
 
 def show_reports():
     """Business reporting dashboard"""
@@ -31,19 +40,77 @@ def show_reports():
         units.append('Combined')
     
     # Report selection
-    report_type = st.selectbox(
-        "Select Report Type",
-        ["Financial Summary", "Inventory Analysis", "Partner Distributions"]
-    )
+    report_types = [
+        "Financial Summary", "Inventory Analysis", "Period Analysis",
+        "Partner Distributions", "Cash Reconciliation"
+    ]
+    if analytics_available():
+        report_types.append("Analytics")
+    # Closing archives every unit's rows, so it needs access to all units
+    if has_permission(user['role'], 'period_close') and user['business_unit'] == 'All':
+        report_types.append("Period Close")
+    report_type = st.selectbox("Select Report Type", report_types)
+    
+    # Optional reporting period, served from the ledgers' date indexes
+    period = (None, None)
+    if report_type in ("Financial Summary", "Inventory Analysis") and st.checkbox("Filter by date range", key="report_use_period"):
+        selected = st.date_input(
+            "Date range",
+            value=(date.today().replace(day=1), date.today()),
+            key="report_period"
+        )
+        if isinstance(selected, (list, tuple)) and len(selected) == 2:
+            period = tuple(selected)
     
     if report_type == "Financial Summary":
-        show_financial_report(units)
+        show_financial_report(units, period)
     elif report_type == "Inventory Analysis":
-        show_inventory_report(units)
+        show_inventory_report(units, period)
+    elif report_type == "Period Analysis":
+        show_period_report(units)
+    elif report_type == "Cash Reconciliation":
+        show_reconciliation_report(units)
+    elif report_type == "Analytics":
+        show_analytics_report(user)
+    elif report_type == "Period Close":
+        show_period_close(units)
     else:
         show_partner_report(units)
 
-def show_financial_report(units):
+def show_period_activity(units, period):
+    """Sales, purchases and expenses booked within a date range"""
+    start, end = period
+    st.write(f"### Activity {start:%Y-%m-%d} to {end:%Y-%m-%d}")
+    
+    data = []
+    for unit in units:
+        inventory = query_ledger('inventory', unit, start, end)
+        expenses = query_ledger('expenses', unit, start, end)
+        investments = query_ledger('investments', unit, start, end)
+        operating = expenses[
+            ~expenses['Category'].isin(['Partner Withdrawal', 'Partner Contribution'])
+        ]
+        data.append({
+            'Unit': unit,
+            'Sales': float(inventory.loc[inventory['Transaction Type'] == 'Sale', 'Total Amount'].sum()),
+            'Purchases': float(inventory.loc[inventory['Transaction Type'] == 'Purchase', 'Total Amount'].sum()),
+            'Operating Expenses': float(operating['Amount'].sum()),
+            'Investments': float(investments['Amount'].sum())
+        })
+    
+    st.dataframe(
+        pd.DataFrame(data),
+        column_config={
+            'Sales': money_column("Sales"),
+            'Purchases': money_column("Purchases"),
+            'Operating Expenses': money_column("Operating Expenses"),
+            'Investments': money_column("Investments")
+        },
+        hide_index=True,
+        use_container_width=True
+    )
+
+def show_financial_report(units, period=(None, None)):
     """Financial performance report"""
     st.subheader("💰 Financial Summary")
     
@@ -97,40 +164,241 @@ def show_financial_report(units):
         labels={'value': 'Amount (AED)'}
     )
     st.plotly_chart(fig, use_container_width=True)
+    
+    if period[0] is not None:
+        show_period_activity(units, period)
 
-def show_inventory_report(units):
+def show_inventory_report(units, period=(None, None)):
     """Inventory analysis report"""
     st.subheader("📦 Inventory Analysis")
     
     for unit in units:
         if unit == 'Combined':
-            inventory = st.session_state.inventory.copy()
             st.write("### Combined Inventory")
         else:
-            inventory = st.session_state.inventory[
-                st.session_state.inventory['Business Unit'] == unit
-            ].copy()
             st.write(f"### {unit} Inventory")
+        # A date range may reach into closed periods held in the archive
+        if period[0] is not None:
+            rows = query_ledger('inventory', unit, *period)
+            positions = list(range(len(rows)))
+        else:
+            rows = st.session_state.inventory
+            positions = range_positions('inventory', unit)
         
-        if not inventory.empty:
+        if positions:
             # Current status
             stock, value = calculate_inventory_value(unit.split()[-1])
             cols = st.columns(2)
             cols[0].metric("Current Stock", f"{stock:,.2f} kg")
             cols[1].metric("Current Value", f"AED {value:,.2f}")
             
+            # Margin per SKU from the cost-of-goods lot books
+            books = book_summary(None if unit == 'Combined' else unit)
+            if not books.empty:
+                with st.expander(f"Cost of Goods Sold ({COGS_METHOD})"):
+                    st.dataframe(
+                        books,
+                        column_config={
+                            col: money_column(col)
+                            for col in ['Revenue', 'COGS', 'Stock Cost', 'Gross Margin']
+                        },
+                        hide_index=True,
+                        use_container_width=True
+                    )
+            
             # Transactions
-            st.dataframe(
-                inventory.sort_values('Date', ascending=False).style.format({
-                    'Quantity_kg': '{:,.2f} kg',
-                    'Unit Price': 'AED {:,.2f}',
-                    'Total Amount': 'AED {:,.2f}'
-                }),
+            show_paginated_table(
+                rows,
+                key=f"inventory_report_{unit}",
+                positions=positions,
+                column_config={
+                    'Date': date_column(),
+                    'Quantity_kg': quantity_column("Quantity"),
+                    'Unit Price': money_column("Unit Price"),
+                    'Total Amount': money_column("Total Amount")
+                },
                 height=300
             )
         else:
             st.info("No inventory data")
 
+def show_period_report(units):
+    """Monthly P&L, expense mix and trends served from the aggregate cube"""
+    st.subheader("📅 Period Analysis")
+    
+    unit = st.selectbox("Business Unit", units, key="period_report_unit")
+    pnl = monthly_pnl(unit)
+    if pnl.empty:
+        st.info("No ledger data")
+        return
+    
+    st.write("### Monthly Profit & Loss")
+    st.dataframe(
+        pnl,
+        column_config={
+            col: money_column(col) for col in pnl.columns if col != 'Month'
+        },
+        hide_index=True,
+        use_container_width=True
+    )
+    
+    fig = px.line(
+        pnl.melt(id_vars=['Month'], value_vars=['Sales', 'Purchases', 'Net Profit']),
+        x='Month', y='value', color='variable',
+        title="Monthly Trend",
+        labels={'value': 'Amount (AED)'},
+        markers=True
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    
+    by_category = expenses_by_category(unit)
+    if not by_category.empty:
+        st.write("### Expenses by Category")
+        fig = px.bar(
+            by_category, x='Month', y='Amount', color='Category',
+            title="Operating Expenses by Category",
+            labels={'Amount': 'Amount (AED)'}
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    
+    # Raw rows are only read when explicitly requested
+    with st.expander("Drill down to transactions"):
+        cols = st.columns(2)
+        with cols[0]:
+            month = st.selectbox("Month", pnl['Month'][::-1], key="period_drill_month")
+        with cols[1]:
+            ledger = st.selectbox(
+                "Ledger",
+                ["inventory", "expenses", "investments"],
+                format_func=lambda x: x.capitalize(),
+                key="period_drill_ledger"
+            )
+        if st.button("Show transactions", key="period_drill_show"):
+            rows = cube_drilldown(ledger, unit, month)
+            if rows.empty:
+                st.info("No transactions in this period")
+            else:
+                st.dataframe(rows, hide_index=True, use_container_width=True)
+
+def show_reconciliation_report(units):
+    """Cash balances recomputed from the ledgers and checked against the transaction log"""
+    st.subheader("🧾 Cash Reconciliation")
+    
+    try:
+        result = reconcile_cash_balances()
+    except Exception as e:
+        st.error(str(e))
+        return
+    
+    visible = [u for u in units if u != 'Combined']
+    summary = result['summary'][result['summary']['Business Unit'].isin(visible)]
+    st.dataframe(
+        summary,
+        column_config={
+            col: money_column(col)
+            for col in ['Opening', 'Movements', 'Expected', 'Actual', 'Difference']
+        },
+        hide_index=True,
+        use_container_width=True
+    )
+    if summary['Balanced'].all():
+        st.success("Cash balances match the ledgers")
+    else:
+        st.error("Cash balances differ from the ledgers")
+    
+    sections = [
+        ('overdrafts', "Movements that overdrew the account"),
+        ('missing_transactions', "Ledger rows with no matching transaction"),
+        ('orphan_transactions', "Transactions with no matching ledger row")
+    ]
+    for key, title in sections:
+        rows = result[key]
+        if 'Business Unit' in rows.columns:
+            rows = rows[rows['Business Unit'].isin(visible)]
+        with st.expander(f"{title} ({len(rows):,})"):
+            if rows.empty:
+                st.info("None")
+            else:
+                show_paginated_table(rows, key=f"reconcile_{key}", positions=list(range(len(rows))))
+
+def show_period_close(units):
+    """Close completed months and show the rolled-up closing balances"""
+    st.subheader("🔒 Period Close")
+    
+    through = closed_through()
+    st.write(f"Closed through: {through:%Y-%m-%d}" if through else "No period has been closed yet")
+    
+    last_month = pd.Period(date.today(), freq='M') - 1
+    first_month = pd.Period(through, freq='M') + 1 if through else last_month - 23
+    months = [str(p) for p in pd.period_range(first_month, last_month, freq='M')][::-1]
+    if not months:
+        st.info("Every completed month is already closed")
+    else:
+        cols = st.columns(2)
+        with cols[0]:
+            month = st.selectbox("Close through month", months, key="period_close_month")
+        with cols[1]:
+            force = st.checkbox("Close even if cash does not reconcile", key="period_close_force")
+        st.caption(
+            "Rows dated up to the end of the selected month move to the archive and "
+            "can no longer be posted to or edited."
+        )
+        if st.button("Close Period", key="period_close_btn"):
+            try:
+                with st.spinner("Closing period..."):
+                    close_period(month, force=force)
+                st.success(f"Closed through {month}")
+                st.rerun()
+            except Exception as e:
+                st.error(str(e))
+    
+    closing = latest_closing_balances()
+    if not closing.empty:
+        st.subheader(f"Closing Balances — {closing['Period'].iloc[0]}")
+        visible = [u for u in units if u != 'Combined']
+        st.dataframe(
+            closing[closing['Business Unit'].isin(visible)],
+            column_config={
+                'Amount': money_column('Amount'),
+                'Quantity': quantity_column('Quantity')
+            },
+            hide_index=True,
+            use_container_width=True
+        )
+
+def show_analytics_report(user):
+    """Ad-hoc and predefined analytical queries run by the embedded DuckDB engine"""
+    st.subheader("🧮 Analytics")
+    
+    queries = list(REPORT_QUERIES.keys())
+    if has_permission(user['role'], 'user_management'):
+        queries.append("Custom SQL")
+    name = st.selectbox("Query", queries, key="analytics_query")
+    
+    if name == "Custom SQL":
+        st.caption("Tables: inventory, expenses, investments, transactions, price_history")
+        sql = st.text_area("SQL", value="SELECT * FROM inventory", key="analytics_sql")
+    else:
+        st.caption(REPORT_QUERIES[name]['description'])
+        sql = REPORT_QUERIES[name]['sql']
+    
+    # Clicking re-runs the script, which picks up the finished Future
+    st.button("Refresh", key="analytics_refresh")
+    
+    try:
+        result = report_query_result(f"analytics_{name}", sql)
+    except Exception as e:
+        st.error(str(e))
+        return
+    
+    if result is None:
+        st.info("Report is running in the background. Press Refresh to check for results.")
+    elif result.empty:
+        st.info("No data")
+    else:
+        st.dataframe(result, hide_index=True, use_container_width=True)
+        st.caption(f"{len(result):,} rows")
+
 def show_partner_report(units):
     """Partner distributions report"""
     st.subheader("👥 Partner Distributions")
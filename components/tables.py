@@ -0,0 +1,68 @@
+import math
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+DEFAULT_PAGE_SIZE = 25
+
+def money_column(label):
+    """Column config for AED amounts"""
+    return st.column_config.NumberColumn(label, format="AED %.2f")
+
+def quantity_column(label):
+    """Column config for kilogram quantities"""
+    return st.column_config.NumberColumn(label, format="%.2f kg")
+
+def date_column(label="Date"):
+    """Column config for ledger dates"""
+    return st.column_config.DateColumn(label, format="YYYY-MM-DD")
+
+def date_sorted_positions(df, date_col='Date', ascending=False):
+    """Return row positions of df ordered by date, leaving the frame itself unsorted"""
+    if df.empty or date_col not in df.columns:
+        return np.arange(len(df))
+    dates = pd.to_datetime(df[date_col], errors='coerce').values
+    order = np.argsort(dates, kind='stable')
+    return order if ascending else order[::-1]
+
+def show_paginated_table(df, key, positions=None, column_config=None,
+                         page_size=DEFAULT_PAGE_SIZE, height=None):
+    """Render one page of a ledger table.
+
+    Only the rows on the visible page are sliced out of ``df`` and sent to the
+    browser; formatting is done client-side through ``column_config``.
+    """
+    if positions is None:
+        positions = date_sorted_positions(df)
+    total = len(positions)
+    if total == 0:
+        st.info("No records")
+        return
+
+    pages = max(1, math.ceil(total / page_size))
+    if pages > 1:
+        cols = st.columns([1, 3])
+        with cols[0]:
+            page = st.number_input(
+                "Page",
+                min_value=1,
+                max_value=pages,
+                value=1,
+                step=1,
+                key=f"{key}_page"
+            )
+    else:
+        page = 1
+
+    start = (int(page) - 1) * page_size
+    end = min(start + page_size, total)
+    page_df = df.iloc[np.asarray(positions[start:end])]
+
+    st.dataframe(
+        page_df,
+        column_config=column_config,
+        hide_index=True,
+        use_container_width=True,
+        height=height
+    )
+    st.caption(f"Showing {start + 1:,}–{end:,} of {total:,} records (page {int(page)} of {pages})")
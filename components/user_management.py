@@ -1,5 +1,6 @@
 import streamlit as st
 import pandas as pd
+from data.session_spill import spill_available, spill_metrics, SPILL_AFTER_MINUTES
 from .auth import (
     get_users, create_user, delete_user, update_user,
     ROLES
@@ -49,6 +50,22 @@ def show_user_management():
     except Exception as e:
         st.error(f"Error loading users: {str(e)}")
 
+    show_session_memory()
+
+def show_session_memory():
+    """Resident vs spilled sessions, to size the server's memory"""
+    with st.expander("Session Memory"):
+        if not spill_available():
+            st.info("Session spilling is unavailable in this Streamlit version")
+            return
+        metrics = spill_metrics()
+        cols = st.columns(4)
+        cols[0].metric("Resident Sessions", metrics['resident_sessions'])
+        cols[1].metric("Spilled Sessions", metrics['spilled_sessions'])
+        cols[2].metric("Resident Private State", f"{metrics['resident_bytes'] / 2**20:,.1f} MB")
+        cols[3].metric("Spilled to Disk", f"{metrics['spilled_bytes'] / 2**20:,.1f} MB")
+        st.caption(f"Sessions idle for {SPILL_AFTER_MINUTES:g} minutes are spilled to disk")
+
 def display_user_table(users):
     df = pd.DataFrame(users)
     df = df[['username', 'full_name', 'role', 'business_unit', 'created_at', 'last_login']]
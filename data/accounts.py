@@ -0,0 +1,54 @@
+import streamlit as st
+from data.shared_ledger import shared_write
+
+class InsufficientFunds(ValueError):
+    """A debit larger than the balance or limit it is taken from"""
+
+def cash_account(unit):
+    return ('cash', unit)
+
+def partner_account(unit, partner, column):
+    return ('partner', unit, partner, column)
+
+def _get(account):
+    if account[0] == 'cash':
+        return float(st.session_state.cash_balance.get(account[1], 0.0))
+    _, unit, partner, column = account
+    partners_df = st.session_state.partners[unit]
+    rows = partners_df.index[partners_df['Partner'] == partner]
+    if len(rows) == 0:
+        raise ValueError(f"Partner {partner} not found in {unit}")
+    if column not in partners_df.columns:
+        return 0.0
+    return float(partners_df.at[rows[0], column])
+
+def _set(account, value):
+    # Copy-on-write: replace the containers other sessions may still hold
+    if account[0] == 'cash':
+        st.session_state.cash_balance = {**st.session_state.cash_balance, account[1]: value}
+        return
+    _, unit, partner, column = account
+    partners_df = st.session_state.partners[unit].copy()
+    if column not in partners_df.columns:
+        partners_df[column] = 0.0
+    partners_df.at[partners_df.index[partners_df['Partner'] == partner][0], column] = value
+    st.session_state.partners = {**st.session_state.partners, unit: partners_df}
+
+def update_account(account, change):
+    """Apply change(current) -> new value to a balance.
+
+    Runs on the shared ledger's write path, whose exclusive lock makes the
+    read, the checks in change and the write one step against every other
+    session; callers are business operations, which already hold it.
+    change may raise ValueError (e.g. InsufficientFunds) to reject the
+    update. Returns (old value, new value).
+
+    There is no version compare-and-swap: the lock already serializes every
+    read-check-write, and it is only held for the operation body, not while
+    the operation's event is committed, so a CAS retry loop would never fire.
+    """
+    with shared_write():
+        current = _get(account)
+        value = change(current)
+        _set(account, value)
+        return current, value
@@ -0,0 +1,110 @@
+from datetime import date
+import numpy as np
+import pandas as pd
+import streamlit as st
+from data.sku import STOCK_COLUMNS, sku_column, sku_prices
+from data.ledger_index import frame_ref, built_from
+
+AGING_BUCKETS = ['0–30 days', '31–90 days', '90+ days']
+AGING_COLUMNS = ['Business Unit', 'SKU', 'Bucket', 'Quantity', 'Value']
+
+def _movements():
+    """Purchases and sales as aligned arrays, with stock carried from closed periods as purchases"""
+    inventory = st.session_state.get('inventory')
+    frames = []
+    if inventory is not None and not inventory.empty:
+        frames.append(pd.DataFrame({
+            'unit': inventory['Business Unit'].to_numpy(),
+            'sku': sku_column(inventory).to_numpy(),
+            'kind': inventory['Transaction Type'].to_numpy(),
+            'day': np.asarray(pd.to_datetime(inventory['Date'], errors='coerce'), dtype='datetime64[D]'),
+            'quantity': pd.to_numeric(inventory['Quantity_kg'], errors='coerce').fillna(0.0).to_numpy()
+        }))
+    closing = st.session_state.get('closing_stock')
+    through = st.session_state.get('closed_through')
+    if closing is not None and not closing.empty and through is not None:
+        # Closed periods keep no lot dates; their stock counts as bought on the closing day
+        closing = closing[STOCK_COLUMNS][closing['Quantity'] > 0]
+        frames.append(pd.DataFrame({
+            'unit': closing['Business Unit'].to_numpy(),
+            'sku': closing['SKU'].to_numpy(),
+            'kind': 'Purchase',
+            'day': np.datetime64(through, 'D'),
+            'quantity': closing['Quantity'].to_numpy(dtype=float)
+        }))
+    if not frames:
+        return None
+    return pd.concat(frames, ignore_index=True)
+
+def _build_aging(as_of):
+    moves = _movements()
+    if moves is None:
+        return pd.DataFrame(columns=AGING_COLUMNS[:-1]), pd.DataFrame(columns=['Business Unit', 'Avg Days Held'])
+    unit_codes, units = pd.factorize(moves['unit'])
+    sku_codes, skus = pd.factorize(moves['sku'])
+    moves['group'] = unit_codes * len(skus) + sku_codes
+    n_groups = len(units) * len(skus)
+    moves = moves.sort_values(['group', 'day'], kind='stable')
+    purchases = moves[moves['kind'] == 'Purchase']
+    sales = moves[moves['kind'] == 'Sale']
+
+    # Cumulative quantities per group, shifted into disjoint ranges so one
+    # searchsorted over all groups matches each sale to the lot it drew on
+    span = float(moves['quantity'].sum()) + 1.0
+    p_group = purchases['group'].to_numpy()
+    p_qty = purchases['quantity'].to_numpy()
+    p_cum = purchases.groupby('group')['quantity'].cumsum().to_numpy()
+    p_days = purchases['day'].to_numpy()
+    s_group = sales['group'].to_numpy()
+    s_cum = sales.groupby('group')['quantity'].cumsum().to_numpy()
+
+    lot = np.searchsorted(p_cum + p_group * span, s_cum + s_group * span, side='left')
+    if len(p_cum):
+        lot = np.minimum(lot, len(p_cum) - 1)
+        # A sale beyond its group's purchases lands on another group's lot
+        matched = p_group[lot] == s_group
+    else:
+        matched = np.zeros(len(s_cum), dtype=bool)
+    held = (sales['day'].to_numpy()[matched] - p_days[lot[matched]]).astype('timedelta64[D]').astype(float)
+    held_units = units[s_group[matched] // len(skus)]
+    days_held = pd.DataFrame({'Business Unit': held_units, 'Avg Days Held': held}).groupby(
+        'Business Unit', as_index=False
+    )['Avg Days Held'].mean().round(1)
+
+    # FIFO: sales use up the oldest lots, so stock remaining is the newest purchases
+    sold = np.bincount(s_group, weights=sales['quantity'].to_numpy(), minlength=n_groups)
+    remaining = np.clip(p_cum - sold[p_group], 0.0, p_qty)
+    age = (np.datetime64(as_of, 'D') - p_days).astype('timedelta64[D]').astype(float)
+    bucket = np.select([age <= 30, age <= 90], AGING_BUCKETS[:2], AGING_BUCKETS[2])
+    aging = pd.DataFrame({
+        'Business Unit': units[p_group // len(skus)],
+        'SKU': skus[p_group % len(skus)],
+        'Bucket': bucket,
+        'Quantity': remaining
+    })
+    aging = aging[aging['Quantity'] > 0].groupby(
+        ['Business Unit', 'SKU', 'Bucket'], as_index=False
+    )['Quantity'].sum()
+    return aging, days_held
+
+def inventory_aging(unit=None, as_of=None):
+    """Remaining stock by age band with its value at current prices, plus average days held of sold stock.
+
+    Returns (aging, days_held). Quantities are recomputed only when the
+    ledger or the day changes; values always use the latest prices.
+    """
+    as_of = as_of or date.today()
+    inventory = st.session_state.get('inventory')
+    key = (0 if inventory is None else len(inventory), st.session_state.get('closed_through'), as_of)
+    cached = st.session_state.get('inventory_aging')
+    if cached is None or cached['key'] != key or not built_from(cached['frame'], inventory):
+        cached = {'key': key, 'frame': frame_ref(inventory), 'result': _build_aging(as_of)}
+        st.session_state['inventory_aging'] = cached
+    aging, days_held = cached['result']
+    if unit is not None:
+        aging = aging[aging['Business Unit'] == unit]
+        days_held = days_held[days_held['Business Unit'] == unit]
+    aging = aging.assign(
+        Value=aging['Quantity'] * aging['SKU'].map(pd.Series(sku_prices(), dtype=float)).fillna(0.0)
+    )
+    return aging[AGING_COLUMNS], days_held
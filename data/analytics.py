@@ -0,0 +1,199 @@
+import os
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import streamlit as st
+from data.archive import archive_partitions
+
+try:
+    import duckdb
+except ImportError:  # optional dependency, the analytics reports are hidden without it
+    duckdb = None
+
+REPORT_TABLES = ('inventory', 'expenses', 'investments', 'transactions', 'price_history')
+MAX_RESULT_ROWS = 100_000
+DUCKDB_MEMORY_LIMIT = os.environ.get('BIZMASTER_DUCKDB_MEMORY_LIMIT', '1GB')
+DUCKDB_THREADS = int(os.environ.get('BIZMASTER_DUCKDB_THREADS', os.cpu_count() or 4))
+DUCKDB_TEMP_DIR = os.path.join(tempfile.gettempdir(), 'bizmaster_duckdb')
+
+# Report queries run off the Streamlit script thread
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='report-query')
+
+REPORT_QUERIES = {
+    'Period Comparison': {
+        'description': 'Monthly sales, purchases and expenses per unit compared with the previous month',
+        'sql': '''
+            WITH movements AS (
+                SELECT "Business Unit" AS unit, date_trunc('month', CAST("Date" AS DATE)) AS month,
+                       CASE WHEN "Transaction Type" = 'Sale' THEN CAST("Total Amount" AS DOUBLE) ELSE 0 END AS sales,
+                       CASE WHEN "Transaction Type" = 'Purchase' THEN CAST("Total Amount" AS DOUBLE) ELSE 0 END AS purchases,
+                       0 AS expenses
+                FROM inventory
+                UNION ALL
+                SELECT "Business Unit", date_trunc('month', CAST("Date" AS DATE)), 0, 0, CAST("Amount" AS DOUBLE)
+                FROM expenses
+                WHERE "Category" NOT IN ('Partner Withdrawal', 'Partner Contribution')
+            ), monthly AS (
+                SELECT unit, month, SUM(sales) AS sales, SUM(purchases) AS purchases,
+                       SUM(expenses) AS expenses,
+                       SUM(sales) - SUM(purchases) - SUM(expenses) AS net_profit
+                FROM movements
+                GROUP BY unit, month
+            )
+            SELECT unit AS "Business Unit", strftime(month, '%Y-%m') AS "Month",
+                   ROUND(sales, 2) AS "Sales", ROUND(purchases, 2) AS "Purchases",
+                   ROUND(expenses, 2) AS "Operating Expenses", ROUND(net_profit, 2) AS "Net Profit",
+                   ROUND(net_profit - LAG(net_profit) OVER (PARTITION BY unit ORDER BY month), 2)
+                       AS "Change vs Previous Month"
+            FROM monthly
+            ORDER BY unit, month
+        '''
+    },
+    'Trades vs Market Price': {
+        'description': 'Each purchase and sale against the market price of its SKU in effect on its date',
+        'sql': '''
+            SELECT CAST(i."Date" AS DATE) AS "Date", i."Business Unit", i."Transaction Type",
+                   COALESCE(CAST(i."SKU" AS VARCHAR), 'Standard') AS "SKU",
+                   CAST(i."Quantity_kg" AS DOUBLE) AS "Quantity_kg",
+                   CAST(i."Unit Price" AS DOUBLE) AS "Unit Price", p."Price" AS "Market Price",
+                   ROUND((CAST(i."Unit Price" AS DOUBLE) - p."Price") * CAST(i."Quantity_kg" AS DOUBLE), 2)
+                       AS "Difference vs Market"
+            FROM inventory i
+            ASOF LEFT JOIN (
+                SELECT COALESCE(CAST("SKU" AS VARCHAR), 'Standard') AS sku,
+                       CAST("Date" AS DATE) AS price_date, CAST("Price" AS DOUBLE) AS "Price"
+                FROM price_history
+            ) p ON COALESCE(CAST(i."SKU" AS VARCHAR), 'Standard') = p.sku
+               AND CAST(i."Date" AS DATE) >= p.price_date
+            ORDER BY "Date" DESC
+        '''
+    },
+    'Expense Breakdown': {
+        'description': 'Operating expenses per unit and category with their share of the unit total',
+        'sql': '''
+            SELECT "Business Unit", "Category", ROUND(SUM(amount), 2) AS "Amount",
+                   ROUND(100 * SUM(amount) / SUM(SUM(amount)) OVER (PARTITION BY "Business Unit"), 2)
+                       AS "Share %"
+            FROM (SELECT *, CAST("Amount" AS DOUBLE) AS amount FROM expenses)
+            WHERE "Category" NOT IN ('Partner Withdrawal', 'Partner Contribution')
+            GROUP BY "Business Unit", "Category"
+            ORDER BY "Business Unit", "Amount" DESC
+        '''
+    }
+}
+
+def analytics_available():
+    """True when the DuckDB engine can be used"""
+    return duckdb is not None
+
+def report_sources():
+    """Capture the current ledgers for a query; must be called on the script thread.
+
+    A ledger with closed periods maps to a list: its live frame, rows
+    archived in memory, and its archive Parquet files, queried as one table.
+    """
+    sources = {}
+    for name in REPORT_TABLES:
+        if not isinstance(st.session_state.get(name), pd.DataFrame):
+            continue
+        parts = [st.session_state[name]]
+        archived = st.session_state.get(f"archived_{name}")
+        if isinstance(archived, pd.DataFrame) and not archived.empty:
+            parts.append(archived)
+        parts.extend(os.path.abspath(path) for path in archive_partitions(name))
+        sources[name] = parts[0] if len(parts) == 1 else parts
+    return sources
+
+def _source_version(source):
+    # Row counts and file names identify the ledger state a result was computed from
+    if isinstance(source, str):
+        return source
+    if isinstance(source, list):
+        return tuple(_source_version(part) for part in source)
+    return len(source)
+
+def _connect():
+    os.makedirs(DUCKDB_TEMP_DIR, exist_ok=True)
+    return duckdb.connect(database=':memory:', config={
+        'memory_limit': DUCKDB_MEMORY_LIMIT,
+        'threads': DUCKDB_THREADS,
+        'temp_directory': DUCKDB_TEMP_DIR
+    })
+
+def _literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+def _run_query(sql, sources, params, limit):
+    con = _connect()
+    try:
+        paths = []
+        for name, source in sources.items():
+            parts = source if isinstance(source, list) else [source]
+            selects = []
+            frames = [part for part in parts if not isinstance(part, str)]
+            for i, frame in enumerate(frames):
+                con.register(f"{name}__part{i}", frame)
+                selects.append(f"SELECT * FROM {name}__part{i}")
+            files = [part for part in parts if isinstance(part, str)]
+            if files:
+                listed = ', '.join(_literal(path) for path in files)
+                selects.append(f"SELECT * FROM read_parquet([{listed}], union_by_name = true)")
+                paths.extend(files)
+            # Live and archived rows are one table to the report SQL
+            con.execute(f"CREATE VIEW {name} AS {' UNION ALL BY NAME '.join(selects)}")
+        # Report SQL may read the registered archive files and nothing else
+        if paths:
+            con.execute(f"SET allowed_paths = [{', '.join(_literal(path) for path in paths)}]")
+        con.execute("SET enable_external_access = false")
+        return con.execute(
+            f"SELECT * FROM ({sql}) AS report LIMIT {int(limit)}",
+            params or []
+        ).df()
+    finally:
+        con.close()
+
+def submit_report_query(sql, params=None, sources=None, limit=MAX_RESULT_ROWS):
+    """Run a report query on the background pool and return a Future of a DataFrame.
+
+    Sources map table names to DataFrames or Parquet paths; by default the
+    session ledgers are used. Results are capped at ``limit`` rows.
+    """
+    if not analytics_available():
+        raise ValueError("DuckDB is not installed")
+    if sources is None:
+        sources = report_sources()
+    return _executor.submit(_run_query, sql, sources, params, limit)
+
+def report_query_result(key, sql, params=None, sources=None):
+    """Non-blocking report helper for pages.
+
+    Submits the query once per (key, sql, ledger state) and returns the
+    result if it has finished, or None while it is still running.
+    """
+    if sources is None:
+        sources = report_sources()
+    version = {name: _source_version(source) for name, source in sources.items()}
+    pending = st.session_state.setdefault('report_queries', {})
+    entry = pending.get(key)
+    if entry is None or (entry['sql'], entry['params'], entry['version']) != (sql, params, version):
+        entry = {
+            'sql': sql,
+            'params': params,
+            'version': version,
+            'future': submit_report_query(sql, params, sources)
+        }
+        pending[key] = entry
+    future = entry['future']
+    if not future.done():
+        return None
+    try:
+        return future.result()
+    except Exception as e:
+        logging.error(f"Report query {key} failed: {str(e)}")
+        del pending[key]
+        raise ValueError(f"Report query failed: {str(e)}")
+
+def clear_report_query(key):
+    """Drop a cached report result so it is recomputed on the next request"""
+    st.session_state.get('report_queries', {}).pop(key, None)
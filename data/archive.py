@@ -0,0 +1,174 @@
+import os
+import logging
+import uuid
+import shutil
+import tempfile
+import pandas as pd
+import streamlit as st
+from data.ledger_index import ALL_UNITS, INDEXED_LEDGERS, range_positions
+from data.snapshots import to_arrow_table
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency; without it closed rows stay in session state
+    pq = None
+
+ARCHIVE_DIR = os.environ.get('BIZMASTER_ARCHIVE_DIR', 'archive')
+ARCHIVE_COMPRESSION = os.environ.get('BIZMASTER_ARCHIVE_COMPRESSION', 'zstd')
+# Ledgers without a unit column are archived under a single partition
+SHARED_PARTITION = 'All'
+
+def archive_available():
+    """True when pyarrow is installed and closed rows can go to Parquet"""
+    return pq is not None
+
+def _unit_dir(unit):
+    return f"unit={unit}"
+
+def _month_dir(month):
+    return f"month={month}"
+
+def _months(rows):
+    return pd.to_datetime(rows['Date'], errors='coerce').dt.strftime('%Y-%m')
+
+def archive_rows(ledger, rows, period, staged=None):
+    """Move closed rows to the archive tier, one Parquet file per unit and month.
+
+    Files are named after the closing period, so replaying the same close
+    from the event log rewrites identical files instead of duplicating rows.
+    With staged (from new_staging), files are written to a staging
+    directory and only listed there; promote_staged moves them into place.
+    """
+    if rows.empty:
+        return
+    if not archive_available():
+        key = f"archived_{ledger}"
+        st.session_state[key] = pd.concat(
+            [st.session_state.get(key, rows.head(0)), rows],
+            ignore_index=True
+        )
+        return
+    units = rows['Business Unit'] if 'Business Unit' in rows.columns else pd.Series(
+        SHARED_PARTITION, index=rows.index
+    )
+    for (unit, month), part in rows.groupby([units, _months(rows)], sort=False):
+        relative = os.path.join(ledger, _unit_dir(unit), _month_dir(month))
+        directory = os.path.join(ARCHIVE_DIR if staged is None else staged['dir'], relative)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(ARCHIVE_DIR, relative, f"{period}.parquet")
+        # Unique per writer, so a concurrent replay of the same close cannot share it
+        with tempfile.NamedTemporaryFile(dir=directory, suffix='.tmp', delete=False) as tmp:
+            tmp_path = tmp.name
+        try:
+            pq.write_table(to_arrow_table(part), tmp_path, compression=ARCHIVE_COMPRESSION)
+            if staged is None:
+                os.replace(tmp_path, path)
+            else:
+                staged['files'].append((tmp_path, path))
+        except Exception:
+            os.remove(tmp_path)
+            raise
+    logging.info(f"Archived {len(rows):,} {ledger} rows for {period}")
+
+def new_staging():
+    """Staging area for one close: its directory and (staged file, final path) pairs"""
+    return {'dir': os.path.join(ARCHIVE_DIR, '.staging', uuid.uuid4().hex), 'files': []}
+
+def promote_staged(staged):
+    """Move staged archive files into the archive, where queries find them"""
+    for tmp_path, path in staged['files']:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+    shutil.rmtree(staged['dir'], ignore_errors=True)
+
+def discard_staged(staged):
+    shutil.rmtree(staged['dir'], ignore_errors=True)
+
+def archive_partitions(ledger, unit=None, start=None, end=None):
+    """Parquet files of a ledger, pruned by unit and month directories"""
+    root = os.path.join(ARCHIVE_DIR, ledger)
+    if not os.path.isdir(root):
+        return []
+    first = None if start is None else f"{pd.Timestamp(start):%Y-%m}"
+    last = None if end is None else f"{pd.Timestamp(end):%Y-%m}"
+    if unit in (None, ALL_UNITS):
+        unit_dirs = sorted(os.listdir(root))
+    else:
+        unit_dirs = [
+            d for d in (_unit_dir(unit), _unit_dir(SHARED_PARTITION))
+            if os.path.isdir(os.path.join(root, d))
+        ]
+    files = []
+    for unit_dir in unit_dirs:
+        for month_dir in sorted(os.listdir(os.path.join(root, unit_dir))):
+            month = month_dir.split('=', 1)[-1]
+            if (first is not None and month < first) or (last is not None and month > last):
+                continue
+            directory = os.path.join(root, unit_dir, month_dir)
+            files.extend(
+                os.path.join(directory, name) for name in sorted(os.listdir(directory))
+                if name.endswith('.parquet')
+            )
+    return files
+
+def _in_range(rows, unit, start, end):
+    if rows.empty:
+        return rows
+    dates = pd.to_datetime(rows['Date'], errors='coerce')
+    mask = pd.Series(True, index=rows.index)
+    if start is not None:
+        mask &= dates >= pd.Timestamp(start)
+    if end is not None:
+        mask &= dates <= pd.Timestamp(end)
+    if unit not in (None, ALL_UNITS) and 'Business Unit' in rows.columns:
+        mask &= rows['Business Unit'] == unit
+    return rows[mask]
+
+def iter_archive(ledger, unit=None, start=None, end=None, batch_rows=65_536):
+    """Archived rows of a ledger for a unit within a date range, in frames of at most batch_rows.
+
+    Reads each partition file one row batch at a time, so the whole
+    closed history is never held in memory at once.
+    """
+    memory = st.session_state.get(f"archived_{ledger}")
+    if isinstance(memory, pd.DataFrame):
+        memory = _in_range(memory, unit, start, end)
+        for offset in range(0, len(memory), batch_rows):
+            yield memory.iloc[offset:offset + batch_rows]
+    if not archive_available():
+        return
+    for path in archive_partitions(ledger, unit, start, end):
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_rows):
+            part = batch.to_pandas()
+            # Match the hot ledgers, which hold plain dates
+            part['Date'] = pd.to_datetime(part['Date'], errors='coerce').dt.date
+            part = _in_range(part, unit, start, end)
+            if not part.empty:
+                yield part
+
+def read_archive(ledger, unit=None, start=None, end=None):
+    """Archived rows of a ledger for a unit within a date range"""
+    frames = [f for f in iter_archive(ledger, unit, start, end) if not f.empty]
+    if not frames:
+        return st.session_state[ledger].head(0)
+    return pd.concat(frames, ignore_index=True)
+
+def query_ledger(ledger, unit=None, start=None, end=None):
+    """Ledger rows across the hot store and the archive, newest first.
+
+    The archive is only opened when the range reaches into a closed
+    period, so queries over open periods never touch Parquet files.
+    """
+    if ledger in INDEXED_LEDGERS:
+        hot = st.session_state[ledger].iloc[range_positions(ledger, unit, start, end)]
+    else:
+        hot = _in_range(st.session_state[ledger], unit, start, end).iloc[::-1]
+    through = st.session_state.get('closed_through')
+    if through is None or (start is not None and pd.Timestamp(start).date() > through):
+        return hot
+    end = through if end is None else min(pd.Timestamp(end).date(), through)
+    archived = read_archive(ledger, unit, start, end)
+    if archived.empty:
+        return hot
+    order = pd.to_datetime(archived['Date']).to_numpy().argsort(kind='stable')[::-1]
+    return pd.concat([hot, archived.iloc[order]], ignore_index=True)
@@ -0,0 +1,240 @@
+import os
+from collections import deque
+import numpy as np
+import pandas as pd
+import streamlit as st
+from data.ledger_index import ALL_UNITS, range_positions
+from data.sku import sku_column
+
+COGS_METHODS = ('FIFO', 'Weighted Average')
+COGS_METHOD = os.environ.get('BIZMASTER_COGS_METHOD', 'FIFO')
+if COGS_METHOD not in COGS_METHODS:
+    raise ValueError(
+        f"Unknown BIZMASTER_COGS_METHOD '{COGS_METHOD}'; expected one of: {', '.join(COGS_METHODS)}"
+    )
+LOT_COLUMNS = ['Business Unit', 'SKU', 'Quantity', 'Unit Cost']
+TOTAL_COLUMNS = ['Business Unit', 'SKU', 'Revenue', 'COGS', 'Sold Quantity', 'Unmatched Quantity']
+
+def _new_book():
+    # lots holds [quantity, unit cost] pairs, oldest first; weighted average keeps one
+    return {'lots': deque(), 'revenue': 0.0, 'cogs': 0.0, 'sold': 0.0, 'unmatched': 0.0}
+
+def _copy_books(books):
+    return {
+        key: {**book, 'lots': deque([lot[:] for lot in book['lots']])}
+        for key, book in books.items()
+    }
+
+def _purchase(book, quantity, amount):
+    if quantity <= 0:
+        return
+    if COGS_METHOD == 'Weighted Average' and book['lots']:
+        lot = book['lots'][0]
+        held = lot[0] + quantity
+        lot[1] = (lot[0] * lot[1] + amount) / held
+        lot[0] = held
+    else:
+        book['lots'].append([quantity, amount / quantity])
+
+def _sale(book, quantity, amount):
+    """Consume lots oldest first and return the cost of the goods sold"""
+    book['revenue'] += amount
+    book['sold'] += quantity
+    cost = 0.0
+    remaining = quantity
+    lots = book['lots']
+    while remaining > 1e-9 and lots:
+        lot = lots[0]
+        taken = min(lot[0], remaining)
+        cost += taken * lot[1]
+        lot[0] -= taken
+        remaining -= taken
+        if lot[0] <= 1e-9:
+            lots.popleft()
+    # Sold beyond recorded stock: no cost basis to match
+    book['unmatched'] += max(remaining, 0.0)
+    book['cogs'] += cost
+    return cost
+
+def _unit_totals(books):
+    totals = {}
+    for (unit, _), book in books.items():
+        unit_total = totals.setdefault(unit, {'revenue': 0.0, 'cogs': 0.0})
+        unit_total['revenue'] += book['revenue']
+        unit_total['cogs'] += book['cogs']
+    return totals
+
+def _opening_books():
+    """Books carried forward from closed periods"""
+    books = {}
+    totals = st.session_state.get('cogs_opening_totals')
+    if totals is not None:
+        for unit, sku, revenue, cogs, sold, unmatched in totals[TOTAL_COLUMNS].itertuples(
+            index=False, name=None
+        ):
+            books[(unit, sku)] = {
+                **_new_book(), 'revenue': float(revenue), 'cogs': float(cogs),
+                'sold': float(sold), 'unmatched': float(unmatched)
+            }
+    lots = st.session_state.get('cogs_opening_lots')
+    if lots is not None:
+        for unit, sku, quantity, unit_cost in lots[LOT_COLUMNS].itertuples(index=False, name=None):
+            books.setdefault((unit, sku), _new_book())['lots'].append([float(quantity), float(unit_cost)])
+    return books
+
+def _month_start(day):
+    return day.astype('datetime64[M]').astype('datetime64[D]')
+
+def _replay(engine, start=None):
+    """Apply inventory rows dated on or after start, in date order, to the engine's books.
+
+    A checkpoint of the books is taken at each month boundary crossed, so a
+    later back-dated row only replays from the start of its month.
+    """
+    df = st.session_state.get('inventory')
+    if df is None:
+        return
+    positions = range_positions('inventory', ALL_UNITS, start, None, newest_first=False)
+    _post(engine, df.iloc[positions])
+    engine['rows'] = len(df)
+
+def _post(engine, rows):
+    """Apply rows, already in date order and dated on or after the last posted day, to the books"""
+    books = engine['books']
+    if engine['units'] is None:
+        engine['units'] = _unit_totals(books)
+    totals = engine['units']
+    if len(rows):
+        days = np.asarray(pd.to_datetime(rows['Date'], errors='coerce'), dtype='datetime64[D]')
+        months = _month_start(days)
+        kinds = rows['Transaction Type'].to_numpy()
+        units = rows['Business Unit'].to_numpy()
+        skus = sku_column(rows).to_numpy()
+        quantities = pd.to_numeric(rows['Quantity_kg'], errors='coerce').fillna(0.0).to_numpy()
+        amounts = pd.to_numeric(rows['Total Amount'], errors='coerce').fillna(0.0).to_numpy()
+        # Continuing after the last posted day stays inside that day's checkpointed month
+        current_month = None if engine['last_day'] is None else _month_start(engine['last_day'])
+        for i in range(len(rows)):
+            if months[i] != current_month:
+                current_month = months[i]
+                engine['checkpoints'][current_month] = _copy_books(books)
+            book = books.get((units[i], skus[i]))
+            if book is None:
+                book = books[(units[i], skus[i])] = _new_book()
+            if kinds[i] == 'Purchase':
+                _purchase(book, float(quantities[i]), float(amounts[i]))
+            elif kinds[i] == 'Sale':
+                cost = _sale(book, float(quantities[i]), float(amounts[i]))
+                unit_total = totals.setdefault(units[i], {'revenue': 0.0, 'cogs': 0.0})
+                unit_total['revenue'] += float(amounts[i])
+                unit_total['cogs'] += cost
+        engine['last_day'] = days[-1]
+
+def build_cogs():
+    """Replay the whole live inventory ledger on top of the closed-period books"""
+    engine = {
+        'method': COGS_METHOD,
+        'closed_through': st.session_state.get('closed_through'),
+        'books': _opening_books(),
+        'checkpoints': {},
+        'last_day': None,
+        'units': None,
+        'rows': 0
+    }
+    _replay(engine)
+    st.session_state['cogs_engine'] = engine
+    return engine
+
+def get_cogs():
+    """Return the engine, rebuilding it if the ledger changed outside append_ledger_rows"""
+    engine = st.session_state.get('cogs_engine')
+    inventory = st.session_state.get('inventory')
+    if (engine is None or engine['rows'] != (0 if inventory is None else len(inventory))
+            or engine['method'] != COGS_METHOD
+            or engine['closed_through'] != st.session_state.get('closed_through')):
+        engine = build_cogs()
+    return engine
+
+def cogs_appended_rows(ledger, start):
+    """Post rows appended at positions >= start.
+
+    Rows dated on or after the last posted day are applied directly, by
+    position, after the rows already posted; a back-dated row rewinds to
+    the checkpoint of its month and replays from there.
+    """
+    if ledger != 'inventory':
+        return
+    engine = st.session_state.get('cogs_engine')
+    if engine is None or engine['rows'] != start:
+        build_cogs()
+        return
+    new_rows = st.session_state.inventory.iloc[start:]
+    days = np.asarray(pd.to_datetime(new_rows['Date'], errors='coerce'), dtype='datetime64[D]')
+    earliest = days.min()
+    if engine['last_day'] is None or earliest >= engine['last_day']:
+        # Same-day rows sort after the ones already posted, exactly as in a full replay
+        _post(engine, new_rows.iloc[np.argsort(days, kind='stable')])
+        engine['rows'] = len(st.session_state.inventory)
+    else:
+        _rewind(engine, earliest)
+
+def _rewind(engine, day):
+    """Restore the books to the start of day's month and replay from there"""
+    month = _month_start(np.datetime64(day, 'D'))
+    earlier = [m for m in engine['checkpoints'] if m <= month]
+    if not earlier:
+        build_cogs()
+        return
+    restart = max(earlier)
+    engine['books'] = engine['checkpoints'][restart]
+    engine['checkpoints'] = {m: b for m, b in engine['checkpoints'].items() if m < restart}
+    engine['last_day'] = None
+    engine['units'] = None
+    _replay(engine, pd.Timestamp(restart).date())
+
+def gross_margin(unit):
+    """(revenue, cost of goods sold) posted for a unit so far"""
+    totals = get_cogs()['units'].get(unit)
+    if totals is None:
+        return 0.0, 0.0
+    return totals['revenue'], totals['cogs']
+
+def carry_forward_cogs(period_end):
+    """Store the books as of period_end so they survive the period's rows being archived"""
+    engine = get_cogs()
+    end = np.datetime64(period_end, 'D')
+    # The first checkpoint after the period holds the books before any later row
+    later = [m for m in engine['checkpoints'] if m > end]
+    books = engine['checkpoints'][min(later)] if later else engine['books']
+    st.session_state['cogs_opening_lots'] = pd.DataFrame(
+        [(unit, sku, lot[0], lot[1]) for (unit, sku), book in books.items() for lot in book['lots']],
+        columns=LOT_COLUMNS
+    )
+    st.session_state['cogs_opening_totals'] = pd.DataFrame(
+        [
+            (unit, sku, book['revenue'], book['cogs'], book['sold'], book['unmatched'])
+            for (unit, sku), book in books.items()
+        ],
+        columns=TOTAL_COLUMNS
+    )
+
+def cogs_rows_archived():
+    """Keep the engine after a close: its books are unchanged, only the ledger shrank"""
+    engine = st.session_state.get('cogs_engine')
+    if engine is not None:
+        engine['rows'] = len(st.session_state.inventory)
+        engine['closed_through'] = st.session_state.get('closed_through')
+
+def book_summary(unit=None):
+    """Revenue, COGS, margin and remaining stock cost per unit and SKU"""
+    books = get_cogs()['books']
+    summary = pd.DataFrame(
+        [
+            (u, sku, book['revenue'], book['cogs'], book['sold'], book['unmatched'],
+             sum(lot[0] for lot in book['lots']), sum(lot[0] * lot[1] for lot in book['lots']))
+            for (u, sku), book in books.items() if unit is None or u == unit
+        ],
+        columns=TOTAL_COLUMNS + ['Stock Quantity', 'Stock Cost']
+    )
+    summary['Gross Margin'] = summary['Revenue'] - summary['COGS']
+    return summary
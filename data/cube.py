@@ -0,0 +1,140 @@
+import pandas as pd
+import streamlit as st
+from data.ledger_index import ALL_UNITS, frame_ref, built_from
+from data.archive import query_ledger
+
+# Ledgers rolled up into the cube and the column that provides their category
+CUBE_LEDGERS = {
+    'inventory': 'Transaction Type',
+    'expenses': 'Category',
+    'investments': None
+}
+CUBE_COLUMNS = ['Business Unit', 'Ledger', 'Category', 'Month', 'Amount', 'Quantity', 'Count']
+NON_OPERATING_CATEGORIES = ['Partner Withdrawal', 'Partner Contribution']
+
+def ledger_cells(ledger, rows):
+    """Aggregate ledger rows to {(unit, ledger, category, month): [amount, quantity, count]}"""
+    if rows is None or rows.empty:
+        return {}
+    amount_col = 'Total Amount' if ledger == 'inventory' else 'Amount'
+    category_col = CUBE_LEDGERS[ledger]
+    frame = pd.DataFrame({
+        'unit': rows['Business Unit'].to_numpy(),
+        'category': rows[category_col].to_numpy() if category_col else 'Investment',
+        'month': pd.to_datetime(rows['Date'], errors='coerce').dt.strftime('%Y-%m').to_numpy(),
+        'amount': pd.to_numeric(rows[amount_col], errors='coerce').fillna(0.0).to_numpy(),
+        'quantity': pd.to_numeric(rows['Quantity_kg'], errors='coerce').fillna(0.0).to_numpy()
+            if ledger == 'inventory' else 0.0
+    })
+    grouped = frame.groupby(['unit', 'category', 'month'], dropna=False).agg(
+        amount=('amount', 'sum'),
+        quantity=('quantity', 'sum'),
+        count=('amount', 'size')
+    )
+    return {
+        (unit, ledger, category, month): [float(a), float(q), int(c)]
+        for (unit, category, month), a, q, c in zip(
+            grouped.index, grouped['amount'], grouped['quantity'], grouped['count']
+        )
+    }
+
+def build_cube():
+    """Rebuild the aggregate cube from archived aggregates and every live ledger"""
+    cells = {}
+    archived = st.session_state.get('archived_cells')
+    if archived is not None:
+        for unit, ledger, category, month, amount, quantity, count in archived[CUBE_COLUMNS].itertuples(
+            index=False, name=None
+        ):
+            cells[(unit, ledger, category, month)] = [float(amount), float(quantity), int(count)]
+    rows = {}
+    frames = {}
+    for ledger in CUBE_LEDGERS:
+        df = st.session_state.get(ledger)
+        rows[ledger] = 0 if df is None else len(df)
+        frames[ledger] = frame_ref(df)
+        for key, (amount, quantity, count) in ledger_cells(ledger, df).items():
+            cell = cells.setdefault(key, [0.0, 0.0, 0])
+            cell[0] += amount
+            cell[1] += quantity
+            cell[2] += count
+    cube = {'rows': rows, 'frames': frames, 'cells': cells}
+    st.session_state['ledger_cube'] = cube
+    return cube
+
+def get_cube():
+    """Return the cube, rebuilding it if any ledger changed outside append_ledger_rows"""
+    cube = st.session_state.get('ledger_cube')
+    if cube is None or any(
+        cube['rows'].get(ledger) != len(st.session_state.get(ledger, ()))
+        or not built_from(cube['frames'].get(ledger), st.session_state.get(ledger))
+        for ledger in CUBE_LEDGERS
+    ):
+        cube = build_cube()
+    return cube
+
+def cube_appended_rows(ledger, start, previous=None):
+    """Fold rows appended at positions >= start of the previous frame into the cube"""
+    if ledger not in CUBE_LEDGERS:
+        return
+    cube = st.session_state.get('ledger_cube')
+    if cube is None or cube['rows'].get(ledger) != start or not built_from(cube['frames'].get(ledger), previous):
+        build_cube()
+        return
+    new_rows = st.session_state[ledger].iloc[start:]
+    for key, (amount, quantity, count) in ledger_cells(ledger, new_rows).items():
+        cell = cube['cells'].setdefault(key, [0.0, 0.0, 0])
+        cell[0] += amount
+        cell[1] += quantity
+        cell[2] += count
+    cube['rows'][ledger] = start + len(new_rows)
+    cube['frames'][ledger] = frame_ref(st.session_state[ledger])
+
+def cube_frame(unit=None, ledger=None):
+    """Cube cells as a DataFrame, optionally restricted to a unit and ledger"""
+    cells = get_cube()['cells']
+    records = [
+        (*key, *values) for key, values in cells.items()
+        if (unit in (None, ALL_UNITS) or key[0] == unit) and (ledger is None or key[1] == ledger)
+    ]
+    return pd.DataFrame(records, columns=CUBE_COLUMNS)
+
+def monthly_pnl(unit=None):
+    """Monthly sales, purchases, operating expenses and profit for a unit"""
+    cube = cube_frame(unit)
+    columns = ['Month', 'Sales', 'Purchases', 'Operating Expenses', 'Gross Profit', 'Net Profit']
+    if cube.empty:
+        return pd.DataFrame(columns=columns)
+    inventory = cube[cube['Ledger'] == 'inventory']
+    expenses = cube[
+        (cube['Ledger'] == 'expenses') &
+        (~cube['Category'].isin(NON_OPERATING_CATEGORIES))
+    ]
+    pnl = pd.DataFrame({
+        'Sales': inventory[inventory['Category'] == 'Sale'].groupby('Month')['Amount'].sum(),
+        'Purchases': inventory[inventory['Category'] == 'Purchase'].groupby('Month')['Amount'].sum(),
+        'Operating Expenses': expenses.groupby('Month')['Amount'].sum()
+    }).fillna(0.0)
+    pnl['Gross Profit'] = pnl['Sales'] - pnl['Purchases']
+    pnl['Net Profit'] = pnl['Gross Profit'] - pnl['Operating Expenses']
+    return pnl.sort_index().rename_axis('Month').reset_index()[columns].round(2)
+
+def expenses_by_category(unit=None):
+    """Operating expenses per month and category for a unit"""
+    cube = cube_frame(unit, 'expenses')
+    cube = cube[~cube['Category'].isin(NON_OPERATING_CATEGORIES)]
+    return (
+        cube.groupby(['Month', 'Category'], as_index=False)['Amount'].sum()
+        .sort_values(['Month', 'Category'])
+        .round(2)
+    )
+
+def cube_drilldown(ledger, unit, month, category=None):
+    """Raw ledger rows behind one cube cell, from the hot store or the archive"""
+    start = pd.Period(month, freq='M').start_time.date()
+    end = pd.Period(month, freq='M').end_time.date()
+    rows = query_ledger(ledger, unit, start, end)
+    category_col = CUBE_LEDGERS[ledger]
+    if category is not None and category_col:
+        rows = rows[rows[category_col] == category]
+    return rows
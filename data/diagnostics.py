@@ -0,0 +1,164 @@
+import os
+import logging
+import threading
+import weakref
+from collections import deque
+from datetime import datetime
+from time import monotonic
+import numpy as np
+import pandas as pd
+import streamlit as st
+from data.shared_ledger import SHARED_KEYS, DERIVED_KEYS, shared_store
+from data.session_spill import session_entries, state_items, private_items, value_nbytes
+
+# How often a rerun records a memory sample, and how many samples are kept
+DIAGNOSTICS_SAMPLE_SECONDS = float(os.environ.get('BIZMASTER_DIAGNOSTICS_SAMPLE_SECONDS', 60))
+DIAGNOSTICS_HISTORY = int(os.environ.get('BIZMASTER_DIAGNOSTICS_HISTORY', 1440))
+KEY_COLUMNS = ['Key', 'Scope', 'Type', 'Rows', 'Bytes']
+SESSION_COLUMNS = ['Session', 'User', 'State', 'Idle Minutes', 'Keys', 'Private Bytes']
+
+# Shared frames are never changed in place, so a frame's deep size is
+# measured once and reused until the frame itself is replaced. Private
+# frames may be, so they are always measured afresh.
+_sizes = {}
+_sizes_lock = threading.Lock()
+
+def _frame_nbytes(frame):
+    key = id(frame)
+    with _sizes_lock:
+        cached = _sizes.get(key)
+        if cached is not None and cached[0]() is frame and cached[1] == frame.shape:
+            return cached[2]
+    size = value_nbytes(frame)
+    with _sizes_lock:
+        _sizes[key] = (weakref.ref(frame, lambda _, key=key: _sizes.pop(key, None)), frame.shape, size)
+    return size
+
+def shared_nbytes(value):
+    """Deep memory of a shared ledger value, with frame sizes cached per object"""
+    return value_nbytes(value, frame_nbytes=_frame_nbytes)
+
+def _rows(value):
+    if isinstance(value, (pd.DataFrame, pd.Series, np.ndarray)):
+        return len(value)
+    if isinstance(value, dict) and value and all(isinstance(v, pd.DataFrame) for v in value.values()):
+        return sum(len(v) for v in value.values())
+    return None
+
+def key_usage(state, scope):
+    """One row per shared key: its type, row count and deep bytes"""
+    return pd.DataFrame(
+        [
+            (key, scope, type(value).__name__, _rows(value), shared_nbytes(value))
+            for key, value in state.items()
+        ],
+        columns=KEY_COLUMNS
+    )
+
+def shared_usage(state=None):
+    """Memory held once per process by the shared ledgers and their derived structures"""
+    state = dict(shared_store()['state']) if state is None else state
+    usage = key_usage(
+        {key: state[key] for key in SHARED_KEYS if key in state}, 'Shared'
+    )
+    derived = key_usage(
+        {key: state[key] for key in DERIVED_KEYS if key in state}, 'Derived'
+    )
+    return pd.concat([usage, derived], ignore_index=True).sort_values('Bytes', ascending=False)
+
+def session_usage(entries=None):
+    """Private memory per live session; shared ledgers are counted once in shared_usage"""
+    current = entries is None
+    entries = session_entries() if current else entries
+    now = monotonic()
+    rows = []
+    for token, entry, state in entries:
+        if state is None:
+            continue
+        private = private_items(state_items(state))
+        user = private.get('user') or {}
+        rows.append((
+            token[:8],
+            user.get('username'),
+            'Spilled' if entry['spilled'] else 'Resident',
+            round((now - entry['last_seen']) / 60, 1),
+            len(private),
+            entry['spilled_bytes'] if entry['spilled'] else sum(map(value_nbytes, private.values()))
+        ))
+    if not rows and current:
+        # Without the session registry, report this session alone
+        private = private_items(st.session_state.to_dict())
+        user = private.get('user') or {}
+        rows.append(('current', user.get('username'), 'Resident', 0.0, len(private),
+                     sum(map(value_nbytes, private.values()))))
+    return pd.DataFrame(rows, columns=SESSION_COLUMNS).sort_values('Private Bytes', ascending=False)
+
+def dtype_breakdown(frame):
+    """Columns, deep bytes and null counts per dtype of one frame"""
+    if frame is None or len(frame.columns) == 0:
+        return pd.DataFrame(columns=['Dtype', 'Columns', 'Bytes', 'Nulls'])
+    per_column = pd.DataFrame({
+        'Dtype': frame.dtypes.astype(str).to_numpy(),
+        'Column': frame.columns,
+        'Bytes': frame.memory_usage(index=False, deep=True).to_numpy(),
+        'Nulls': frame.isna().sum().to_numpy()
+    })
+    return per_column.groupby('Dtype', as_index=False).agg(
+        Columns=('Column', lambda c: ', '.join(map(str, c))),
+        Bytes=('Bytes', 'sum'),
+        Nulls=('Nulls', 'sum')
+    ).sort_values('Bytes', ascending=False)
+
+@st.cache_resource
+def memory_history():
+    """Samples of shared and per-session memory, oldest first"""
+    return {
+        'lock': threading.Lock(), 'samples': deque(maxlen=DIAGNOSTICS_HISTORY),
+        'last_sample': 0.0, 'sampling': False
+    }
+
+def _take_sample(history, shared, entries):
+    try:
+        taken = datetime.now()
+        shared = shared_usage(shared)
+        sessions = session_usage(entries)
+        sample = [(taken, key, rows, size) for key, rows, size in zip(shared['Key'], shared['Rows'], shared['Bytes'])]
+        sample.append((taken, 'sessions (private)', len(sessions), int(sessions['Private Bytes'].sum())))
+        with history['lock']:
+            history['samples'].append(sample)
+    except Exception as e:
+        logging.warning(f"Could not sample memory: {str(e)}")
+    finally:
+        with history['lock']:
+            history['sampling'] = False
+
+def sample_memory(force=False):
+    """Record one sample, at most every DIAGNOSTICS_SAMPLE_SECONDS.
+
+    The rerun that claims the slot only copies the shared state and the
+    session list; measuring happens on a background thread. force samples
+    right away on the calling thread, for the diagnostics page.
+    """
+    history = memory_history()
+    now = monotonic()
+    with history['lock']:
+        if history['sampling'] or (not force and now - history['last_sample'] < DIAGNOSTICS_SAMPLE_SECONDS):
+            return
+        history['last_sample'] = now
+        history['sampling'] = True
+    shared = dict(shared_store()['state'])
+    entries = session_entries()
+    if force:
+        _take_sample(history, shared, entries)
+    else:
+        threading.Thread(target=_take_sample, args=(history, shared, entries), daemon=True).start()
+
+def memory_growth():
+    """All samples as a long frame: Time, Key, Rows, Bytes"""
+    history = memory_history()
+    with history['lock']:
+        samples = list(history['samples'])
+    return pd.DataFrame(
+        [row for sample in samples for row in sample],
+        columns=['Time', 'Key', 'Rows', 'Bytes']
+    )
@@ -0,0 +1,461 @@
+import os
+import json
+import sqlite3
+import logging
+import queue
+import threading
+import uuid
+from time import monotonic
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from datetime import date, datetime, time
+import numpy as np
+import pandas as pd
+import streamlit as st
+from data.snapshots import (
+    write_snapshot, restore_latest_snapshot, maybe_snapshot, snapshot_due, snapshots_available
+)
+from data.shared_ledger import shared_write, pipelined_write, finish_write
+from data.period_close import apply_close
+from data.sku import DEFAULT_SKU, set_sku_prices
+
+LEDGER_DB = os.environ.get('BIZMASTER_LEDGER_DB', 'bizmaster_ledger.db')
+# Take a snapshot after this many events so recovery replays a bounded tail
+SNAPSHOT_EVERY_EVENTS = int(os.environ.get('BIZMASTER_SNAPSHOT_EVERY_EVENTS', 1000))
+# Group commit: the writer thread commits whatever is queued, plus anything arriving within
+# this window, up to a batch size. Operations release the write lock before waiting for
+# their commit, so the events of operations from many sessions share one transaction.
+GROUP_COMMIT_WAIT_MS = float(os.environ.get('BIZMASTER_GROUP_COMMIT_WAIT_MS', 2))
+GROUP_COMMIT_MAX_EVENTS = int(os.environ.get('BIZMASTER_GROUP_COMMIT_MAX_EVENTS', 500))
+# Seconds an operation waits for its event to be committed before it is abandoned
+EVENT_COMMIT_TIMEOUT = float(os.environ.get('BIZMASTER_EVENT_COMMIT_TIMEOUT', 30))
+# Larger appends are logged as several staged events of their operation
+LOG_CHUNK_ROWS = int(os.environ.get('BIZMASTER_LOG_CHUNK_ROWS', 50_000))
+
+_current = threading.local()
+_pending = queue.Queue()
+_writer_lock = threading.Lock()
+_writer = {'thread': None, 'next_seq': None, 'failed_generation': -1}
+
+def _connect():
+    conn = sqlite3.connect(LEDGER_DB)
+    conn.execute('PRAGMA journal_mode=WAL')
+    return conn
+
+# Database setup
+def init_event_log():
+    conn = _connect()
+    c = conn.cursor()
+
+    # Append-only log of business operations and their state changes
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS events (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            type TEXT NOT NULL,
+            username TEXT,
+            payload TEXT NOT NULL
+        )
+    ''')
+
+    conn.commit()
+    conn.close()
+
+# Initialize database on import
+init_event_log()
+
+def _encode(value):
+    if value is pd.NaT:
+        return None
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+def _decode_row(row):
+    """Restore date and time values of a logged ledger row"""
+    row = dict(row)
+    try:
+        if isinstance(row.get('Date'), str):
+            row['Date'] = datetime.fromisoformat(row['Date']).date()
+        if isinstance(row.get('Time'), str):
+            row['Time'] = time.fromisoformat(row['Time'])
+    except ValueError:
+        pass
+    return row
+
+def _current_username():
+    user = st.session_state.get('user') or {}
+    return user.get('username')
+
+def _insert_events(conn, rows):
+    with conn:
+        conn.executemany('INSERT INTO events (seq, type, username, payload) VALUES (?, ?, ?, ?)', rows)
+
+def _fail_generation(generation):
+    # Later events of an operation generation were built on this one and must not commit
+    if generation is not None:
+        _writer['failed_generation'] = max(_writer['failed_generation'], generation)
+
+def _runnable(batch):
+    runnable = []
+    for row, future, generation in batch:
+        if generation is not None and generation <= _writer['failed_generation']:
+            if future.set_running_or_notify_cancel():
+                future.set_exception(ValueError("an earlier operation it builds on was not committed"))
+        elif future.set_running_or_notify_cancel():
+            runnable.append((row, future, generation))
+        else:
+            # Abandoned by a timed-out operation, which was rolled back
+            _fail_generation(generation)
+    return runnable
+
+def _commit_batch(conn, batch):
+    batch = _runnable(batch)
+    if not batch:
+        return
+    try:
+        _insert_events(conn, [row for row, _, _ in batch])
+    except Exception as e:
+        if len(batch) > 1:
+            logging.error(f"Group commit of {len(batch)} events failed, retrying one at a time: {str(e)}")
+        # Events from other generations must not fail with the one bad event
+        for row, future, generation in batch:
+            if generation is not None and generation <= _writer['failed_generation']:
+                future.set_exception(ValueError("an earlier operation it builds on was not committed"))
+                continue
+            try:
+                _insert_events(conn, [row])
+            except Exception as e:
+                _fail_generation(generation)
+                future.set_exception(e)
+            else:
+                future.set_result(row[0])
+        return
+    for row, future, _ in batch:
+        future.set_result(row[0])
+
+def _writer_loop():
+    """Single writer: drain the queue in groups, one transaction and one sync per group"""
+    conn = _connect()
+    wait = GROUP_COMMIT_WAIT_MS / 1000
+    while True:
+        batch = [_pending.get()]
+        deadline = monotonic() + wait
+        while len(batch) < GROUP_COMMIT_MAX_EVENTS:
+            try:
+                batch.append(_pending.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        _commit_batch(conn, batch)
+
+def submit_event(event_type, effects, details=None, part_of=None, generation=None):
+    """Queue one event for the writer thread.
+
+    Returns (seq, future); the sequence number is assigned here, so events
+    are ordered by submission, and the future resolves once the group
+    holding the event is committed. A writer thread that died is restarted.
+    part_of marks a staged event that only counts once its operation commits.
+    generation is the pipelined write the event belongs to: once one of its
+    events fails, the later events of that generation fail without committing.
+    """
+    body = {'details': details or {}, 'effects': effects}
+    if part_of is not None:
+        body['part_of'] = part_of
+    payload = json.dumps(body, default=_encode)
+    future = Future()
+    with _writer_lock:
+        if _writer['next_seq'] is None:
+            _writer['next_seq'] = last_event_seq() + 1
+        if _writer['thread'] is None or not _writer['thread'].is_alive():
+            if _writer['thread'] is not None:
+                logging.error("Event log writer thread died; restarting it")
+            _writer['thread'] = threading.Thread(target=_writer_loop, name='event-log-writer', daemon=True)
+            _writer['thread'].start()
+        seq = _writer['next_seq']
+        _writer['next_seq'] += 1
+        _pending.put(((seq, event_type, _current_username(), payload), future, generation))
+    return seq, future
+
+def wait_durable(future):
+    """Block until a submitted event is committed; raises ValueError if it never will be"""
+    try:
+        try:
+            return future.result(timeout=EVENT_COMMIT_TIMEOUT)
+        except FutureTimeout:
+            if future.cancel():
+                raise ValueError(f"the event log did not commit within {EVENT_COMMIT_TIMEOUT:g}s")
+            # Already being written: wait for the outcome, which decides whether it counts
+            return future.result()
+    except Exception as e:
+        raise ValueError(f"Error logging event: {str(e)}")
+
+def append_event(event_type, effects, details=None):
+    """Append one event to the log and return its sequence number once it is durable"""
+    seq, future = submit_event(event_type, effects, details)
+    wait_durable(future)
+    return seq
+
+def last_event_seq():
+    conn = _connect()
+    try:
+        row = conn.execute('SELECT MAX(seq) FROM events').fetchone()
+    finally:
+        conn.close()
+    return row[0] or 0
+
+def read_events(after_seq=0):
+    """Yield (seq, type, payload) for events after a sequence number, in order"""
+    conn = _connect()
+    try:
+        c = conn.execute(
+            'SELECT seq, type, payload FROM events WHERE seq > ? ORDER BY seq',
+            (after_seq,)
+        )
+        for seq, event_type, payload in c:
+            yield seq, event_type, json.loads(payload)
+    finally:
+        conn.close()
+
+@contextmanager
+def business_operation(name, **details):
+    """Group every state change made inside the block into one logged event.
+
+    Nested operations fold into the outermost one. The block runs under the
+    shared ledger's write lock, which is released once its event is queued;
+    the operation then waits for the event to be durable, so the writer can
+    commit the events of several sessions' operations together. Only then
+    are the changes published, in event order. If the block raises or the
+    event cannot be committed, the shared ledger keeps its previous state,
+    nothing is logged and ValueError is raised.
+    """
+    if getattr(_current, 'operation', None) is not None:
+        yield
+        return
+    future = None
+    operation = {'name': name, 'effects': [], 'hooks': []}
+    try:
+        with pipelined_write() as pending:
+            operation['generation'] = pending.generation if pending is not None else None
+            _current.operation = operation
+            try:
+                yield
+            finally:
+                _current.operation = None
+            effects = operation['effects']
+            if operation.get('batch') is not None:
+                # Commits the staged parts; they came first, so they are applied first
+                effects = [{'kind': 'commit', 'batch': operation['batch']}] + effects
+            if effects:
+                seq, future = submit_event(name, effects, details, generation=operation['generation'])
+                st.session_state['event_seq'] = seq
+                if pending is None:
+                    # Inside another write, which publishes only what is durable
+                    wait_durable(future)
+        if pending is not None and future is not None:
+            try:
+                wait_durable(future)
+            except ValueError:
+                finish_write(pending, False)
+                raise
+    except BaseException:
+        _run_hooks(operation, durable=False)
+        raise
+    _run_hooks(operation, durable=True)
+    if pending is None:
+        return
+    if not finish_write(pending, True):
+        raise ValueError("Error logging event: an earlier operation it builds on was not committed")
+    if future is not None:
+        _maybe_snapshot_by_count(seq)
+
+def _run_hooks(operation, durable):
+    for on_durable, on_abort in operation['hooks']:
+        try:
+            (on_durable if durable else on_abort)()
+        except Exception as e:
+            logging.error(f"{operation['name']}: {'commit' if durable else 'rollback'} hook failed: {str(e)}")
+
+def on_commit(on_durable, on_abort):
+    """Run on_durable once the current operation is durable, or on_abort if it fails.
+
+    For side effects outside the shared ledger, such as files, that must
+    only become visible with the operation. Outside an operation,
+    on_durable runs at once.
+    """
+    operation = getattr(_current, 'operation', None)
+    if operation is None:
+        on_durable()
+    else:
+        operation['hooks'].append((on_durable, on_abort))
+
+def record_effect(kind, **payload):
+    """Record a state change, as part of the current business operation if any"""
+    effect = {'kind': kind, **payload}
+    operation = getattr(_current, 'operation', None)
+    if operation is not None:
+        operation['effects'].append(effect)
+    else:
+        append_event(kind, [effect])
+
+def stage_operation_effects():
+    """Log the effects collected so far as a staged part of the current operation.
+
+    Keeps large operations from becoming one huge event. Staged parts are
+    applied on replay only when the operation's own event commits them, so
+    the operation still takes effect as a whole or not at all.
+    """
+    operation = _current.operation
+    if not operation['effects']:
+        return
+    batch = operation.setdefault('batch', uuid.uuid4().hex)
+    _, future = submit_event(
+        f"{operation['name']} (part)", operation['effects'], part_of=batch, generation=operation['generation']
+    )
+    wait_durable(future)
+    operation['effects'] = []
+
+def record_ledger_append(ledger, rows):
+    if getattr(_current, 'operation', None) is None or len(rows) <= LOG_CHUNK_ROWS:
+        record_effect('append', ledger=ledger, rows=rows.to_dict(orient='records'))
+        return
+    for start in range(0, len(rows), LOG_CHUNK_ROWS):
+        chunk = rows.iloc[start:start + LOG_CHUNK_ROWS]
+        record_effect('append', ledger=ledger, rows=chunk.to_dict(orient='records'))
+        stage_operation_effects()
+
+def _flush_rows(new_rows):
+    for ledger, rows in new_rows.items():
+        rows = pd.DataFrame(rows)
+        # Ledgers such as transactions are first created by their first logged append
+        current = st.session_state.get(ledger)
+        st.session_state[ledger] = rows if current is None else pd.concat([current, rows], ignore_index=True)
+    new_rows.clear()
+
+def _apply_events(events):
+    """Apply logged effects to session state, batching row appends per ledger.
+
+    Staged parts of an operation are held back until the event that
+    commits them; parts of an operation that never committed are dropped.
+    """
+    new_rows = {}
+    staged = {}
+    last_seq = None
+    for seq, _, payload in events:
+        last_seq = seq
+        if 'part_of' in payload:
+            staged.setdefault(payload['part_of'], []).extend(payload['effects'])
+            continue
+        for effect in payload['effects']:
+            if effect['kind'] == 'commit':
+                _apply_effects(staged.pop(effect['batch'], []), new_rows)
+            else:
+                _apply_effects([effect], new_rows)
+    _flush_rows(new_rows)
+    if staged:
+        logging.info(f"Dropped {len(staged)} staged operation(s) that never committed")
+    return last_seq
+
+def _apply_effects(effects, new_rows):
+    for effect in effects:
+        kind = effect['kind']
+        if kind == 'close':
+            # A close archives by date, so every earlier append must be applied first
+            _flush_rows(new_rows)
+            apply_close(effect['period'], date.fromisoformat(effect['period_end']))
+        elif kind == 'append':
+            new_rows.setdefault(effect['ledger'], []).extend(
+                _decode_row(row) for row in effect['rows']
+            )
+        elif kind == 'cash':
+            balances = st.session_state.cash_balance
+            st.session_state.cash_balance = {
+                **balances, effect['unit']: balances.get(effect['unit'], 0.0) + effect['delta']
+            }
+        elif kind == 'partner':
+            partners = st.session_state.partners[effect['unit']].copy()
+            if effect['column'] not in partners.columns:
+                partners[effect['column']] = 0.0
+            idx = partners.index[partners['Partner'] == effect['partner']]
+            if len(idx):
+                partners.at[idx[0], effect['column']] += effect['delta']
+            st.session_state.partners = {**st.session_state.partners, effect['unit']: partners}
+        elif kind == 'partners':
+            st.session_state.partners = {
+                **st.session_state.partners,
+                effect['unit']: pd.DataFrame(effect['rows'], columns=effect['columns'])
+            }
+        elif kind == 'prices':
+            set_sku_prices(effect['prices'])
+        elif kind == 'price':
+            set_sku_prices({DEFAULT_SKU: effect['price']})
+
+def committed_appends(after_seq=0, through_seq=None):
+    """Yield (ledger, rows) for every row append of a committed event, in log order"""
+    staged = {}
+    for seq, _, payload in read_events(after_seq):
+        if through_seq is not None and seq > through_seq:
+            break
+        if 'part_of' in payload:
+            staged.setdefault(payload['part_of'], []).extend(payload['effects'])
+            continue
+        for effect in payload['effects']:
+            effects = staged.pop(effect['batch'], []) if effect['kind'] == 'commit' else [effect]
+            for applied in effects:
+                if applied['kind'] == 'append':
+                    yield applied['ledger'], [_decode_row(row) for row in applied['rows']]
+
+def recover_ledgers():
+    """Load the latest snapshot and replay only the events logged after it.
+
+    Raises ValueError if the tail cannot be replayed: half-replayed
+    ledgers must never be loaded, so the caller discards them.
+    """
+    manifest = restore_latest_snapshot()
+    after_seq = int(manifest.get('event_seq', 0)) if manifest else 0
+    st.session_state['snapshot_event_seq'] = after_seq
+    try:
+        replayed = _apply_events(read_events(after_seq))
+    except Exception as e:
+        raise ValueError(f"Error replaying event log after seq {after_seq}: {str(e)}")
+    st.session_state['event_seq'] = replayed or after_seq
+    if replayed:
+        logging.info(f"Replayed events {after_seq + 1}..{replayed} after snapshot")
+
+def checkpoint():
+    """Write a snapshot tagged with the last durable event sequence number.
+
+    The sequence comes from the log itself, which every session writes
+    to; under the write lock it covers exactly the published ledgers.
+    """
+    with shared_write():
+        seq = last_event_seq()
+        if write_snapshot(seq, background=True) is not None:
+            st.session_state['snapshot_event_seq'] = seq
+
+def _maybe_snapshot_by_count(seq):
+    if not snapshots_available():
+        return
+    if seq - st.session_state.get('snapshot_event_seq', 0) >= SNAPSHOT_EVERY_EVENTS:
+        try:
+            checkpoint()
+        except Exception as e:
+            logging.error(str(e))
+
+def maybe_checkpoint():
+    """Time-based snapshot hook for the end of each rerun"""
+    if not snapshot_due():
+        return
+    with shared_write():
+        seq = last_event_seq()
+        if maybe_snapshot(seq):
+            st.session_state['snapshot_event_seq'] = seq
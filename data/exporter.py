@@ -0,0 +1,202 @@
+import os
+import io
+import json
+import zipfile
+import tempfile
+from datetime import datetime
+import pandas as pd
+import streamlit as st
+from data.snapshots import to_arrow_table
+from data.archive import iter_archive
+from data.event_log import committed_appends, last_event_seq
+
+try:
+    import openpyxl
+except ImportError:  # optional dependency, only needed for Excel exports
+    openpyxl = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency, only needed for Parquet exports
+    pa = None
+
+EXPORT_DIR = os.environ.get('BIZMASTER_EXPORT_DIR', 'exports')
+EXPORT_CHUNK_ROWS = int(os.environ.get('BIZMASTER_EXPORT_CHUNK_ROWS', 50_000))
+EXPORT_LEDGERS = ('inventory', 'expenses', 'investments', 'transactions', 'price_history')
+EXCEL_MAX_ROWS = 1_048_575  # per sheet, excluding the header
+# Last event included per ledger; replaces the row-position cursors.json, which
+# lost rows once a period close moved them into the archive
+CURSOR_FILE = 'event_cursors.json'
+
+def export_formats():
+    """Formats available with the installed optional dependencies"""
+    formats = ['CSV (zip)']
+    if openpyxl is not None:
+        formats.append('Excel (xlsx)')
+    if pa is not None:
+        formats.append('Parquet (zip)')
+    return formats
+
+def load_cursors():
+    """Last event sequence number exported per ledger by previous incremental exports"""
+    path = os.path.join(EXPORT_DIR, CURSOR_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_cursors(cursors):
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    tmp_path = os.path.join(EXPORT_DIR, CURSOR_FILE + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(cursors, f)
+    os.replace(tmp_path, os.path.join(EXPORT_DIR, CURSOR_FILE))
+
+def _slices(df, columns):
+    for offset in range(0, len(df), EXPORT_CHUNK_ROWS):
+        yield df.iloc[offset:offset + EXPORT_CHUNK_ROWS].reindex(columns=columns)
+
+def full_chunks(ledger):
+    """Yield every row of a ledger in slices: closed periods from the archive, then the live rows.
+
+    Archived rows are read a row batch at a time from each partition file.
+    """
+    live = st.session_state[ledger]
+    for part in iter_archive(ledger, batch_rows=EXPORT_CHUNK_ROWS):
+        yield part.reindex(columns=live.columns)
+    yield from _slices(live, live.columns)
+
+def appended_chunks(ledger, after_seq, through_seq):
+    """Yield the rows appended to a ledger by events after_seq < seq <= through_seq.
+
+    Works from the event log, so rows count once whether they are still
+    live or were moved into the archive by a period close since.
+    """
+    columns = st.session_state[ledger].columns
+    rows = []
+    for appended_ledger, records in committed_appends(after_seq, through_seq):
+        if appended_ledger != ledger:
+            continue
+        rows.extend(records)
+        if len(rows) >= EXPORT_CHUNK_ROWS:
+            yield pd.DataFrame(rows).reindex(columns=columns)
+            rows = []
+    if rows:
+        yield pd.DataFrame(rows).reindex(columns=columns)
+
+def _counted(chunks, counts, ledger):
+    counts[ledger] = 0
+    for chunk in chunks:
+        counts[ledger] += len(chunk)
+        yield chunk
+
+def _write_csv_zip(path, plan):
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for ledger, chunks in plan.items():
+            # Streamed members have no known size up front; zip64 lets them pass 4 GB
+            with archive.open(f"{ledger}.csv", 'w', force_zip64=True) as raw:
+                out = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+                header = True
+                for chunk in chunks:
+                    chunk.to_csv(out, index=False, header=header)
+                    header = False
+                if header:
+                    # Empty ledger or nothing new: still write the header row
+                    st.session_state[ledger].head(0).to_csv(out, index=False)
+                out.flush()
+                out.detach()
+
+def _excel_value(value):
+    if value is None or value is pd.NaT or (isinstance(value, float) and value != value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+def _write_xlsx(path, plan):
+    # write_only workbooks stream rows to disk instead of building a sheet in memory
+    workbook = openpyxl.Workbook(write_only=True)
+    for ledger, chunks in plan.items():
+        columns = list(st.session_state[ledger].columns)
+        sheet, sheet_rows, part = None, EXCEL_MAX_ROWS, 0
+        for chunk in chunks:
+            for row in chunk.itertuples(index=False, name=None):
+                if sheet_rows == EXCEL_MAX_ROWS:
+                    part += 1
+                    sheet = workbook.create_sheet(ledger if part == 1 else f"{ledger}_{part}")
+                    sheet.append(columns)
+                    sheet_rows = 0
+                sheet.append([_excel_value(v) for v in row])
+                sheet_rows += 1
+        if sheet is None:
+            workbook.create_sheet(ledger).append(columns)
+    workbook.save(path)
+
+def _write_parquet_zip(path, plan):
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for ledger, chunks in plan.items():
+            with tempfile.NamedTemporaryFile(suffix='.parquet', dir=EXPORT_DIR, delete=False) as tmp:
+                tmp_path = tmp.name
+            try:
+                writer = None
+                for chunk in chunks:
+                    table = to_arrow_table(chunk)
+                    if writer is None:
+                        writer = pq.ParquetWriter(tmp_path, table.schema, compression='zstd')
+                    elif table.schema != writer.schema:
+                        table = table.cast(writer.schema)
+                    writer.write_table(table)
+                if writer is None:
+                    pq.write_table(to_arrow_table(st.session_state[ledger].head(0)), tmp_path)
+                else:
+                    writer.close()
+                archive.write(tmp_path, f"{ledger}.parquet")
+            finally:
+                os.remove(tmp_path)
+
+WRITERS = {
+    'CSV (zip)': ('zip', _write_csv_zip),
+    'Excel (xlsx)': ('xlsx', _write_xlsx),
+    'Parquet (zip)': ('zip', _write_parquet_zip)
+}
+
+def export_ledgers(export_format, ledgers=EXPORT_LEDGERS, incremental=False):
+    """Write the ledgers, archived closed periods included, to a file in EXPORT_DIR chunk by chunk.
+
+    In incremental mode only rows posted since the previous incremental
+    export are written (a ledger's first incremental export is a full
+    one), and the cursors are advanced once the file is complete.
+    Returns (path, rows written per ledger).
+    """
+    if export_format not in export_formats():
+        raise ValueError(f"Export format {export_format} is not available")
+    try:
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        cursors = load_cursors() if incremental else {}
+        # Writes publish only durable events and exclude readers, so no operation is half-logged here
+        through_seq = last_event_seq()
+        counts = {}
+        plan = {}
+        for ledger in ledgers:
+            if not isinstance(st.session_state.get(ledger), pd.DataFrame):
+                continue
+            if ledger in cursors:
+                chunks = appended_chunks(ledger, int(cursors[ledger]), through_seq)
+            else:
+                chunks = full_chunks(ledger)
+            plan[ledger] = _counted(chunks, counts, ledger)
+        extension, writer = WRITERS[export_format]
+        kind = 'incremental' if incremental else 'full'
+        path = os.path.join(
+            EXPORT_DIR, f"bizmaster_{kind}_{datetime.now():%Y%m%d_%H%M%S}.{extension}"
+        )
+        writer(path, plan)
+        if incremental:
+            cursors.update({ledger: through_seq for ledger in plan})
+            save_cursors(cursors)
+        return path, counts
+    except Exception as e:
+        raise ValueError(f"Error exporting ledgers: {str(e)}")
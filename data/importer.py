@@ -0,0 +1,277 @@
+import os
+import numpy as np
+import pandas as pd
+import streamlit as st
+from data.sku import DEFAULT_SKU
+from data.stock import available_stock
+
+try:
+    import openpyxl
+except ImportError:  # optional dependency, only needed for Excel imports
+    openpyxl = None
+
+IMPORT_CHUNK_ROWS = int(os.environ.get('BIZMASTER_IMPORT_CHUNK_ROWS', 50_000))
+MAX_REPORTED_ERRORS = 10_000
+ERROR_COLUMNS = ['Row', 'Column', 'Error']
+OVERDRAFT_ERROR = "Would overdraw the unit's cash balance"
+OVERSELL_ERROR = "Would sell more of the SKU than the unit holds"
+
+IMPORT_SPECS = {
+    'inventory': {
+        'required': ['Date', 'Transaction Type', 'Quantity_kg', 'Unit Price', 'Business Unit'],
+        'positive': ['Quantity_kg', 'Unit Price'],
+        'text': {'Remarks': '', 'SKU': DEFAULT_SKU},
+        'choices': {'Transaction Type': ['Purchase', 'Sale']}
+    },
+    'expenses': {
+        'required': ['Date', 'Category', 'Amount', 'Description', 'Business Unit'],
+        'positive': ['Amount'],
+        'text': {'Payment Method': 'Cash'},
+        # Partner movements need partner accounting and cannot be bulk loaded
+        'excluded': {'Category': ['Partner Withdrawal', 'Partner Contribution']}
+    },
+    'investments': {
+        'required': ['Date', 'Business Unit', 'Amount', 'Investor'],
+        'positive': ['Amount'],
+        'text': {'Description': ''}
+    }
+}
+
+def _read_chunks(uploaded_file, file_name):
+    """Yield DataFrames of at most IMPORT_CHUNK_ROWS rows from a CSV or Excel upload"""
+    if file_name.lower().endswith(('.xlsx', '.xlsm')):
+        if openpyxl is None:
+            raise ValueError("Excel import requires openpyxl")
+        workbook = openpyxl.load_workbook(uploaded_file, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [str(h).strip() if h is not None else '' for h in next(rows, [])]
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) == IMPORT_CHUNK_ROWS:
+                    yield pd.DataFrame(batch, columns=header)
+                    batch = []
+            if batch:
+                yield pd.DataFrame(batch, columns=header)
+        finally:
+            workbook.close()
+    else:
+        for chunk in pd.read_csv(uploaded_file, chunksize=IMPORT_CHUNK_ROWS, dtype=str,
+                                 skipinitialspace=True):
+            chunk.columns = [str(c).strip() for c in chunk.columns]
+            yield chunk
+
+def _signed_cash(ledger, rows):
+    """Cash effect of each validated row (positive = money in)"""
+    if ledger == 'inventory':
+        return np.where(rows['Transaction Type'] == 'Sale', 1.0, -1.0) * rows['Total Amount'].to_numpy()
+    if ledger == 'expenses':
+        return -rows['Amount'].to_numpy()
+    return rows['Amount'].to_numpy()
+
+def _oversold(ordered):
+    """Mask of date-ordered inventory rows whose sale takes a unit's SKU stock below zero.
+
+    Starts from the stock counter, like the sale form's check, and runs a
+    grouped cumulative sum over the rows.
+    """
+    keys = ordered['Business Unit'].astype(str) + '\x1f' + ordered['SKU'].astype(str)
+    opening = {key: available_stock(*key.split('\x1f')) for key in keys.unique()}
+    is_sale = (ordered['Transaction Type'] == 'Sale').to_numpy()
+    quantity = ordered['Quantity_kg'].to_numpy(dtype=float)
+    running = keys.map(opening).to_numpy(dtype=float) + pd.Series(
+        np.where(is_sale, -quantity, quantity), index=ordered.index
+    ).groupby(keys.to_numpy()).cumsum().to_numpy()
+    return is_sale & (running < -1e-6)
+
+def _validate_chunk(ledger, chunk, first_row, known_units):
+    """Vectorized validation of one chunk; returns (clean rows, error frame)"""
+    spec = IMPORT_SPECS[ledger]
+    errors = []
+    invalid = np.zeros(len(chunk), dtype=bool)
+    row_numbers = np.arange(first_row, first_row + len(chunk))
+
+    def flag(mask, column, message):
+        mask = np.asarray(mask, dtype=bool)
+        if mask.any():
+            errors.append(pd.DataFrame({'Row': row_numbers[mask], 'Column': column, 'Error': message}))
+            invalid[mask] = True
+
+    clean = pd.DataFrame(index=chunk.index)
+    dates = pd.to_datetime(chunk['Date'], errors='coerce')
+    flag(dates.isna(), 'Date', "Invalid or missing date")
+    through = st.session_state.get('closed_through')
+    if through is not None:
+        flag(dates <= pd.Timestamp(through), 'Date', f"Period up to {through:%Y-%m-%d} is closed")
+    # Plain dates, like every other writer of the ledgers
+    clean['Date'] = dates.dt.date
+
+    for col in spec['positive']:
+        values = pd.to_numeric(chunk[col], errors='coerce')
+        flag(~(values > 0), col, "Must be a positive number")
+        clean[col] = values.astype(float)
+
+    units = chunk['Business Unit'].astype(str).str.strip()
+    flag(~units.isin(known_units), 'Business Unit', "Unknown business unit")
+    clean['Business Unit'] = units
+
+    for col in spec['required']:
+        if col in clean.columns:
+            continue
+        values = chunk[col].astype(str).str.strip()
+        flag(chunk[col].isna() | (values == ''), col, "Required")
+        clean[col] = values
+    for col, allowed in spec.get('choices', {}).items():
+        flag(~clean[col].isin(allowed), col, f"Must be one of: {', '.join(allowed)}")
+    for col, excluded in spec.get('excluded', {}).items():
+        flag(clean[col].isin(excluded), col, "Not allowed in bulk import")
+    for col, default in spec['text'].items():
+        clean[col] = chunk[col].fillna(default).astype(str) if col in chunk.columns else default
+
+    if ledger == 'inventory':
+        clean['Total Amount'] = (clean['Quantity_kg'] * clean['Unit Price']).round(2)
+    if ledger == 'expenses':
+        clean['Partner'] = None
+
+    clean['_row'] = row_numbers
+    error_frame = pd.concat(errors, ignore_index=True) if errors else pd.DataFrame(columns=ERROR_COLUMNS)
+    return clean[~invalid], error_frame
+
+def validate_import(ledger, uploaded_file, file_name, allowed_units=None):
+    """Parse and validate an upload chunk by chunk.
+
+    Returns a dict with the validated 'rows', an 'errors' report (capped at
+    MAX_REPORTED_ERRORS entries), the total 'error_count', the number of
+    'overdrafts' and 'oversells' and the number of 'rows_read'. Overdrafts are simulated on the valid rows with a grouped
+    cumulative sum over the current cash balances, oversells likewise over
+    the stock counter.
+    """
+    spec = IMPORT_SPECS[ledger]
+    known_units = list(allowed_units or st.session_state.cash_balance.keys())
+    valid, errors = [], []
+    error_count = 0
+    rows_read = 0
+
+    for chunk in _read_chunks(uploaded_file, file_name):
+        missing = [col for col in spec['required'] if col not in chunk.columns]
+        if missing:
+            raise ValueError(f"Missing required columns: {', '.join(missing)}")
+        clean, chunk_errors = _validate_chunk(ledger, chunk, rows_read + 2, known_units)
+        rows_read += len(chunk)
+        error_count += len(chunk_errors)
+        if error_count - len(chunk_errors) < MAX_REPORTED_ERRORS:
+            errors.append(chunk_errors)
+        # Compact dtypes keep the staged batch small
+        clean['Business Unit'] = clean['Business Unit'].astype('category')
+        valid.append(clean)
+
+    rows = pd.concat(valid, ignore_index=True) if valid else pd.DataFrame()
+    overdrafts = oversells = 0
+    if not rows.empty:
+        order = np.argsort(rows['Date'].to_numpy(), kind='stable')
+        ordered = rows.iloc[order]
+        opening = ordered['Business Unit'].astype(str).map(st.session_state.cash_balance).fillna(0.0)
+        running = opening.to_numpy() + pd.Series(
+            _signed_cash(ledger, ordered), index=ordered.index
+        ).groupby(ordered['Business Unit'].astype(str).to_numpy()).cumsum().to_numpy()
+        overdrawn = running < -0.005
+        if overdrawn.any():
+            overdrafts = int(overdrawn.sum())
+            error_count += overdrafts
+            errors.append(pd.DataFrame({
+                'Row': ordered['_row'].to_numpy()[overdrawn],
+                'Column': 'Amount',
+                'Error': OVERDRAFT_ERROR
+            }))
+        if ledger == 'inventory':
+            oversold = _oversold(ordered)
+            if oversold.any():
+                oversells = int(oversold.sum())
+                error_count += oversells
+                errors.append(pd.DataFrame({
+                    'Row': ordered['_row'].to_numpy()[oversold],
+                    'Column': 'Quantity_kg',
+                    'Error': OVERSELL_ERROR
+                }))
+
+    error_frame = pd.concat(errors, ignore_index=True) if errors else pd.DataFrame(columns=ERROR_COLUMNS)
+    return {
+        'rows': rows,
+        'errors': error_frame.sort_values('Row', kind='stable').head(MAX_REPORTED_ERRORS),
+        'error_count': error_count,
+        'overdrafts': overdrafts,
+        'oversells': oversells,
+        'rows_read': rows_read
+    }
+
+def _transaction_rows(ledger, rows):
+    """Transaction log entries for imported rows, built column-wise"""
+    units = rows['Business Unit'].to_numpy()
+    if ledger == 'inventory':
+        is_sale = (rows['Transaction Type'] == 'Sale').to_numpy()
+        counterparty = rows['Remarks'].replace('', np.nan).fillna('Imported').to_numpy()
+        return pd.DataFrame({
+            'Date': rows['Date'].to_numpy(),
+            'Type': rows['Transaction Type'].to_numpy(),
+            'Amount': rows['Total Amount'].to_numpy(),
+            'From': np.where(is_sale, counterparty, units),
+            'To': np.where(is_sale, units, counterparty),
+            'Description': "Bulk import"
+        })
+    if ledger == 'expenses':
+        return pd.DataFrame({
+            'Date': rows['Date'].to_numpy(),
+            'Type': 'Expense',
+            'Amount': rows['Amount'].to_numpy(),
+            'From': units,
+            'To': rows['Category'].to_numpy(),
+            'Description': rows['Description'].to_numpy()
+        })
+    return pd.DataFrame({
+        'Date': rows['Date'].to_numpy(),
+        'Type': 'Investment',
+        'Amount': rows['Amount'].to_numpy(),
+        'From': rows['Investor'].to_numpy(),
+        'To': units,
+        'Description': rows['Description'].replace('', np.nan).fillna("Bulk import").to_numpy()
+    })
+
+def commit_import(ledger, rows):
+    """Post validated rows, their cash effect and transaction entries as one operation.
+
+    Rows are logged in chunks of separate events, but the import takes
+    effect as a whole: if any part fails, nothing is posted or replayed.
+    """
+    # Imported lazily: utils imports the data layer at module load
+    from utils import append_ledger_rows, update_cash_balance
+    from data.event_log import business_operation, checkpoint
+    from data.snapshots import snapshots_available
+
+    if rows.empty:
+        return 0
+    rows = rows.drop(columns='_row')
+    rows['Business Unit'] = rows['Business Unit'].astype(str)
+    columns = list(st.session_state[ledger].columns)
+    ledger_rows = rows.reindex(columns=columns + [c for c in rows.columns if c not in columns])
+    net_cash = pd.Series(_signed_cash(ledger, rows)).groupby(rows['Business Unit'].to_numpy()).sum()
+
+    with business_operation('Bulk Import', ledger=ledger, rows=len(rows)):
+        if ledger == 'inventory':
+            # Checked again under the write lock: other sales may have landed since validation
+            oversold = _oversold(rows.iloc[np.argsort(rows['Date'].to_numpy(), kind='stable')])
+            if oversold.any():
+                raise ValueError(f"{int(oversold.sum()):,} imported sales exceed the stock on hand")
+        # Cash first: an overdraft raises before any row is posted
+        for unit, amount in net_cash.items():
+            if amount >= 0.01:
+                update_cash_balance(amount, unit, 'add')
+            elif amount <= -0.01:
+                update_cash_balance(-amount, unit, 'subtract')
+        append_ledger_rows(ledger, ledger_rows)
+        append_ledger_rows('transactions', _transaction_rows(ledger, rows))
+
+    # Snapshot right away so recovery never has to replay the whole batch
+    if snapshots_available():
+        checkpoint()
+    return len(rows)
@@ -0,0 +1,126 @@
+import weakref
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Ledgers that carry a 'Date' and 'Business Unit' column and get a date index
+INDEXED_LEDGERS = ('inventory', 'expenses', 'investments')
+ALL_UNITS = 'Combined'
+# Appends larger than this rebuild the index in one vectorized sort
+BULK_REBUILD_ROWS = 1000
+
+def _day_keys(dates):
+    """Convert a sequence of dates to integer day numbers for ordering"""
+    values = np.asarray(pd.to_datetime(dates, errors='coerce'), dtype='datetime64[ns]')
+    return values.astype('datetime64[D]').astype(np.int64)
+
+def _day_key(value):
+    return int(_day_keys([value])[0])
+
+def _empty_entry():
+    return {'keys': np.empty(0, dtype=np.int64), 'positions': np.empty(0, dtype=np.int64)}
+
+def frame_ref(df):
+    """Weak reference to the exact frame a derived structure was built from"""
+    return None if df is None else weakref.ref(df)
+
+def built_from(ref, df):
+    """True if ref points at df itself, not just a frame of the same length"""
+    return (None if ref is None else ref()) is df
+
+def build_index(ledger):
+    """Build the per-unit date index of a ledger from scratch"""
+    df = st.session_state.get(ledger)
+    units = {ALL_UNITS: _empty_entry()}
+    if df is not None and not df.empty:
+        keys = _day_keys(df['Date'])
+        positions = np.arange(len(df))
+        order = np.lexsort((positions, keys))
+        sorted_keys = keys[order]
+        sorted_positions = positions[order]
+        units[ALL_UNITS] = {'keys': sorted_keys, 'positions': sorted_positions}
+        unit_col = df['Business Unit'].to_numpy()[order]
+        for unit in pd.unique(unit_col):
+            mask = unit_col == unit
+            units[unit] = {'keys': sorted_keys[mask], 'positions': sorted_positions[mask]}
+    index = {'rows': 0 if df is None else len(df), 'frame': frame_ref(df), 'units': units}
+    st.session_state.setdefault('ledger_index', {})[ledger] = index
+    return index
+
+def get_index(ledger):
+    """Return the date index for a ledger, rebuilding it if it went stale"""
+    index = st.session_state.get('ledger_index', {}).get(ledger)
+    df = st.session_state.get(ledger)
+    rows = 0 if df is None else len(df)
+    # A replaced ledger can have the same length, so check identity too
+    if index is None or index['rows'] != rows or not built_from(index.get('frame'), df):
+        index = build_index(ledger)
+    return index
+
+def _merge(entry, keys, positions):
+    """Merge a batch of (key, position) pairs into a sorted entry in one pass"""
+    if not len(keys):
+        return
+    order = np.lexsort((positions, keys))
+    keys, positions = keys[order], positions[order]
+    if not len(entry['keys']) or keys[0] >= entry['keys'][-1]:
+        # The usual case: new postings are dated today, so they go at the end
+        entry['keys'] = np.concatenate([entry['keys'], keys])
+        entry['positions'] = np.concatenate([entry['positions'], positions])
+        return
+    slots = np.searchsorted(entry['keys'], keys, side='right')
+    entry['keys'] = np.insert(entry['keys'], slots, keys)
+    entry['positions'] = np.insert(entry['positions'], slots, positions)
+
+def index_appended_rows(ledger, start, previous=None):
+    """Merge rows appended at positions >= start into the ledger's index.
+
+    previous is the frame the rows were appended to. Back-dated rows are
+    placed with one vectorized searchsorted per append, not a re-sort.
+    """
+    if ledger not in INDEXED_LEDGERS:
+        return
+    index = st.session_state.get('ledger_index', {}).get(ledger)
+    df = st.session_state[ledger]
+    if (index is None or index['rows'] != start or not built_from(index.get('frame'), previous)
+            or len(df) - start > BULK_REBUILD_ROWS):
+        build_index(ledger)
+        return
+    new_rows = df.iloc[start:]
+    keys = _day_keys(new_rows['Date'])
+    positions = np.arange(start, len(df))
+    units = new_rows['Business Unit'].to_numpy()
+    _merge(index['units'][ALL_UNITS], keys, positions)
+    for unit in pd.unique(units):
+        mask = units == unit
+        _merge(index['units'].setdefault(unit, _empty_entry()), keys[mask], positions[mask])
+    index['rows'] = len(df)
+    index['frame'] = frame_ref(df)
+
+def _unit_entry(ledger, unit):
+    return get_index(ledger)['units'].get(unit or ALL_UNITS, _empty_entry())
+
+def latest_positions(ledger, unit=None, n=None):
+    """Row positions of the newest n entries for a unit, newest first"""
+    positions = _unit_entry(ledger, unit)['positions']
+    selected = positions if n is None else positions[-n:] if n > 0 else positions[:0]
+    return selected[::-1].tolist()
+
+def iter_latest_positions(ledger, unit=None):
+    """Yield row positions for a unit from newest to oldest"""
+    positions = _unit_entry(ledger, unit)['positions']
+    for i in range(len(positions) - 1, -1, -1):
+        yield int(positions[i])
+
+def range_positions(ledger, unit=None, start=None, end=None, newest_first=True):
+    """Row positions for a unit with start <= Date <= end (inclusive)"""
+    entry = _unit_entry(ledger, unit)
+    lo = 0 if start is None else int(np.searchsorted(entry['keys'], _day_key(start), side='left'))
+    hi = len(entry['keys']) if end is None else int(np.searchsorted(entry['keys'], _day_key(end), side='right'))
+    selected = entry['positions'][lo:hi]
+    return (selected[::-1] if newest_first else selected).tolist()
+
+def rows_in_range(ledger, unit=None, start=None, end=None):
+    """Ledger rows for a unit within a date range, newest first"""
+    df = st.session_state[ledger]
+    return df.iloc[range_positions(ledger, unit, start, end)]
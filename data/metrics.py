@@ -0,0 +1,141 @@
+import os
+import bisect
+import logging
+import threading
+import functools
+from time import perf_counter, monotonic
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Off unless BIZMASTER_METRICS is set; disabled timers are not even wrapped
+METRICS_ENABLED = os.environ.get('BIZMASTER_METRICS', '').lower() in ('1', 'true', 'yes')
+# Prometheus text file, e.g. for node_exporter's textfile collector
+METRICS_FILE = os.environ.get('BIZMASTER_METRICS_FILE', 'metrics.prom')
+METRICS_WRITE_SECONDS = float(os.environ.get('BIZMASTER_METRICS_WRITE_SECONDS', 15))
+# Serve /metrics on this port as well when set
+METRICS_PORT = os.environ.get('BIZMASTER_METRICS_PORT')
+# Loopback only by default; set to 0.0.0.0 to let a remote scraper in
+METRICS_HOST = os.environ.get('BIZMASTER_METRICS_HOST', '127.0.0.1')
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Histogram name -> (help text, label name)
+HISTOGRAMS = {
+    'page_render': ('Wall time to render one page', 'page'),
+    'calculation': ('Wall time of one utils calculation', 'function'),
+    'auth_db': ('Wall time of one user database call', 'call'),
+}
+
+_lock = threading.Lock()
+_series = {}
+_state = {'last_write': 0.0, 'server': None}
+
+def observe(histogram, label, seconds):
+    """Add one observation to a histogram series"""
+    with _lock:
+        series = _series.get((histogram, label))
+        if series is None:
+            series = _series[(histogram, label)] = {'buckets': [0] * len(BUCKETS), 'sum': 0.0, 'count': 0}
+        index = bisect.bisect_left(BUCKETS, seconds)
+        if index < len(BUCKETS):
+            series['buckets'][index] += 1
+        series['sum'] += seconds
+        series['count'] += 1
+
+@contextmanager
+def _timer(histogram, label):
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        observe(histogram, label, perf_counter() - start)
+
+def timer(histogram, label):
+    """Context manager timing its block; a no-op when metrics are disabled"""
+    if not METRICS_ENABLED:
+        return nullcontext()
+    return _timer(histogram, label)
+
+def timed(histogram, label=None):
+    """Decorator timing each call; returns the function untouched when metrics are disabled"""
+    def decorator(func):
+        if not METRICS_ENABLED:
+            return func
+        name = label or func.__name__
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(histogram, name, perf_counter() - start)
+        return wrapper
+    return decorator
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def prometheus_text():
+    """All histograms in the Prometheus text exposition format"""
+    with _lock:
+        series = {key: {**value, 'buckets': list(value['buckets'])} for key, value in _series.items()}
+    lines = []
+    for histogram, (help_text, label_name) in HISTOGRAMS.items():
+        metric = f"bizmaster_{histogram}_seconds"
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} histogram")
+        for (name, label), values in sorted(series.items()):
+            if name != histogram:
+                continue
+            tag = f'{label_name}="{_escape(label)}"'
+            cumulative = 0
+            for bound, count in zip(BUCKETS, values['buckets']):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{{tag},le="{bound:g}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{{tag},le="+Inf"}} {values["count"]}')
+            lines.append(f"{metric}_sum{{{tag}}} {values['sum']:.6f}")
+            lines.append(f"{metric}_count{{{tag}}} {values['count']}")
+    return '\n'.join(lines) + '\n'
+
+def write_metrics_file(path=METRICS_FILE):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(prometheus_text())
+    os.replace(tmp_path, path)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def export_metrics():
+    """Refresh the metrics file and start the /metrics endpoint; called once per rerun"""
+    if not METRICS_ENABLED:
+        return
+    with _lock:
+        if METRICS_PORT and _state['server'] is None:
+            try:
+                _state['server'] = ThreadingHTTPServer((METRICS_HOST, int(METRICS_PORT)), _MetricsHandler)
+                threading.Thread(
+                    target=_state['server'].serve_forever, name='metrics-endpoint', daemon=True
+                ).start()
+            except OSError as e:
+                _state['server'] = False
+                logging.warning(f"Metrics endpoint not started: {str(e)}")
+        now = monotonic()
+        if now - _state['last_write'] < METRICS_WRITE_SECONDS:
+            return
+        _state['last_write'] = now
+    try:
+        write_metrics_file()
+    except OSError as e:
+        logging.warning(f"Could not write metrics file: {str(e)}")
@@ -0,0 +1,147 @@
+import pandas as pd
+import streamlit as st
+from data.cube import CUBE_LEDGERS, CUBE_COLUMNS, ledger_cells, get_cube
+from data.ledger_index import frame_ref
+from data.reconcile import cash_movements, reconcile_cash_balances
+from data.archive import archive_rows, new_staging, promote_staged, discard_staged
+from data.sku import STOCK_COLUMNS, net_stock
+from data.cogs import carry_forward_cogs, cogs_rows_archived
+
+CLOSE_LEDGERS = ('inventory', 'expenses', 'investments', 'transactions')
+CLOSING_COLUMNS = ['Period', 'Business Unit', 'Ledger', 'Category', 'Amount', 'Quantity']
+
+def closed_through():
+    """Last day of the latest closed period, or None"""
+    return st.session_state.get('closed_through')
+
+def latest_closing_balances():
+    """Cumulative closing rows of the latest closed period"""
+    closing = st.session_state.get('closing_balances')
+    if closing is None or closing.empty:
+        return pd.DataFrame(columns=CLOSING_COLUMNS)
+    return closing[closing['Period'] == closing['Period'].iloc[-1]]
+
+def ensure_period_open(value):
+    """Raise if a posting date falls in a closed period"""
+    through = closed_through()
+    if through is None or pd.isna(value):
+        return
+    if pd.Timestamp(value).date() <= through:
+        raise ValueError(f"The period up to {through:%Y-%m-%d} is closed")
+
+def closing_total(unit, ledger, categories=None, exclude=None, column='Amount'):
+    """Sum of a closing-balance column for a unit, optionally filtered by category"""
+    closing = latest_closing_balances()
+    if closing.empty:
+        return 0.0
+    mask = (closing['Business Unit'] == unit) & (closing['Ledger'] == ledger)
+    if categories is not None:
+        mask &= closing['Category'].isin(categories)
+    if exclude is not None:
+        mask &= ~closing['Category'].isin(exclude)
+    return float(closing.loc[mask, column].sum())
+
+def _cells_frame(cells):
+    return pd.DataFrame(
+        [(*key, *values) for key, values in cells.items()],
+        columns=CUBE_COLUMNS
+    )
+
+def apply_close(period, period_end, staged=None):
+    """Move rows dated on or before period_end out of the live ledgers.
+
+    staged is passed on to archive_rows; replays write the files directly.
+    """
+    end = pd.Timestamp(period_end)
+    archived_cells = []
+
+    carry_forward_cogs(period_end)
+
+    # Reconciliation baseline: cash moved by archived rows becomes opening cash
+    movements = cash_movements()
+    archived_cash = movements[pd.to_datetime(movements['Date'], errors='coerce') <= end]
+    opening = dict(st.session_state.get('opening_cash', {}))
+    for unit, amount in archived_cash.groupby('Business Unit')['Amount'].sum().items():
+        opening[unit] = float(opening.get(unit, 0.0)) + float(amount)
+    st.session_state['opening_cash'] = opening
+
+    for ledger in CLOSE_LEDGERS:
+        df = st.session_state.get(ledger)
+        if df is None or df.empty:
+            continue
+        closed = (pd.to_datetime(df['Date'], errors='coerce') <= end).to_numpy()
+        if not closed.any():
+            continue
+        archived = df[closed]
+        if ledger in CUBE_LEDGERS:
+            archived_cells.append(_cells_frame(ledger_cells(ledger, archived)))
+        if ledger == 'inventory':
+            # Per-SKU stock carried forward for valuation
+            st.session_state['closing_stock'] = pd.concat(
+                [st.session_state.get('closing_stock', pd.DataFrame(columns=STOCK_COLUMNS)),
+                 net_stock(archived)],
+                ignore_index=True
+            ).groupby(['Business Unit', 'SKU'], as_index=False)['Quantity'].sum()
+        archive_rows(ledger, archived, period, staged)
+        st.session_state[ledger] = df[~closed].reset_index(drop=True)
+
+    # Archived aggregates, one row per unit/ledger/category/month
+    cells = pd.concat(
+        [st.session_state.get('archived_cells', pd.DataFrame(columns=CUBE_COLUMNS))] + archived_cells,
+        ignore_index=True
+    ).groupby(['Business Unit', 'Ledger', 'Category', 'Month'], as_index=False)[
+        ['Amount', 'Quantity', 'Count']
+    ].sum()
+    st.session_state['archived_cells'] = cells[CUBE_COLUMNS]
+
+    # Cumulative closing balance per unit/ledger/category
+    closing = cells.groupby(['Business Unit', 'Ledger', 'Category'], as_index=False)[
+        ['Amount', 'Quantity']
+    ].sum()
+    closing.insert(0, 'Period', period)
+    st.session_state['closing_balances'] = pd.concat(
+        [st.session_state.get('closing_balances', pd.DataFrame(columns=CLOSING_COLUMNS)), closing],
+        ignore_index=True
+    )[CLOSING_COLUMNS]
+    st.session_state['closed_through'] = end.date()
+
+    # The cube and COGS books already hold archived rows; only their row counters move
+    cube = st.session_state.get('ledger_cube')
+    if cube is not None:
+        for ledger in CUBE_LEDGERS:
+            cube['rows'][ledger] = len(st.session_state.get(ledger, ()))
+            cube['frames'][ledger] = frame_ref(st.session_state.get(ledger))
+    cogs_rows_archived()
+
+def close_period(month, force=False):
+    """Close every open month up to and including month ('YYYY-MM').
+
+    Reconciles cash first and refuses to close on a discrepancy unless
+    force is set. Returns the reconciliation summary.
+    """
+    # Imported lazily: utils imports the data layer at module load
+    from data.event_log import business_operation, record_effect, on_commit
+
+    try:
+        period = pd.Period(month, freq='M')
+        period_end = period.end_time.date()
+        if closed_through() is not None and period_end <= closed_through():
+            raise ValueError(f"{month} is already closed")
+        if period_end >= pd.Timestamp.today().date():
+            raise ValueError("Only completed months can be closed")
+
+        reconciliation = reconcile_cash_balances()
+        if not force and not reconciliation['summary']['Balanced'].all():
+            raise ValueError("Cash balances do not reconcile; review the Cash Reconciliation report")
+
+        get_cube()  # make sure archived rows are in the cube before they leave the ledgers
+        staged = new_staging()
+        with business_operation('Period Close', period=str(period)):
+            # Archive files appear only once the close is in the log; a failed
+            # commit must not leave rows that a later close archives again
+            on_commit(lambda: promote_staged(staged), lambda: discard_staged(staged))
+            apply_close(str(period), period_end, staged)
+            record_effect('close', period=str(period), period_end=period_end)
+        return reconciliation['summary']
+    except Exception as e:
+        raise ValueError(f"Error closing period: {str(e)}")
@@ -0,0 +1,79 @@
+import os
+import cProfile
+import logging
+import marshal
+import pstats
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+import pandas as pd
+import streamlit as st
+
+PROFILE_DIR = os.environ.get('BIZMASTER_PROFILE_DIR', 'profiles')
+HOT_COLUMNS = ['Function', 'Location', 'Calls', 'Own Time (s)', 'Cumulative (s)', 'Per Call (ms)']
+SORT_COLUMNS = {'cumulative': 'Cumulative (s)', 'own': 'Own Time (s)', 'calls': 'Calls'}
+
+# The interpreter allows one active profiler; a rerun that finds it busy is not profiled
+_profiler_lock = threading.Lock()
+
+def start_profiling(reruns):
+    """Profile the next reruns of this session, replacing any earlier capture"""
+    st.session_state['profile_capture'] = {
+        'remaining': int(reruns), 'reruns': 0, 'stats': None, 'started': datetime.now()
+    }
+    st.session_state.pop('profile_result', None)
+
+def profiling_remaining():
+    capture = st.session_state.get('profile_capture')
+    return 0 if capture is None else capture['remaining']
+
+@contextmanager
+def profile_rerun(label):
+    """Profile the enclosed block if this session asked for it; free otherwise"""
+    capture = st.session_state.get('profile_capture')
+    if not capture or capture['remaining'] <= 0 or not _profiler_lock.acquire(blocking=False):
+        yield
+        return
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+    finally:
+        _profiler_lock.release()
+        if capture['stats'] is None:
+            capture['stats'] = pstats.Stats(profile)
+        else:
+            capture['stats'].add(profile)
+        capture['remaining'] -= 1
+        capture['reruns'] += 1
+        capture.setdefault('pages', []).append(label)
+        if capture['remaining'] <= 0:
+            _finish(capture)
+
+def _finish(capture):
+    user = (st.session_state.get('user') or {}).get('username', 'unknown')
+    data = marshal.dumps(capture['stats'].stats)
+    name = f"{capture['started']:%Y%m%d_%H%M%S}_{user}.pstats"
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        with open(os.path.join(PROFILE_DIR, name), 'wb') as f:
+            f.write(data)
+    except OSError as e:
+        logging.warning(f"Could not store profile {name}: {str(e)}")
+    st.session_state['profile_result'] = {
+        'name': name, 'reruns': capture['reruns'], 'pages': capture['pages'], 'pstats': data
+    }
+    st.session_state.pop('profile_capture', None)
+
+def hot_functions(data, sort='cumulative', limit=40):
+    """The heaviest functions of a marshalled pstats capture"""
+    stats = marshal.loads(data)
+    rows = []
+    for (filename, line, function), (_, calls, own, cumulative, _) in stats.items():
+        location = function if filename == '~' else f"{os.path.basename(filename)}:{line}"
+        rows.append((function, location, calls, own, cumulative, cumulative / calls * 1000 if calls else 0.0))
+    hot = pd.DataFrame(rows, columns=HOT_COLUMNS)
+    return hot.sort_values(SORT_COLUMNS[sort], ascending=False).head(limit).round(4)
@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+MOVEMENT_COLUMNS = ['Business Unit', 'Date', 'Ledger', 'Position', 'Type', 'Amount']
+# Investment distributions are bookkeeping entries; the cash arrives via the investment row
+NON_CASH_CATEGORIES = ['Partner Contribution']
+
+def _empty_movements():
+    return pd.DataFrame({col: pd.Series(dtype=object) for col in MOVEMENT_COLUMNS})
+
+def _amounts(series):
+    return pd.to_numeric(series, errors='coerce').fillna(0.0).to_numpy()
+
+def cash_movements():
+    """Every cash-affecting ledger row as (unit, date, ledger, position, type, signed amount)"""
+    frames = []
+    inventory = st.session_state.get('inventory')
+    if inventory is not None and not inventory.empty:
+        is_sale = (inventory['Transaction Type'] == 'Sale').to_numpy()
+        frames.append(pd.DataFrame({
+            'Business Unit': inventory['Business Unit'].to_numpy(),
+            'Date': inventory['Date'].to_numpy(),
+            'Ledger': 'inventory',
+            'Position': np.arange(len(inventory)),
+            'Type': inventory['Transaction Type'].to_numpy(),
+            'Amount': np.where(is_sale, 1.0, -1.0) * _amounts(inventory['Total Amount'])
+        }))
+    expenses = st.session_state.get('expenses')
+    if expenses is not None and not expenses.empty:
+        positions = np.flatnonzero(~expenses['Category'].isin(NON_CASH_CATEGORIES).to_numpy())
+        cash_expenses = expenses.iloc[positions]
+        frames.append(pd.DataFrame({
+            'Business Unit': cash_expenses['Business Unit'].to_numpy(),
+            'Date': cash_expenses['Date'].to_numpy(),
+            'Ledger': 'expenses',
+            'Position': positions,
+            'Type': np.where(
+                cash_expenses['Category'].to_numpy() == 'Partner Withdrawal',
+                'Partner Withdrawal', 'Expense'
+            ),
+            'Amount': -_amounts(cash_expenses['Amount'])
+        }))
+    investments = st.session_state.get('investments')
+    if investments is not None and not investments.empty:
+        frames.append(pd.DataFrame({
+            'Business Unit': investments['Business Unit'].to_numpy(),
+            'Date': investments['Date'].to_numpy(),
+            'Ledger': 'investments',
+            'Position': np.arange(len(investments)),
+            'Type': 'Investment',
+            'Amount': _amounts(investments['Amount'])
+        }))
+    if not frames:
+        return _empty_movements()
+    return pd.concat(frames, ignore_index=True)
+
+def _with_occurrence(df, keys):
+    """Number repeated (keys) combinations so duplicates match one-to-one"""
+    return df.assign(Occurrence=df.groupby(keys, sort=False).cumcount())
+
+def unmatched_entries(movements):
+    """Match ledger rows to the transaction log on (type, unit, amount).
+
+    Returns (ledger rows with no transaction, transactions with no ledger row).
+    """
+    transactions = st.session_state.get('transactions')
+    if transactions is None or transactions.empty:
+        return movements, pd.DataFrame(columns=['Type', 'Business Unit', 'Amount'])
+    tx_types = transactions['Type'].to_numpy()
+    # Money coming into a unit is logged with the unit in 'To', money leaving in 'From'
+    inflow = np.isin(tx_types, ['Investment', 'Sale'])
+    tx = pd.DataFrame({
+        'Type': tx_types,
+        'Business Unit': np.where(inflow, transactions['To'].to_numpy(), transactions['From'].to_numpy()),
+        'Cents': np.round(_amounts(transactions['Amount']) * 100).astype(np.int64),
+        'Transaction Row': np.arange(len(transactions))
+    })
+    ledger = movements.assign(Cents=np.round(np.abs(movements['Amount'].to_numpy(float)) * 100).astype(np.int64))
+    keys = ['Type', 'Business Unit', 'Cents']
+    merged = _with_occurrence(ledger, keys).merge(
+        _with_occurrence(tx, keys),
+        on=keys + ['Occurrence'],
+        how='outer',
+        indicator=True
+    )
+    missing_tx = merged[merged['_merge'] == 'left_only'][MOVEMENT_COLUMNS]
+    orphan_tx = transactions.iloc[
+        merged.loc[merged['_merge'] == 'right_only', 'Transaction Row'].astype(np.int64).to_numpy()
+    ]
+    return missing_tx, orphan_tx
+
+def reconcile_cash_balances():
+    """Recompute every unit's cash from the ledgers and compare with cash_balance.
+
+    Returns a dict with a per-unit 'summary' frame and the offending rows:
+    'overdrafts' (movements that took the running balance below zero),
+    'missing_transactions' and 'orphan_transactions'.
+    """
+    try:
+        movements = cash_movements()
+        opening = st.session_state.get('opening_cash', {})
+        actual = st.session_state.get('cash_balance', {})
+        units = sorted(set(opening) | set(actual) | set(movements['Business Unit'].dropna()))
+
+        # One stable sort plus a grouped cumulative sum gives every running balance
+        dates = pd.to_datetime(movements['Date'], errors='coerce')
+        ordered = movements.assign(_date=dates).sort_values(
+            ['Business Unit', '_date'], kind='stable'
+        ).drop(columns='_date')
+        opening_by_row = ordered['Business Unit'].map(opening).fillna(0.0).astype(float)
+        ordered['Running Balance'] = (
+            opening_by_row + ordered.groupby('Business Unit', sort=False)['Amount'].cumsum().astype(float)
+        )
+
+        totals = movements.groupby('Business Unit')['Amount'].sum()
+        summary = pd.DataFrame({'Business Unit': units})
+        summary['Opening'] = summary['Business Unit'].map(opening).fillna(0.0).astype(float)
+        summary['Movements'] = summary['Business Unit'].map(totals).fillna(0.0).astype(float)
+        summary['Expected'] = summary['Opening'] + summary['Movements']
+        summary['Actual'] = summary['Business Unit'].map(actual).fillna(0.0).astype(float)
+        summary['Difference'] = (summary['Actual'] - summary['Expected']).round(2)
+        summary['Balanced'] = summary['Difference'].abs() < 0.01
+
+        missing_tx, orphan_tx = unmatched_entries(movements)
+        return {
+            'summary': summary.round(2),
+            'overdrafts': ordered[ordered['Running Balance'] < -0.005],
+            'missing_transactions': missing_tx,
+            'orphan_transactions': orphan_tx
+        }
+    except Exception as e:
+        raise ValueError(f"Error reconciling cash balances: {str(e)}")
@@ -0,0 +1,266 @@
+import os
+import sys
+import uuid
+import logging
+import threading
+import weakref
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from time import monotonic
+import numpy as np
+import pandas as pd
+import streamlit as st
+from data.shared_ledger import SHARED_KEYS, DERIVED_KEYS
+
+try:
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+except ImportError:  # internal API; without it idle sessions simply stay resident
+    get_script_run_ctx = None
+
+SPILL_DIR = os.environ.get('BIZMASTER_SPILL_DIR', 'spill')
+# Sessions untouched for this long have their large private state moved to disk
+SPILL_AFTER_MINUTES = float(os.environ.get('BIZMASTER_SPILL_AFTER_MINUTES', 30))
+# Private values smaller than this stay in memory
+SPILL_MIN_BYTES = int(os.environ.get('BIZMASTER_SPILL_MIN_BYTES', 64 * 1024))
+# How often a rerun looks for idle sessions
+SPILL_SWEEP_SECONDS = 60
+# Fields of a report_queries entry kept with its spilled result
+REPORT_QUERY_FIELDS = ('sql', 'params', 'version')
+
+def _finished(future):
+    """Whether a future completed with a result rather than an error"""
+    return future.done() and not future.cancelled() and future.exception() is None
+
+def value_nbytes(value, frame_nbytes=None):
+    """Approximate memory held by one session value.
+
+    frame_nbytes, if given, measures frames and series in place of
+    memory_usage (e.g. a cache for frames that are never changed in place).
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        if frame_nbytes is not None:
+            return frame_nbytes(value)
+        usage = value.memory_usage(index=True, deep=True)
+        return int(usage.sum() if isinstance(value, pd.DataFrame) else usage)
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, Future):
+        # A finished report query holds its whole result frame
+        return sys.getsizeof(value) + (value_nbytes(value.result(), frame_nbytes) if _finished(value) else 0)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(value_nbytes(v, frame_nbytes) for v in value.values())
+    if isinstance(value, (list, tuple, set, deque)):
+        return sys.getsizeof(value) + sum(value_nbytes(v, frame_nbytes) for v in value)
+    return sys.getsizeof(value)
+
+def is_shared_key(key):
+    """Keys held once per process by the shared ledger rather than by the session"""
+    return key in SHARED_KEYS or key in DERIVED_KEYS
+
+def private_items(items):
+    """The session-owned part of a mapping of session keys"""
+    return {key: value for key, value in items.items() if not is_shared_key(key)}
+
+class SessionHandle:
+    """Kept in the session's own state, so it is collected with the session.
+
+    The registry holds it weakly; state is the session's state object as of
+    its latest run, used by the sweeper to spill it while it sits idle.
+    """
+    def __init__(self, token):
+        self.token = token
+        self.state = None
+
+@st.cache_resource
+def session_registry():
+    """Every live session in this process, keyed by its spill token"""
+    return {'lock': threading.Lock(), 'sessions': {}, 'last_sweep': 0.0}
+
+def spill_available():
+    return get_script_run_ctx is not None
+
+def _spill_path(token):
+    return os.path.join(SPILL_DIR, f"{token}.pkl.gz")
+
+def state_items(state):
+    """Keys and values of a session state object from session_entries"""
+    # Another session's state is only reachable through Streamlit internals
+    return state.filtered_state
+
+def _holds_frames(value):
+    return isinstance(value, dict) and any(
+        isinstance(v, (pd.DataFrame, pd.Series, np.ndarray)) for v in value.values()
+    )
+
+def _spill_parts(key, value):
+    """(part written to disk, part kept in memory) of one session value; either may be None"""
+    if is_shared_key(key):
+        return None, value
+    if key == 'report_queries' and isinstance(value, dict):
+        # Finished results go to disk as plain frames; queries still running stay
+        finished = {query: entry for query, entry in value.items() if _finished(entry['future'])}
+        if not finished or value_nbytes(finished) < SPILL_MIN_BYTES:
+            return None, value
+        spilled = {
+            query: {**{field: entry[field] for field in REPORT_QUERY_FIELDS}, 'result': entry['future'].result()}
+            for query, entry in finished.items()
+        }
+        running = {query: entry for query, entry in value.items() if query not in finished}
+        return spilled, running or None
+    # Frames and arrays, bare or in a dict such as an import's error report;
+    # widget values must stay where Streamlit put them
+    if isinstance(value, (pd.DataFrame, pd.Series, np.ndarray)) or _holds_frames(value):
+        if value_nbytes(value) >= SPILL_MIN_BYTES:
+            return value, None
+    return None, value
+
+def session_entries():
+    """(token, entry, state) for every live session, copied out of the registry.
+
+    entry is a snapshot of the registry fields; state is None for sessions
+    that have not finished registering yet.
+    """
+    registry = session_registry()
+    with registry['lock']:
+        entries = list(registry['sessions'].items())
+    live = []
+    for token, entry in entries:
+        handle = entry['handle']()
+        if handle is None:
+            continue
+        live.append((token, {k: v for k, v in entry.items() if k not in ('lock', 'handle')}, handle.state))
+    return live
+
+def _register():
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return None
+    handle = st.session_state.get('spill_handle')
+    if handle is None:
+        handle = st.session_state['spill_handle'] = SessionHandle(uuid.uuid4().hex)
+    # Refreshed every run, in case Streamlit hands the run a new state wrapper
+    handle.state = ctx.session_state
+    registry = session_registry()
+    with registry['lock']:
+        entry = registry['sessions'].get(handle.token)
+        if entry is None:
+            entry = registry['sessions'][handle.token] = {
+                'lock': threading.Lock(), 'handle': weakref.ref(handle),
+                'running': False, 'spilled': False, 'spilled_bytes': 0, 'last_seen': monotonic()
+            }
+    return entry
+
+def _restore(token):
+    path = _spill_path(token)
+    if os.path.exists(path):
+        for key, value in pd.read_pickle(path, compression='gzip').items():
+            if key == 'report_queries':
+                # Back as completed futures, next to queries that were still running
+                pending = st.session_state.setdefault('report_queries', {})
+                for query, entry in value.items():
+                    future = Future()
+                    future.set_result(entry.pop('result'))
+                    pending.setdefault(query, {**entry, 'future': future})
+            elif key not in st.session_state:
+                st.session_state[key] = value
+        os.remove(path)
+
+@contextmanager
+def active_session():
+    """Mark this session as running for one script run.
+
+    State spilled while the session sat idle is restored first. Both happen
+    under the session's own lock, so a sweep never spills a session that is
+    running or restoring; it only takes sessions idle between runs.
+    """
+    entry = _register() if spill_available() else None
+    if entry is not None:
+        with entry['lock']:
+            entry['running'] = True
+            entry['last_seen'] = monotonic()
+            if entry['spilled']:
+                _restore(st.session_state['spill_handle'].token)
+                entry['spilled'] = False
+                entry['spilled_bytes'] = 0
+    try:
+        yield
+    finally:
+        if entry is not None:
+            with entry['lock']:
+                entry['running'] = False
+                entry['last_seen'] = monotonic()
+
+def _spill(token, state):
+    private, resident = {}, {}
+    for key, value in state_items(state).items():
+        spilled, kept = _spill_parts(key, value)
+        if spilled is not None:
+            private[key] = spilled
+            if kept is not None:
+                resident[key] = kept
+    if private:
+        os.makedirs(SPILL_DIR, exist_ok=True)
+        path = _spill_path(token)
+        pd.to_pickle(private, path + '.tmp', compression='gzip')
+        os.replace(path + '.tmp', path)
+    # Shared keys are re-attached on the next run; dropping them now stops an
+    # idle session pinning ledger versions that later writes replaced
+    for key in list(private) + [k for k in SHARED_KEYS + DERIVED_KEYS if k in state]:
+        del state[key]
+    for key, value in resident.items():
+        state[key] = value
+    return os.path.getsize(_spill_path(token)) if private else 0
+
+def spill_idle_sessions():
+    """Move large private state of sessions idle past SPILL_AFTER_MINUTES to disk.
+
+    Runs at most once per SPILL_SWEEP_SECONDS, from whichever session
+    reruns; closed sessions are dropped from the registry with their files.
+    Each idle session is spilled under its own lock, taken without waiting:
+    a session that starts running meanwhile is skipped, and its run waits
+    for a spill already under way to finish before restoring.
+    """
+    if not spill_available():
+        return
+    registry = session_registry()
+    now = monotonic()
+    with registry['lock']:
+        if now - registry['last_sweep'] < SPILL_SWEEP_SECONDS:
+            return
+        registry['last_sweep'] = now
+        entries = list(registry['sessions'].items())
+    for token, entry in entries:
+        handle = entry['handle']()
+        if handle is None:
+            with registry['lock']:
+                registry['sessions'].pop(token, None)
+            if os.path.exists(_spill_path(token)):
+                os.remove(_spill_path(token))
+            continue
+        if not entry['lock'].acquire(blocking=False):
+            continue
+        try:
+            if entry['running'] or entry['spilled'] or handle.state is None:
+                continue
+            if now - entry['last_seen'] < SPILL_AFTER_MINUTES * 60:
+                continue
+            entry['spilled_bytes'] = _spill(token, handle.state)
+            entry['spilled'] = True
+        except Exception as e:
+            logging.warning(f"Could not spill idle session {token[:8]}: {str(e)}")
+        finally:
+            entry['lock'].release()
+
+def spill_metrics():
+    """Counts of resident and spilled sessions, with private bytes in memory and on disk"""
+    metrics = {'resident_sessions': 0, 'spilled_sessions': 0, 'resident_bytes': 0, 'spilled_bytes': 0}
+    # Measured outside the registry lock so reruns are not held up by it
+    for token, entry, state in session_entries():
+        if entry['spilled']:
+            metrics['spilled_sessions'] += 1
+            metrics['spilled_bytes'] += entry['spilled_bytes']
+        elif state is not None:
+            metrics['resident_sessions'] += 1
+            metrics['resident_bytes'] += sum(map(value_nbytes, private_items(state_items(state)).values()))
+    return metrics
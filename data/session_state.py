@@ -1,22 +1,38 @@
 import streamlit as st
 import pandas as pd
+from data.event_log import recover_ledgers
+from data.shared_ledger import ensure_shared_state
+from utils import initialize_default_data
+
+def _load_ledgers():
+    """Build the ledgers once per process; every session then shares them"""
+    st.session_state.inventory = pd.DataFrame(columns=[
+        'Date', 'Transaction Type', 'Quantity_kg', 
+        'Unit Price', 'Total Amount', 'Remarks', 'Business Unit'
+    ])
+    st.session_state.cash_balance = {'Unit A': 10000.0, 'Unit B': 10000.0}  # Use floats consistently
+    st.session_state.opening_cash = dict(st.session_state.cash_balance)  # Baseline for reconciliation
+    st.session_state.investments = pd.DataFrame(columns=[
+        'Date', 'Amount', 'Investor', 'Remarks', 'Business Unit'
+    ])
+    st.session_state.expenses = pd.DataFrame(columns=[
+        'Date', 'Category', 'Amount', 'Description', 'Business Unit', 'Partner'
+    ])
+    st.session_state.partners = {
+        'Unit A': pd.DataFrame(columns=['Partner', 'Share', 'Withdrawn']),
+        'Unit B': pd.DataFrame(columns=['Partner', 'Share', 'Withdrawn'])
+    }
+    st.session_state.current_price = 100.0
+    # Warm start from the latest ledger snapshot plus the event log tail
+    recover_ledgers()
+    initialize_default_data()
 
 def initialize_session_state():
     if 'initialized' not in st.session_state:
-        st.session_state.inventory = pd.DataFrame(columns=[
-            'Date', 'Transaction Type', 'Quantity_kg', 
-            'Unit Price', 'Total Amount', 'Remarks', 'Business Unit'
-        ])
-        st.session_state.cash_balance = {'Unit A': 10000.0, 'Unit B': 10000.0}  # Use floats consistently
-        st.session_state.investments = pd.DataFrame(columns=[
-            'Date', 'Amount', 'Investor', 'Remarks', 'Business Unit'
-        ])
-        st.session_state.expenses = pd.DataFrame(columns=[
-            'Date', 'Category', 'Amount', 'Description', 'Business Unit', 'Partner'
-        ])
-        st.session_state.partners = {
-            'Unit A': pd.DataFrame(columns=['Partner', 'Share', 'Withdrawn']),
-            'Unit B': pd.DataFrame(columns=['Partner', 'Share', 'Withdrawn'])
-        }
-        st.session_state.current_price = 100.0
+        try:
+            ensure_shared_state(_load_ledgers)
+        except ValueError as e:
+            # Nothing was loaded; the next run tries again from the snapshot
+            st.error(f"Error loading ledgers: {str(e)}")
+            st.stop()
         st.session_state.initialized = True
\ No newline at end of file
@@ -0,0 +1,266 @@
+import threading
+from collections import deque
+from contextlib import contextmanager
+import streamlit as st
+
+# Business state shared by every browser session in this process
+SHARED_KEYS = (
+    'inventory', 'expenses', 'investments', 'transactions', 'price_history',
+    'cash_balance', 'opening_cash', 'current_price', 'sku_prices', 'partners',
+    'closed_through', 'closing_balances', 'archived_cells', 'closing_stock',
+    'cogs_opening_lots', 'cogs_opening_totals',
+    'archived_inventory', 'archived_expenses', 'archived_investments', 'archived_transactions',
+    'event_seq', 'snapshot_event_seq', 'snapshot_status'
+)
+# Structures derived from the ledgers; any session may rebuild and share them
+DERIVED_KEYS = (
+    'ledger_index', 'ledger_cube', 'cogs_engine', 'stock_counter', 'sku_stock', 'inventory_aging'
+)
+
+_writing = threading.local()
+
+class ReadWriteLock:
+    """Writer-preferring reader-writer lock.
+
+    Readers share the lock; a writer waits for current readers and holds
+    new ones back. Both sides are re-entrant per thread, and a thread that
+    holds read locks may take the write lock: its reads are suspended
+    while it waits and restored when the write is released.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = None
+        self._write_depth = 0
+        self._waiting_writers = 0
+        self._local = threading.local()
+
+    def _reads(self):
+        return getattr(self._local, 'reads', 0)
+
+    def acquire_read(self):
+        me = threading.get_ident()
+        with self._cond:
+            # Re-entrant reads must not queue behind a waiting writer or they deadlock
+            if self._writer != me and self._reads() == 0:
+                while self._writer is not None or self._waiting_writers:
+                    self._cond.wait()
+            self._readers += 1
+        self._local.reads = self._reads() + 1
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            self._local.reads = self._reads() - 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+                return
+            suspended = self._reads()
+            self._readers -= suspended
+            if suspended and self._readers == 0:
+                self._cond.notify_all()
+            self._waiting_writers += 1
+            while self._writer is not None or self._readers > 0:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = me
+            self._write_depth = 1
+            self._local.suspended = suspended
+
+    def release_write(self):
+        with self._cond:
+            self._write_depth -= 1
+            if self._write_depth:
+                return
+            self._writer = None
+            self._readers += self._local.suspended
+            self._local.suspended = 0
+            self._cond.notify_all()
+
+@st.cache_resource
+def shared_store():
+    """The process-wide ledger: one instance for all sessions.
+
+    state is what is durable and visible to readers. tip is the state
+    writers build on while pipelined writes are still waiting to become
+    durable (None when there are none); pending holds those writes in
+    order, and commit guards state, tip, pending and generation.
+    """
+    return {
+        'state': {}, 'tip': None, 'lock': ReadWriteLock(), 'commit': threading.Condition(),
+        'pending': deque(), 'generation': 0, 'version': 0, 'loaded': False
+    }
+
+class PendingWrite:
+    """A pipelined write released from the write lock before it is durable"""
+
+    def __init__(self, generation):
+        self.generation = generation
+        self.state = None
+        self.failed = False
+
+def _attach(values, discard=False):
+    for key, value in values.items():
+        st.session_state[key] = value
+    if discard:
+        for key in SHARED_KEYS + DERIVED_KEYS:
+            if key not in values and key in st.session_state:
+                del st.session_state[key]
+
+def attach_shared_state(discard=False):
+    """Point this session's keys at the shared objects (references, not copies).
+
+    With discard, shared keys the store does not hold are dropped too, so
+    nothing a rolled-back write created is left behind.
+    """
+    store = shared_store()
+    with store['commit']:
+        state, version = store['state'], store['version']
+    _attach(state, discard)
+    st.session_state['shared_version'] = version
+
+def _session_values():
+    return {key: st.session_state[key] for key in SHARED_KEYS + DERIVED_KEYS if key in st.session_state}
+
+def _publish(store, values):
+    # Called with commit held; a new dict, so readers attaching meanwhile see one whole state
+    store['state'] = {**store['state'], **values}
+    store['version'] += 1
+    st.session_state['shared_version'] = store['version']
+
+@contextmanager
+def shared_read():
+    """Read the shared ledger; readers never block each other"""
+    store = shared_store()
+    store['lock'].acquire_read()
+    try:
+        attach_shared_state()
+        yield
+        # Derived structures rebuilt while reading are shared unless a write superseded them
+        with store['commit']:
+            if store['version'] == st.session_state.get('shared_version'):
+                store['state'].update({
+                    key: st.session_state[key] for key in DERIVED_KEYS if key in st.session_state
+                })
+    finally:
+        store['lock'].release_read()
+
+@contextmanager
+def shared_write():
+    """The single serialized path for changing the shared ledger.
+
+    Refreshes this session from the shared state once the lock is held,
+    so the change applies to the latest ledgers, then publishes the result.
+    Shared objects are never changed in place: a write rebinds this
+    session's keys to new objects (its overlay), and publishing swaps them
+    into the store, so sessions holding the previous ones are unaffected.
+    If the block raises, the overlay is discarded and nothing is published.
+    Pipelined writes still waiting to become durable are finished first.
+    """
+    if getattr(_writing, 'active', False):
+        # Nested writes belong to the outermost one, which publishes everything
+        yield
+        return
+    store = shared_store()
+    store['lock'].acquire_write()
+    _writing.active = True
+    try:
+        with store['commit']:
+            while store['pending']:
+                store['commit'].wait()
+        attach_shared_state()
+        yield
+    except BaseException:
+        _writing.active = False
+        attach_shared_state(discard=True)
+        raise
+    else:
+        _writing.active = False
+        with store['commit']:
+            _publish(store, _session_values())
+    finally:
+        store['lock'].release_write()
+
+@contextmanager
+def pipelined_write():
+    """Write path for changes that become durable after the lock is released.
+
+    Like shared_write, except the block builds on the newest state,
+    including pipelined writes not yet durable, and on leaving it the lock
+    is released with the result queued as the PendingWrite it yields. The
+    caller must then call finish_write once it knows whether the change
+    is durable. Nested inside another write, it yields None and the
+    outer write publishes everything.
+    """
+    if getattr(_writing, 'active', False):
+        yield None
+        return
+    store = shared_store()
+    store['lock'].acquire_write()
+    _writing.active = True
+    try:
+        with store['commit']:
+            pending = PendingWrite(store['generation'])
+            base = store['state'] if store['tip'] is None else store['tip']
+        _attach(base)
+        yield pending
+    except BaseException:
+        _writing.active = False
+        _attach(base, discard=True)
+        raise
+    else:
+        _writing.active = False
+        with store['commit']:
+            if pending.generation != store['generation']:
+                # An earlier write this one built on failed while the block ran
+                pending.failed = True
+            else:
+                pending.state = _session_values()
+                store['tip'] = pending.state
+                store['pending'].append(pending)
+    finally:
+        store['lock'].release_write()
+
+def finish_write(pending, durable):
+    """Publish a pipelined write, or discard it; returns whether it was published.
+
+    Writes are published in the order they were queued, so this waits for
+    the ones before it. A write that is not durable fails, and so does
+    every write queued after it, since each was built on the ones before.
+    A failed write re-attaches this session to the published state.
+    """
+    store = shared_store()
+    with store['commit']:
+        while pending in store['pending'] and store['pending'][0] is not pending:
+            store['commit'].wait()
+        if durable and not pending.failed:
+            store['pending'].popleft()
+            _publish(store, pending.state)
+            if not store['pending']:
+                store['tip'] = None
+            store['commit'].notify_all()
+            return True
+        if pending in store['pending']:
+            for later in store['pending']:
+                later.failed = True
+            store['pending'].clear()
+            store['tip'] = None
+            store['generation'] += 1
+            store['commit'].notify_all()
+    attach_shared_state(discard=True)
+    return False
+
+def ensure_shared_state(loader):
+    """Load the shared ledger once per process with loader, then attach it"""
+    store = shared_store()
+    with shared_write():
+        if not store['loaded']:
+            loader()
+            store['loaded'] = True
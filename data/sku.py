@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from data.ledger_index import frame_ref, built_from
+
+# Rows recorded before SKUs existed belong to the original single commodity
+DEFAULT_SKU = 'Standard'
+STOCK_COLUMNS = ['Business Unit', 'SKU', 'Quantity']
+POSITION_COLUMNS = ['Business Unit', 'SKU', 'Quantity', 'Price', 'Value']
+
+def sku_column(rows):
+    """SKU of each inventory row, defaulting rows without one"""
+    if 'SKU' not in rows.columns:
+        return pd.Series(DEFAULT_SKU, index=rows.index)
+    return rows['SKU'].fillna(DEFAULT_SKU).replace('', DEFAULT_SKU)
+
+def sku_prices():
+    """Current price per SKU, seeded from the single market price"""
+    if 'sku_prices' not in st.session_state:
+        st.session_state['sku_prices'] = {DEFAULT_SKU: float(st.session_state.get('current_price', 0.0))}
+    return st.session_state['sku_prices']
+
+def set_sku_prices(prices):
+    """Store new prices; the default SKU also drives current_price"""
+    st.session_state['sku_prices'] = {
+        **sku_prices(), **{sku: float(price) for sku, price in prices.items()}
+    }
+    if DEFAULT_SKU in prices:
+        st.session_state.current_price = float(prices[DEFAULT_SKU])
+
+def net_stock(rows):
+    """Net kilograms per unit and SKU: purchases minus sales"""
+    if rows is None or rows.empty:
+        return pd.DataFrame(columns=STOCK_COLUMNS)
+    quantity = pd.to_numeric(rows['Quantity_kg'], errors='coerce').fillna(0.0).to_numpy()
+    kind = rows['Transaction Type'].to_numpy()
+    signed = np.where(kind == 'Purchase', quantity, np.where(kind == 'Sale', -quantity, 0.0))
+    frame = pd.DataFrame({
+        'Business Unit': rows['Business Unit'].to_numpy(),
+        'SKU': sku_column(rows).to_numpy(),
+        'Quantity': signed
+    })
+    return frame.groupby(['Business Unit', 'SKU'], as_index=False)['Quantity'].sum()
+
+def _stock():
+    """Net stock across closed periods and the live ledger, rebuilt when the ledger changes"""
+    inventory = st.session_state.get('inventory')
+    key = (0 if inventory is None else len(inventory), st.session_state.get('closed_through'))
+    cached = st.session_state.get('sku_stock')
+    if cached is None or cached['key'] != key or not built_from(cached['frame'], inventory):
+        frames = [net_stock(inventory)]
+        closing = st.session_state.get('closing_stock')
+        if closing is not None and not closing.empty:
+            frames.append(closing[STOCK_COLUMNS])
+        stock = pd.concat(frames, ignore_index=True).groupby(
+            ['Business Unit', 'SKU'], as_index=False
+        )['Quantity'].sum()
+        cached = {'key': key, 'frame': frame_ref(inventory), 'stock': stock}
+        st.session_state['sku_stock'] = cached
+    return cached['stock']
+
+def sku_positions(unit=None):
+    """Stock and market value per unit and SKU in one grouped pass and price join"""
+    stock = _stock()
+    if unit is not None:
+        stock = stock[stock['Business Unit'] == unit]
+    price = stock['SKU'].map(pd.Series(sku_prices(), dtype=float))
+    positions = stock.assign(Price=price, Value=stock['Quantity'] * price.fillna(0.0))
+    return positions[POSITION_COLUMNS]
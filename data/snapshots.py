@@ -0,0 +1,251 @@
+import os
+import json
+import time
+import shutil
+import logging
+import threading
+from datetime import date, datetime
+import pandas as pd
+import streamlit as st
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional dependency, snapshots are disabled without it
+    pa = None
+
+SNAPSHOT_DIR = os.environ.get('BIZMASTER_SNAPSHOT_DIR', 'snapshots')
+SNAPSHOT_INTERVAL_SECONDS = int(os.environ.get('BIZMASTER_SNAPSHOT_INTERVAL', 300))
+# lz4 decompresses fastest; 'uncompressed' makes memory-mapped loads zero-copy
+SNAPSHOT_COMPRESSION = os.environ.get('BIZMASTER_SNAPSHOT_COMPRESSION', 'lz4')
+SNAPSHOT_KEEP = int(os.environ.get('BIZMASTER_SNAPSHOT_KEEP', 3))
+SNAPSHOT_LEDGERS = ('inventory', 'expenses', 'investments', 'transactions', 'price_history')
+# Closed-period aggregates, plus the archived rows themselves when pyarrow is unavailable
+SNAPSHOT_ARCHIVES = (
+    'archived_inventory', 'archived_expenses', 'archived_investments', 'archived_transactions',
+    'archived_cells', 'closing_balances', 'closing_stock', 'cogs_opening_lots', 'cogs_opening_totals'
+)
+LATEST_POINTER = 'LATEST'
+
+# Only one snapshot is written at a time; a write still running skips the next
+_snapshot_lock = threading.Lock()
+
+def snapshots_available():
+    """True when pyarrow is installed and snapshots can be written"""
+    return pa is not None
+
+def to_arrow_table(df):
+    """Convert a ledger frame to an Arrow table with stable column types"""
+    frame = df.infer_objects()
+    if 'Date' in frame.columns:
+        frame['Date'] = pd.to_datetime(frame['Date'], errors='coerce')
+    try:
+        return pa.Table.from_pandas(frame, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed-type object columns (e.g. None and text) are stored as strings
+        for col in frame.columns[frame.dtypes == object]:
+            if col != 'Time':
+                frame[col] = frame[col].astype('string')
+        return pa.Table.from_pandas(frame, preserve_index=False)
+
+def _write_ipc(table, path):
+    options = pa.ipc.IpcWriteOptions(
+        compression=None if SNAPSHOT_COMPRESSION == 'uncompressed' else SNAPSHOT_COMPRESSION
+    )
+    with pa.OSFile(path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+            writer.write_table(table)
+
+def _read_ipc(path):
+    with pa.memory_map(path, 'r') as source:
+        return pa.ipc.open_file(source).read_all()
+
+def _ledger_signature():
+    return {name: len(st.session_state.get(name, ())) for name in SNAPSHOT_LEDGERS}
+
+def _session_state_values():
+    """Non-ledger state that is small enough to keep as JSON"""
+    return {
+        'cash_balance': {unit: float(v) for unit, v in st.session_state.get('cash_balance', {}).items()},
+        'opening_cash': {unit: float(v) for unit, v in st.session_state.get('opening_cash', {}).items()},
+        'current_price': float(st.session_state.get('current_price', 0.0)),
+        'sku_prices': {sku: float(v) for sku, v in st.session_state.get('sku_prices', {}).items()},
+        'closed_through': st.session_state.get('closed_through'),
+        'partners': {
+            unit: df.to_dict(orient='records')
+            for unit, df in st.session_state.get('partners', {}).items()
+        }
+    }
+
+def capture_snapshot(event_seq):
+    """Everything a snapshot holds, taken on the script thread.
+
+    Ledgers are replaced rather than changed in place, so holding the
+    frames keeps this view consistent while it is written elsewhere.
+    """
+    return {
+        'name': datetime.now().strftime('%Y%m%dT%H%M%S%f'),
+        'frames': {
+            ledger: st.session_state[ledger]
+            for ledger in SNAPSHOT_LEDGERS + SNAPSHOT_ARCHIVES
+            if isinstance(st.session_state.get(ledger), pd.DataFrame)
+        },
+        'rows': _ledger_signature(),
+        'state': _session_state_values(),
+        'event_seq': int(event_seq)
+    }
+
+def _write_captured(captured):
+    name = captured['name']
+    path = os.path.join(SNAPSHOT_DIR, name)
+    tmp_path = path + '.tmp'
+    os.makedirs(tmp_path, exist_ok=True)
+    files = {}
+    for ledger, df in captured['frames'].items():
+        files[ledger] = f"{ledger}.arrow"
+        _write_ipc(to_arrow_table(df), os.path.join(tmp_path, files[ledger]))
+    manifest = {
+        'created_at': datetime.now().isoformat(),
+        'compression': SNAPSHOT_COMPRESSION,
+        'files': files,
+        'rows': captured['rows'],
+        'state': captured['state'],
+        'event_seq': captured['event_seq']
+    }
+    with open(os.path.join(tmp_path, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, default=str)
+    os.replace(tmp_path, path)
+
+    # Publish the new snapshot atomically, then prune old ones
+    pointer_tmp = os.path.join(SNAPSHOT_DIR, LATEST_POINTER + '.tmp')
+    with open(pointer_tmp, 'w') as f:
+        f.write(name)
+    os.replace(pointer_tmp, os.path.join(SNAPSHOT_DIR, LATEST_POINTER))
+    snapshots = sorted(
+        d for d in os.listdir(SNAPSHOT_DIR)
+        if os.path.isdir(os.path.join(SNAPSHOT_DIR, d)) and not d.endswith('.tmp')
+    )
+    # The snapshot just published is always kept, even with SNAPSHOT_KEEP=0
+    for old in snapshots[:-max(SNAPSHOT_KEEP, 1)]:
+        shutil.rmtree(os.path.join(SNAPSHOT_DIR, old), ignore_errors=True)
+    return path
+
+def _write_in_background(captured):
+    try:
+        path = _write_captured(captured)
+        logging.info(f"Wrote snapshot {path}")
+    except Exception as e:
+        logging.error(f"Error writing snapshot: {str(e)}")
+    finally:
+        _snapshot_lock.release()
+
+def write_snapshot(event_seq, background=False):
+    """Write all ledgers as Arrow IPC files plus a JSON manifest.
+
+    event_seq is the last logged event the ledgers include; recovery
+    replays only the events after it. Returns the snapshot path. With background=True the state is captured
+    here and the files are written on a worker thread; returns None
+    instead if another snapshot is still being written.
+    """
+    if not snapshots_available():
+        raise ValueError("pyarrow is not installed")
+    if not _snapshot_lock.acquire(blocking=not background):
+        return None
+    try:
+        captured = capture_snapshot(event_seq)
+        st.session_state['snapshot_status'] = {'at': time.time(), 'rows': captured['rows']}
+        if background:
+            threading.Thread(
+                target=_write_in_background, args=(captured,), name='snapshot-writer', daemon=True
+            ).start()
+            return os.path.join(SNAPSHOT_DIR, captured['name'])
+    except Exception as e:
+        _snapshot_lock.release()
+        raise ValueError(f"Error writing snapshot: {str(e)}")
+    try:
+        return _write_captured(captured)
+    except Exception as e:
+        raise ValueError(f"Error writing snapshot: {str(e)}")
+    finally:
+        _snapshot_lock.release()
+
+def latest_snapshot_path():
+    """Directory of the most recent complete snapshot, or None"""
+    pointer = os.path.join(SNAPSHOT_DIR, LATEST_POINTER)
+    if not os.path.exists(pointer):
+        return None
+    with open(pointer) as f:
+        path = os.path.join(SNAPSHOT_DIR, f.read().strip())
+    return path if os.path.exists(os.path.join(path, 'manifest.json')) else None
+
+def load_snapshot(path):
+    """Load a snapshot's ledgers through memory-mapped Arrow files"""
+    with open(os.path.join(path, 'manifest.json')) as f:
+        manifest = json.load(f)
+    ledgers = {}
+    for ledger, file_name in manifest['files'].items():
+        df = _read_ipc(os.path.join(path, file_name)).to_pandas()
+        # to_arrow_table stored dates as timestamps; the ledgers hold date objects
+        if 'Date' in df.columns and pd.api.types.is_datetime64_any_dtype(df['Date']):
+            df['Date'] = df['Date'].dt.date
+        ledgers[ledger] = df
+    return manifest, ledgers
+
+def restore_latest_snapshot():
+    """Populate session state from the latest snapshot; returns its manifest or None"""
+    if not snapshots_available():
+        return None
+    path = latest_snapshot_path()
+    if path is None:
+        return None
+    try:
+        started = time.perf_counter()
+        manifest, ledgers = load_snapshot(path)
+        state = manifest['state']
+        # Everything is decoded before anything is assigned: a snapshot that
+        # fails half way must not leave ledgers the full replay would duplicate
+        restored = dict(ledgers)
+        restored['cash_balance'] = dict(state['cash_balance'])
+        if 'opening_cash' in state:
+            restored['opening_cash'] = dict(state['opening_cash'])
+        restored['current_price'] = state['current_price']
+        if state.get('sku_prices'):
+            restored['sku_prices'] = dict(state['sku_prices'])
+        if state.get('closed_through'):
+            restored['closed_through'] = date.fromisoformat(state['closed_through'])
+        restored['partners'] = {
+            unit: pd.DataFrame(records) if records
+            else pd.DataFrame(columns=['Partner', 'Share', 'Withdrawn', 'Invested'])
+            for unit, records in state['partners'].items()
+        }
+        for key, value in restored.items():
+            st.session_state[key] = value
+        st.session_state['snapshot_status'] = {'at': time.time(), 'rows': manifest['rows']}
+        logging.info(f"Restored snapshot {path} in {(time.perf_counter() - started) * 1000:.1f} ms")
+        return manifest
+    except Exception as e:
+        logging.error(f"Could not restore snapshot {path}: {str(e)}")
+        return None
+
+def snapshot_due():
+    """True when the snapshot interval has elapsed"""
+    if not snapshots_available():
+        return False
+    status = st.session_state.get('snapshot_status')
+    return status is None or time.time() - status['at'] >= SNAPSHOT_INTERVAL_SECONDS
+
+def maybe_snapshot(event_seq):
+    """Write a snapshot if the interval has elapsed and the ledgers changed since the last one.
+
+    Returns True when a snapshot was started; it is written in the background.
+    """
+    if not snapshot_due():
+        return False
+    status = st.session_state.get('snapshot_status')
+    if status is not None and status['rows'] == _ledger_signature():
+        status['at'] = time.time()
+        return False
+    try:
+        return write_snapshot(event_seq, background=True) is not None
+    except Exception as e:
+        logging.error(str(e))
+        return False
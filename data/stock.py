@@ -0,0 +1,66 @@
+import threading
+import numpy as np
+import pandas as pd
+import streamlit as st
+from data.sku import sku_column, sku_positions
+from data.shared_ledger import shared_write
+
+# Guards the counters against readers rebuilding them concurrently
+_lock = threading.RLock()
+
+def _build_counter():
+    positions = sku_positions()
+    inventory = st.session_state.get('inventory')
+    counter = {
+        'rows': 0 if inventory is None else len(inventory),
+        'closed_through': st.session_state.get('closed_through'),
+        'on_hand': dict(zip(
+            zip(positions['Business Unit'], positions['SKU']),
+            positions['Quantity'].astype(float)
+        ))
+    }
+    st.session_state['stock_counter'] = counter
+    return counter
+
+def _counter():
+    counter = st.session_state.get('stock_counter')
+    inventory = st.session_state.get('inventory')
+    if (counter is None or counter['rows'] != (0 if inventory is None else len(inventory))
+            or counter['closed_through'] != st.session_state.get('closed_through')):
+        counter = _build_counter()
+    return counter
+
+def stock_appended_rows(ledger, start):
+    """Add the signed quantities of rows appended at positions >= start to the counters"""
+    if ledger != 'inventory':
+        return
+    with _lock:
+        counter = st.session_state.get('stock_counter')
+        if counter is None or counter['rows'] != start:
+            _build_counter()
+            return
+        new_rows = st.session_state.inventory.iloc[start:]
+        quantity = pd.to_numeric(new_rows['Quantity_kg'], errors='coerce').fillna(0.0).to_numpy()
+        kind = new_rows['Transaction Type'].to_numpy()
+        signed = np.where(kind == 'Purchase', quantity, np.where(kind == 'Sale', -quantity, 0.0))
+        on_hand = counter['on_hand']
+        for unit, sku, qty in zip(new_rows['Business Unit'], sku_column(new_rows), signed):
+            on_hand[(unit, sku)] = on_hand.get((unit, sku), 0.0) + float(qty)
+        counter['rows'] = start + len(new_rows)
+
+def available_stock(unit, sku):
+    """Kilograms of a SKU on hand in a unit"""
+    with _lock:
+        return _counter()['on_hand'].get((unit, sku), 0.0)
+
+def check_stock(unit, sku, quantity):
+    """Raise ValueError unless quantity of the SKU is on hand.
+
+    Runs on the shared ledger's write path, so the check sees every
+    session's sales; call it inside the sale's business_operation, which
+    keeps the write lock until the sale is posted.
+    """
+    with shared_write():
+        available = available_stock(unit, sku)
+        if quantity > available + 1e-9:
+            raise ValueError(f"Insufficient stock of {sku} in {unit}. Available: {max(available, 0.0):,.3f} kg")
@@ -0,0 +1,73 @@
+"""Shared fixtures: each test starts from empty ledgers and an empty event log.
+
+The data layer keeps its files at paths relative to the working
+directory, read when the modules are imported, so the whole run happens
+in one throwaway directory.
+"""
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKDIR = tempfile.mkdtemp(prefix='bizmaster-tests-')
+os.chdir(WORKDIR)
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import pandas as pd
+import pytest
+import streamlit as st
+from data import event_log
+from data.archive import ARCHIVE_DIR
+from data.snapshots import SNAPSHOT_DIR
+from data.session_state import initialize_session_state
+from data.sku import DEFAULT_SKU
+
+def clear_session():
+    """Forget the process-wide ledger and this session's state, as after a restart"""
+    st.cache_resource.clear()
+    for key in list(st.session_state.keys()):
+        del st.session_state[key]
+    # The shared store's generations start again at 0
+    event_log._writer['next_seq'] = None
+    event_log._writer['failed_generation'] = -1
+
+def restart():
+    """Reload the ledgers from disk the way a new process would"""
+    clear_session()
+    initialize_session_state()
+    return st.session_state
+
+@pytest.fixture
+def ledger():
+    """Freshly loaded default ledgers, with no events, snapshots or archives on disk"""
+    clear_session()
+    conn = sqlite3.connect(event_log.LEDGER_DB)
+    with conn:
+        conn.execute('DELETE FROM events')
+    conn.close()
+    for directory in (SNAPSHOT_DIR, ARCHIVE_DIR):
+        shutil.rmtree(directory, ignore_errors=True)
+    initialize_session_state()
+    yield st.session_state
+    clear_session()
+
+@pytest.fixture
+def failing_commits(monkeypatch):
+    """Make every event log commit fail, as a full or broken disk would"""
+    def fail(conn, rows):
+        raise sqlite3.OperationalError("disk I/O error")
+    monkeypatch.setattr(event_log, '_insert_events', fail)
+
+def inventory_rows(*movements, unit='Unit A', sku=DEFAULT_SKU):
+    """Inventory rows from (date, 'Purchase' or 'Sale', kg, total amount) tuples"""
+    return pd.DataFrame([
+        {
+            'Date': pd.Timestamp(day).date(), 'Transaction Type': kind, 'SKU': sku,
+            'Quantity_kg': float(quantity), 'Unit Price': amount / quantity,
+            'Total Amount': float(amount), 'Business Unit': unit, 'Description': ''
+        }
+        for day, kind, quantity, amount in movements
+    ])
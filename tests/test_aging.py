@@ -0,0 +1,40 @@
+from datetime import date
+import pandas as pd
+import streamlit as st
+from data.aging import inventory_aging
+from data.sku import set_sku_prices, DEFAULT_SKU
+from utils import append_ledger_rows
+from conftest import inventory_rows
+
+AS_OF = date(2026, 4, 1)
+
+def test_remaining_stock_is_aged_from_the_newest_lots(ledger):
+    set_sku_prices({DEFAULT_SKU: 2.0})
+    append_ledger_rows('inventory', inventory_rows(
+        ('2026-01-01', 'Purchase', 10, 10),
+        ('2026-03-01', 'Purchase', 10, 10),
+        ('2026-03-15', 'Sale', 12, 24)
+    ))
+    aging, days_held = inventory_aging('Unit A', as_of=AS_OF)
+    assert aging[['Bucket', 'Quantity', 'Value']].values.tolist() == [['31–90 days', 8.0, 16.0]]
+    # The sale's last kilogram came from the March lot
+    assert days_held['Avg Days Held'].tolist() == [14.0]
+
+def test_aging_is_grouped_per_unit_and_sku(ledger):
+    append_ledger_rows('inventory', pd.concat([
+        inventory_rows(('2026-03-20', 'Purchase', 5, 5)),
+        inventory_rows(('2025-12-01', 'Purchase', 3, 3), unit='Unit B', sku='Premium'),
+        inventory_rows(('2026-03-25', 'Sale', 1, 2), unit='Unit B', sku='Premium')
+    ], ignore_index=True))
+    aging, _ = inventory_aging(as_of=AS_OF)
+    assert aging[['Business Unit', 'SKU', 'Bucket', 'Quantity']].values.tolist() == [
+        ['Unit A', DEFAULT_SKU, '0–30 days', 5.0],
+        ['Unit B', 'Premium', '90+ days', 2.0]
+    ]
+
+def test_replaced_ledger_of_the_same_length_is_re_aged(ledger):
+    append_ledger_rows('inventory', inventory_rows(('2026-03-20', 'Purchase', 5, 5)))
+    assert inventory_aging(as_of=AS_OF)[0]['Bucket'].tolist() == ['0–30 days']
+
+    st.session_state.inventory = inventory_rows(('2025-06-01', 'Purchase', 5, 5))
+    assert inventory_aging(as_of=AS_OF)[0]['Bucket'].tolist() == ['90+ days']
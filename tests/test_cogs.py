@@ -0,0 +1,53 @@
+import pytest
+import streamlit as st
+from data.cogs import build_cogs, get_cogs, gross_margin, book_summary
+from utils import append_ledger_rows
+from conftest import inventory_rows
+
+def margin_from_scratch(unit):
+    build_cogs()
+    return gross_margin(unit)
+
+def test_fifo_matches_oldest_lots_first(ledger):
+    append_ledger_rows('inventory', inventory_rows(
+        ('2026-01-02', 'Purchase', 10, 50),
+        ('2026-01-03', 'Purchase', 10, 70),
+        ('2026-01-04', 'Sale', 15, 150)
+    ))
+    assert gross_margin('Unit A') == (150.0, 10 * 5.0 + 5 * 7.0)
+    summary = book_summary('Unit A').iloc[0]
+    assert summary['Stock Quantity'] == 5.0
+    assert summary['Stock Cost'] == pytest.approx(35.0)
+
+def test_back_dated_purchase_rewinds_its_month(ledger):
+    append_ledger_rows('inventory', inventory_rows(
+        ('2026-01-10', 'Purchase', 10, 50),
+        ('2026-02-01', 'Purchase', 10, 80),
+        ('2026-02-10', 'Sale', 12, 240)
+    ))
+    assert gross_margin('Unit A') == (240.0, 10 * 5.0 + 2 * 8.0)
+
+    # Bought before every other lot, so the sale now draws on it first
+    append_ledger_rows('inventory', inventory_rows(('2026-01-05', 'Purchase', 10, 30)))
+    assert gross_margin('Unit A') == (240.0, 10 * 3.0 + 2 * 5.0)
+    assert get_cogs()['rows'] == len(st.session_state.inventory)
+    assert gross_margin('Unit A') == margin_from_scratch('Unit A')
+
+def test_same_day_appends_are_posted_once(ledger):
+    append_ledger_rows('inventory', inventory_rows(
+        ('2026-03-05', 'Purchase', 10, 50),
+        ('2026-03-05', 'Sale', 4, 40)
+    ))
+    append_ledger_rows('inventory', inventory_rows(('2026-03-05', 'Sale', 4, 40)))
+    assert gross_margin('Unit A') == (80.0, 40.0)
+    assert book_summary('Unit A').iloc[0]['Stock Quantity'] == pytest.approx(2.0)
+    assert gross_margin('Unit A') == margin_from_scratch('Unit A')
+
+def test_sales_beyond_stock_have_no_cost_basis(ledger):
+    append_ledger_rows('inventory', inventory_rows(
+        ('2026-04-01', 'Purchase', 2, 20),
+        ('2026-04-02', 'Sale', 5, 100)
+    ))
+    summary = book_summary('Unit A').iloc[0]
+    assert summary['COGS'] == 20.0
+    assert summary['Unmatched Quantity'] == 3.0
@@ -0,0 +1,34 @@
+"""Derived structures follow appends and notice a ledger replaced by a frame of the same length"""
+import streamlit as st
+from data.cube import cube_frame
+from data.ledger_index import rows_in_range, latest_positions
+from data.sku import sku_positions
+from utils import append_ledger_rows
+from conftest import inventory_rows
+
+def test_index_merges_back_dated_appends(ledger):
+    append_ledger_rows('inventory', inventory_rows(('2026-01-10', 'Purchase', 1, 1), ('2026-01-20', 'Purchase', 2, 2)))
+    append_ledger_rows('inventory', inventory_rows(('2026-01-15', 'Purchase', 3, 3)))
+    assert latest_positions('inventory', 'Unit A') == [1, 2, 0]
+    assert rows_in_range('inventory', 'Unit A', '2026-01-12', '2026-01-31')['Quantity_kg'].tolist() == [2.0, 3.0]
+
+def test_index_rebuilds_for_a_replaced_ledger(ledger):
+    append_ledger_rows('inventory', inventory_rows(('2026-01-10', 'Purchase', 1, 1)))
+    assert len(rows_in_range('inventory', 'Unit A', '2026-01-01', '2026-01-31')) == 1
+
+    st.session_state.inventory = inventory_rows(('2026-05-10', 'Purchase', 1, 1))
+    assert len(rows_in_range('inventory', 'Unit A', '2026-01-01', '2026-01-31')) == 0
+
+def test_cube_rebuilds_for_a_replaced_ledger(ledger):
+    append_ledger_rows('inventory', inventory_rows(('2026-01-10', 'Purchase', 1, 10)))
+    assert cube_frame('Unit A', 'inventory')['Month'].tolist() == ['2026-01']
+
+    st.session_state.inventory = inventory_rows(('2026-05-10', 'Purchase', 1, 10))
+    assert cube_frame('Unit A', 'inventory')['Month'].tolist() == ['2026-05']
+
+def test_sku_stock_rebuilds_for_a_replaced_ledger(ledger):
+    append_ledger_rows('inventory', inventory_rows(('2026-01-10', 'Purchase', 4, 4)))
+    assert sku_positions('Unit A')['Quantity'].tolist() == [4.0]
+
+    st.session_state.inventory = inventory_rows(('2026-01-10', 'Purchase', 7, 7))
+    assert sku_positions('Unit A')['Quantity'].tolist() == [7.0]
@@ -0,0 +1,99 @@
+import sqlite3
+import pandas as pd
+import pytest
+import streamlit as st
+from data import event_log
+from data.event_log import business_operation, last_event_seq, append_event, submit_event, wait_durable
+from data.session_state import _load_ledgers
+from data.shared_ledger import shared_store, pipelined_write, finish_write, ensure_shared_state
+from utils import (
+    append_ledger_rows, update_cash_balance, record_transaction, record_partner_withdrawal,
+    set_partner_table
+)
+from conftest import clear_session, restart, inventory_rows
+
+def test_replay_without_snapshot(ledger):
+    with business_operation('Purchase'):
+        update_cash_balance(500.0, 'Unit A', 'subtract')
+        append_ledger_rows('inventory', inventory_rows(('2026-01-05', 'Purchase', 10, 500)))
+        record_transaction(type='Purchase', amount=500.0, from_entity='Unit A', to_entity='Supplier')
+    assert last_event_seq() == 1
+
+    state = restart()
+    assert state['event_seq'] == 1
+    assert state['snapshot_event_seq'] == 0
+    assert state.cash_balance['Unit A'] == 9500.0
+    assert state.inventory['Quantity_kg'].tolist() == [10.0]
+    # The transactions ledger only exists once its first append is replayed
+    assert state.transactions['Amount'].tolist() == [500.0]
+
+def test_failed_replay_loads_nothing(ledger):
+    append_event('Broken', [{'kind': 'cash', 'unit': 'Unit A'}])
+    clear_session()
+    with pytest.raises(ValueError, match="Error replaying event log"):
+        ensure_shared_state(_load_ledgers)
+    store = shared_store()
+    assert not store['loaded']
+    assert store['state'] == {}
+
+def test_operation_rolls_back_when_commit_fails(ledger, failing_commits):
+    with pytest.raises(ValueError, match="Error logging event"):
+        with business_operation('Purchase'):
+            update_cash_balance(500.0, 'Unit A', 'subtract')
+            append_ledger_rows('inventory', inventory_rows(('2026-01-05', 'Purchase', 10, 500)))
+    assert shared_store()['state']['cash_balance']['Unit A'] == 10000.0
+    assert st.session_state.cash_balance['Unit A'] == 10000.0
+    assert st.session_state.inventory.empty
+    assert last_event_seq() == 0
+
+def test_failed_write_fails_the_writes_built_on_it(ledger):
+    store = shared_store()
+    with pipelined_write() as first:
+        st.session_state.cash_balance = {**st.session_state.cash_balance, 'Unit A': 1.0}
+    with pipelined_write() as second:
+        # Builds on the first write although it is not durable yet
+        assert st.session_state.cash_balance['Unit A'] == 1.0
+        st.session_state.cash_balance = {**st.session_state.cash_balance, 'Unit B': 2.0}
+
+    assert not finish_write(first, False)
+    assert not finish_write(second, True)
+    assert store['state']['cash_balance'] == {'Unit A': 10000.0, 'Unit B': 10000.0}
+    assert store['tip'] is None and not store['pending']
+    assert store['generation'] == first.generation + 1
+
+def test_writer_drops_later_events_of_a_failed_generation(ledger, monkeypatch):
+    insert = event_log._insert_events
+    def fail_bad(conn, rows):
+        if any(row[1] == 'Bad' for row in rows):
+            raise sqlite3.IntegrityError("rejected")
+        insert(conn, rows)
+    monkeypatch.setattr(event_log, '_insert_events', fail_bad)
+
+    _, bad = submit_event('Bad', [], generation=0)
+    _, later = submit_event('Good', [], generation=0)
+    _, other = submit_event('Good', [], generation=1)
+    for future in (bad, later):
+        with pytest.raises(ValueError):
+            wait_durable(future)
+    assert wait_durable(other) == last_event_seq()
+
+def test_partner_withdrawal_is_all_or_nothing(ledger):
+    set_partner_table('Unit A', pd.DataFrame([{'Partner': 'Ahmed', 'Share': 100.0, 'Withdrawn': 0.0, 'Invested': 0.0}]))
+    with business_operation('Trade'):
+        append_ledger_rows('inventory', inventory_rows(
+            ('2026-01-05', 'Purchase', 10, 100), ('2026-01-06', 'Sale', 10, 300)
+        ))
+    seq = last_event_seq()
+    partners = st.session_state.partners['Unit A']
+
+    # The cash debit succeeds; the entitlement of 200 then rejects the withdrawal
+    with pytest.raises(ValueError, match="Withdrawal failed: .*Insufficient funds"):
+        record_partner_withdrawal('Unit A', 'Ahmed', 250.0, 'Drawings')
+    assert st.session_state.cash_balance['Unit A'] == 10000.0
+    assert st.session_state.partners['Unit A'] is partners
+    assert st.session_state.expenses.empty
+    assert last_event_seq() == seq
+
+    record_partner_withdrawal('Unit A', 'Ahmed', 150.0, 'Drawings')
+    assert st.session_state.cash_balance['Unit A'] == 9850.0
+    assert st.session_state.partners['Unit A']['Withdrawn'].tolist() == [150.0]
@@ -0,0 +1,45 @@
+import os
+import pytest
+import streamlit as st
+from data.archive import ARCHIVE_DIR, read_archive
+from data.event_log import business_operation, last_event_seq
+from data.period_close import close_period
+from utils import append_ledger_rows
+from conftest import inventory_rows
+
+def archive_files():
+    return sorted(
+        os.path.relpath(os.path.join(directory, name), ARCHIVE_DIR)
+        for directory, _, names in os.walk(ARCHIVE_DIR) for name in names
+    )
+
+@pytest.fixture
+def trades(ledger):
+    with business_operation('Trade'):
+        append_ledger_rows('inventory', inventory_rows(
+            ('2026-01-05', 'Purchase', 10, 100),
+            ('2026-01-20', 'Sale', 4, 80),
+            ('2026-02-03', 'Purchase', 5, 50)
+        ))
+    return ledger
+
+def test_close_archives_the_period(trades):
+    close_period('2026-01', force=True)
+    assert st.session_state['closed_through'].isoformat() == '2026-01-31'
+    assert st.session_state.inventory['Quantity_kg'].tolist() == [5.0]
+    assert read_archive('inventory')['Quantity_kg'].tolist() == [10.0, 4.0]
+
+def test_failed_close_commit_leaves_no_archive(trades, failing_commits, monkeypatch):
+    seq = last_event_seq()
+    with pytest.raises(ValueError, match="Error closing period"):
+        close_period('2026-01', force=True)
+    assert archive_files() == []
+    assert st.session_state.get('closed_through') is None
+    assert len(st.session_state.inventory) == 3
+    assert last_event_seq() == seq
+
+    # Once commits work again the same period closes, and archives its rows once
+    monkeypatch.undo()
+    close_period('2026-01', force=True)
+    assert len(archive_files()) == 1
+    assert read_archive('inventory')['Quantity_kg'].tolist() == [10.0, 4.0]
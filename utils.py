@@ -5,6 +5,15 @@ from datetime import date, datetime
 import numpy as np
 import math
 import logging
+from data.ledger_index import index_appended_rows
+from data.cube import cube_appended_rows
+from data.event_log import business_operation, record_effect, record_ledger_append
+from data.period_close import CLOSE_LEDGERS, closing_total, ensure_period_open
+from data.sku import DEFAULT_SKU, set_sku_prices, sku_positions
+from data.cogs import cogs_appended_rows, gross_margin
+from data.stock import stock_appended_rows
+from data.accounts import InsufficientFunds, cash_account, partner_account, update_account
+from data.metrics import timed
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -13,14 +22,16 @@ def initialize_default_data():
     """Initialize all required session state variables with default values"""
     defaults = {
         'cash_balance': {'Unit A': 10000.0, 'Unit B': 10000.0},
+        'opening_cash': {'Unit A': 10000.0, 'Unit B': 10000.0},
         'current_price': 50.0,
         'price_history': pd.DataFrame([{
             'Date': date.today(),
             'Time': datetime.now().time(),
+            'SKU': DEFAULT_SKU,
             'Price': 50.0
         }]),
         'inventory': pd.DataFrame(columns=[
-            'Date', 'Transaction Type', 'Quantity_kg', 'Unit Price',
+            'Date', 'Transaction Type', 'SKU', 'Quantity_kg', 'Unit Price',
             'Total Amount', 'Business Unit', 'Description'
         ]),
         'expenses': pd.DataFrame(columns=[
@@ -47,21 +58,63 @@ def initialize_default_data():
     for key, value in defaults.items():
         if key not in st.session_state:
             st.session_state[key] = value
-    for unit in st.session_state.get('partners', {}):
-        if 'Invested' not in st.session_state.partners[unit].columns:
-            st.session_state.partners[unit]['Invested'] = 0.0
-        if 'Withdrawn' not in st.session_state.partners[unit].columns:
-            st.session_state.partners[unit]['Withdrawn'] = 0.0
+    # Older data lacks some columns; add them to new objects, never to shared ones
+    for ledger in ('inventory', 'price_history'):
+        if 'SKU' not in st.session_state[ledger].columns:
+            st.session_state[ledger] = st.session_state[ledger].assign(SKU=DEFAULT_SKU)
+    partners = st.session_state.get('partners', {})
+    upgraded = {
+        unit: df.assign(**{col: 0.0 for col in ('Invested', 'Withdrawn') if col not in df.columns})
+        for unit, df in partners.items()
+        if 'Invested' not in df.columns or 'Withdrawn' not in df.columns
+    }
+    if upgraded:
+        st.session_state.partners = {**partners, **upgraded}
 
 def redistribute_shares(partners_df, freed_share):
     """Redistribute freed shares among remaining partners"""
     if partners_df.empty or partners_df['Share'].sum() <= 0:
         return partners_df
     total_active_shares = partners_df['Share'].sum()
-    partners_df['Share'] = partners_df['Share'] + (partners_df['Share'] / total_active_shares * freed_share)
-    partners_df['Share'] = partners_df['Share'] * (100 / partners_df['Share'].sum())
-    partners_df['Share'] = partners_df['Share'].round(2)
-    return partners_df
+    shares = partners_df['Share'] + (partners_df['Share'] / total_active_shares * freed_share)
+    shares = shares * (100 / shares.sum())
+    # A new frame: the table passed in may be the shared one other sessions are reading
+    return partners_df.assign(Share=shares.round(2))
+
+def append_ledger_rows(ledger, rows):
+    """Append rows to a session ledger and keep its date index and cube current"""
+    if not isinstance(rows, pd.DataFrame):
+        rows = pd.DataFrame(rows)
+    if ledger in CLOSE_LEDGERS and not rows.empty:
+        ensure_period_open(pd.to_datetime(rows['Date']).min())
+    previous = st.session_state[ledger]
+    start = len(previous)
+    st.session_state[ledger] = pd.concat([previous, rows], ignore_index=True)
+    index_appended_rows(ledger, start, previous)
+    cube_appended_rows(ledger, start, previous)
+    cogs_appended_rows(ledger, start)
+    stock_appended_rows(ledger, start)
+    record_ledger_append(ledger, rows)
+
+def adjust_partner_balance(unit, partner, column, amount, limit=None):
+    """Add amount to a partner's 'Withdrawn' or 'Invested' total, never taking it above limit"""
+    def change(total):
+        if limit is not None and total + amount > limit + 1e-9:
+            raise InsufficientFunds(f"Insufficient funds. Max available: {max(limit - total, 0.0):.2f}")
+        return total + amount
+    update_account(partner_account(unit, partner, column), change)
+    record_effect('partner', unit=unit, partner=partner, column=column, delta=amount)
+
+@business_operation('Ownership Change')
+def set_partner_table(unit, partners_df):
+    """Replace a unit's partner table (ownership changes)"""
+    st.session_state.partners = {**st.session_state.partners, unit: partners_df}
+    record_effect(
+        'partners',
+        unit=unit,
+        columns=list(partners_df.columns),
+        rows=partners_df.to_dict(orient='records')
+    )
 
 def update_cash_balance(amount, business_unit, operation='add'):
     """Update cash balance for a business unit with validation"""
@@ -71,85 +124,91 @@ def update_cash_balance(amount, business_unit, operation='add'):
             raise ValueError("Amount cannot be negative")
         if amount > 0.0 and amount < 0.01:
             raise ValueError("Amount must be at least 0.01")
-        if business_unit not in st.session_state.cash_balance:
-            st.session_state.cash_balance[business_unit] = 0.0
         if operation == 'add':
-            st.session_state.cash_balance[business_unit] += amount
+            update_account(cash_account(business_unit), lambda balance: balance + amount)
+            record_effect('cash', unit=business_unit, delta=amount)
         else:
-            if st.session_state.cash_balance[business_unit] < amount:
-                raise ValueError(f"Insufficient funds in {business_unit}")
-            st.session_state.cash_balance[business_unit] -= amount
+            # The funds check runs under the write lock, against the balance it replaces
+            def debit(balance):
+                if balance < amount:
+                    raise InsufficientFunds(f"Insufficient funds in {business_unit}")
+                return balance - amount
+            update_account(cash_account(business_unit), debit)
+            record_effect('cash', unit=business_unit, delta=-amount)
+    except InsufficientFunds as e:
+        raise InsufficientFunds(f"Error updating cash balance: {str(e)}")
     except Exception as e:
         raise ValueError(f"Error updating cash balance: {str(e)}")
 
+@timed('calculation')
 def calculate_inventory_value(unit):
-    """Calculate current stock quantity and value"""
-    if 'inventory' not in st.session_state or st.session_state.inventory.empty:
+    """Calculate current stock quantity and value across all SKUs"""
+    positions = sku_positions(unit)
+    if positions.empty:
         return 0.0, 0.0
-    unit_inv = st.session_state.inventory[st.session_state.inventory['Business Unit'] == unit]
-    if unit_inv.empty:
-        return 0.0, 0.0
-    purchases = unit_inv[unit_inv['Transaction Type'] == 'Purchase']
-    sales = unit_inv[unit_inv['Transaction Type'] == 'Sale']
-    current_stock = purchases['Quantity_kg'].sum() - sales['Quantity_kg'].sum()
-    current_value = current_stock * st.session_state.current_price
-    return round(float(current_stock), 2), round(float(current_value), 2)
+    return round(float(positions['Quantity'].sum()), 2), round(float(positions['Value'].sum()), 2)
 
+@timed('calculation')
 def calculate_operating_expenses(unit):
     """Calculate total operating expenses"""
+    closed = closing_total(unit, 'expenses', exclude=['Partner Withdrawal', 'Partner Contribution'])
     if 'expenses' not in st.session_state:
-        return 0.0
+        return round(closed, 2)
     expenses = st.session_state.expenses[
         (st.session_state.expenses['Business Unit'] == unit) &
         (~st.session_state.expenses['Category'].isin(['Partner Withdrawal', 'Partner Contribution']))
     ]
-    return round(float(expenses['Amount'].sum()), 2)
+    return round(closed + float(expenses['Amount'].sum()), 2)
 
+@timed('calculation')
 def calculate_profit_loss(unit):
-    """Calculate actual profit from sales"""
-    if 'inventory' not in st.session_state:
-        return 0.0, 0.0
-    sales = st.session_state.inventory[
-        (st.session_state.inventory['Business Unit'] == unit) &
-        (st.session_state.inventory['Transaction Type'] == 'Sale')
-    ]
-    purchases = st.session_state.inventory[
-        (st.session_state.inventory['Business Unit'] == unit) &
-        (st.session_state.inventory['Transaction Type'] == 'Purchase')
-    ]
-    gross_profit = float(sales['Total Amount'].sum()) - float(purchases['Total Amount'].sum())
+    """Calculate actual profit from sales less the cost of the goods sold"""
+    revenue, cost_of_sales = gross_margin(unit)
+    gross_profit = revenue - cost_of_sales
     net_profit = gross_profit - calculate_operating_expenses(unit)
     return round(gross_profit, 2), round(net_profit, 2)
 
+@timed('calculation')
+def calculate_investment_total(unit):
+    """Total invested in a unit, including closed periods"""
+    live = float(st.session_state.investments[
+        st.session_state.investments['Business Unit'] == unit
+    ]['Amount'].sum()) if 'investments' in st.session_state else 0.0
+    return closing_total(unit, 'investments') + live
+
+@timed('calculation')
 def calculate_provisional_profit(unit):
     """Calculate potential profit from current inventory"""
     current_stock, inventory_value = calculate_inventory_value(unit)
-    investments = float(st.session_state.investments[
-        st.session_state.investments['Business Unit'] == unit
-    ]['Amount'].sum()) if 'investments' in st.session_state else 0.0
+    investments = calculate_investment_total(unit)
     expenses = calculate_operating_expenses(unit)
     provisional = float(inventory_value) - investments - expenses
     return round(max(0.0, provisional), 2)
 
+@timed('calculation')
 def calculate_partner_profits(unit):
     """Calculate profit distribution for partners with consistent withdrawal tracking"""
     if 'partners' not in st.session_state or unit not in st.session_state.partners:
         return pd.DataFrame()
     
-    partners_df = st.session_state.partners[unit].copy()
+    partners_df = st.session_state.partners[unit]
     
     # Calculate base profits
     provisional = calculate_provisional_profit(unit)
     _, actual = calculate_profit_loss(unit)
     distributable = max(float(provisional), float(actual))
     
-    # Calculate entitlements using the authoritative withdrawn amounts
-    partners_df['Total_Entitlement'] = partners_df['Share'] / 100 * distributable
-    partners_df['Available_Now'] = partners_df['Total_Entitlement'] - partners_df['Withdrawn']
-    partners_df['Available_Now'] = partners_df['Available_Now'].apply(lambda x: max(0.0, float(x)))
+    # Calculate entitlements using the authoritative withdrawn amounts;
+    # assign builds a new frame, leaving the shared partner table untouched
+    entitlement = partners_df['Share'] / 100 * distributable
+    partners_df = partners_df.assign(
+        Total_Entitlement=entitlement,
+        Available_Now=(entitlement - partners_df['Withdrawn']).clip(lower=0.0).fillna(0.0)
+    )
     
     return partners_df[['Partner', 'Share', 'Total_Entitlement', 'Withdrawn', 'Available_Now']]
 
+@timed('calculation')
 def calculate_combined_partner_profits():
     """Aggregate partner profits across all units"""
     combined = pd.DataFrame()
@@ -175,6 +234,7 @@ def calculate_combined_partner_profits():
         combined[numeric_cols] = combined[numeric_cols].round(2)
     return combined
 
+@business_operation('Partner Withdrawal')
 def record_partner_withdrawal(unit, partner, amount, description):
     """Record a partner withdrawal transaction with consistent amount tracking"""
     try:
@@ -182,24 +242,20 @@ def record_partner_withdrawal(unit, partner, amount, description):
         if amount < 0.01:
             raise ValueError("Amount must be at least 0.01")
             
-        # Get current available amount
+        # Get the partner's entitlement; what is still available depends on
+        # the withdrawn total at the moment it is updated, not as read here
         profits_df = calculate_partner_profits(unit)
         partner_data = profits_df[profits_df['Partner'] == partner]
         
         if partner_data.empty:
             raise ValueError(f"Partner {partner} not found in {unit}")
             
-        available = float(partner_data['Available_Now'].iloc[0])
-        
-        if amount > available:
-            raise ValueError(f"Insufficient funds. Max available: {available:.2f}")
+        entitlement = float(partner_data['Total_Entitlement'].iloc[0])
         
-        # Update partner's withdrawn amount FIRST
-        partner_index = st.session_state.partners[unit].index[
-            st.session_state.partners[unit]['Partner'] == partner
-        ].tolist()[0]
-        
-        st.session_state.partners[unit].at[partner_index, 'Withdrawn'] += amount
+        # Either check failing raises out of the operation, which discards both changes
+        update_cash_balance(amount, unit, 'subtract')
+        # Check and raise the withdrawn total in one step under the write lock
+        adjust_partner_balance(unit, partner, 'Withdrawn', amount, limit=entitlement)
         
         # Then record the expense
         new_expense = pd.DataFrame([{
@@ -212,13 +268,7 @@ def record_partner_withdrawal(unit, partner, amount, description):
             'Payment Method': 'Bank Transfer'
         }])
         
-        st.session_state.expenses = pd.concat(
-            [st.session_state.expenses, new_expense],
-            ignore_index=True
-        )
-        
-        # Update cash balance
-        update_cash_balance(amount, unit, 'subtract')
+        append_ledger_rows('expenses', new_expense)
         
         # Record transaction
         record_transaction(
@@ -232,9 +282,9 @@ def record_partner_withdrawal(unit, partner, amount, description):
         return True
         
     except Exception as e:
-        st.error(f"Withdrawal failed: {str(e)}")
-        return False
+        raise ValueError(f"Withdrawal failed: {str(e)}")
 
+@business_operation('Investment')
 def distribute_investment(unit, amount, investor, description=None):
     """Distribute investment to partners according to their shares"""
     try:
@@ -248,9 +298,6 @@ def distribute_investment(unit, amount, investor, description=None):
             raise KeyError(f"Business unit {unit} not found")
         if st.session_state.partners[unit].empty:
             raise ValueError(f"No partners in {unit} to distribute to")
-        
-        if 'Invested' not in st.session_state.partners[unit].columns:
-            st.session_state.partners[unit]['Invested'] = 0.0
             
         desc = description or f"Investment from {investor}"
         new_investment = pd.DataFrame([{
@@ -275,10 +322,7 @@ def distribute_investment(unit, amount, investor, description=None):
         if not duplicate_check.empty:
             raise ValueError("Duplicate investment detected")
             
-        st.session_state.investments = pd.concat(
-            [st.session_state.investments, new_investment],
-            ignore_index=True
-        )
+        append_ledger_rows('investments', new_investment)
         
         update_cash_balance(amount, unit, 'add')
         record_transaction(
@@ -302,41 +346,43 @@ def distribute_investment(unit, amount, investor, description=None):
                 'Partner': row['Partner'],
                 'Payment Method': 'Bank Transfer'
             }])
-            st.session_state.expenses = pd.concat(
-                [st.session_state.expenses, new_expense],
-                ignore_index=True
-            )
+            append_ledger_rows('expenses', new_expense)
             # Update partner's invested amount
-            partner_index = st.session_state.partners[unit].index[
-                st.session_state.partners[unit]['Partner'] == row['Partner']
-            ].tolist()[0]
-            st.session_state.partners[unit].at[partner_index, 'Invested'] += share_amount
+            adjust_partner_balance(unit, row['Partner'], 'Invested', share_amount)
         return True
     except Exception as e:
         raise ValueError(f"Error distributing investment: {str(e)}")
 
-def update_market_price(new_price):
-    """Update current market price"""
+@business_operation('Price Update')
+def update_sku_prices(prices):
+    """Update market prices for several SKUs in one price-history append"""
     try:
-        new_price = float(new_price)
-        if new_price <= 0:
+        prices = {str(sku).strip(): float(price) for sku, price in prices.items()}
+        if not prices:
+            return
+        if '' in prices:
+            raise ValueError("SKU cannot be empty")
+        if min(prices.values()) <= 0:
             raise ValueError("Price must be a positive number")
-        st.session_state.current_price = new_price
-        new_record = pd.DataFrame([{
+        set_sku_prices(prices)
+        record_effect('prices', prices=prices)
+        new_records = pd.DataFrame({
             'Date': date.today(),
             'Time': datetime.now().time(),
-            'Price': new_price
-        }])
+            'SKU': list(prices.keys()),
+            'Price': list(prices.values())
+        })
         if 'price_history' not in st.session_state:
-            st.session_state.price_history = new_record
+            st.session_state.price_history = new_records
         else:
-            st.session_state.price_history = pd.concat(
-                [st.session_state.price_history, new_record],
-                ignore_index=True
-            )
+            append_ledger_rows('price_history', new_records)
     except Exception as e:
         raise ValueError(f"Error updating market price: {str(e)}")
 
+def update_market_price(new_price, sku=DEFAULT_SKU):
+    """Update current market price"""
+    update_sku_prices({sku: new_price})
+
 def record_transaction(type, amount, from_entity, to_entity, description=None):
     """Record a financial transaction"""
     try:
@@ -358,13 +404,11 @@ def record_transaction(type, amount, from_entity, to_entity, description=None):
             st.session_state.transactions = pd.DataFrame(columns=[
                 'Date', 'Type', 'Amount', 'From', 'To', 'Description'
             ])
-        st.session_state.transactions = pd.concat(
-            [st.session_state.transactions, new_transaction],
-            ignore_index=True
-        )
+        append_ledger_rows('transactions', new_transaction)
     except Exception as e:
         raise ValueError(f"Error recording transaction: {str(e)}")
 
+@timed('calculation')
 def get_business_unit_summary(unit):
     """Generate business unit summary"""
     try:
@@ -380,13 +424,12 @@ def get_business_unit_summary(unit):
             'Net Profit': round(float(net_profit), 2),
             'Provisional Profit': round(float(provisional), 2),
             'Operating Expenses': calculate_operating_expenses(unit),
-            'Investment Total': float(st.session_state.investments[
-                st.session_state.investments['Business Unit'] == unit
-            ]['Amount'].sum()) if 'investments' in st.session_state else 0.0
+            'Investment Total': round(calculate_investment_total(unit), 2)
         }
     except Exception as e:
         raise ValueError(f"Error generating business unit summary: {str(e)}")
 
+@timed('calculation')
 def get_system_summary():
     """Generate system-wide summary"""
     try:
@@ -396,10 +439,13 @@ def get_system_summary():
             'Total Inventory Value': sum(
                 float(calculate_inventory_value(unit)[1]) for unit in st.session_state.cash_balance.keys()
             ),
-            'Total Investments': float(st.session_state.investments['Amount'].sum()) 
-                if 'investments' in st.session_state else 0.0,
-            'Total Expenses': float(st.session_state.expenses['Amount'].sum()) 
-                if 'expenses' in st.session_state else 0.0
+            'Total Investments': sum(
+                calculate_investment_total(unit) for unit in st.session_state.cash_balance.keys()
+            ),
+            'Total Expenses': sum(
+                closing_total(unit, 'expenses') for unit in st.session_state.cash_balance.keys()
+            ) + (float(st.session_state.expenses['Amount'].sum())
+                if 'expenses' in st.session_state else 0.0)
         }
         for unit in st.session_state.cash_balance.keys():
             summary['Units'][unit] = get_business_unit_summary(unit)